@@ -0,0 +1,48 @@
+#!/usr/bin/python3
+"""Benchmark FileStorage.all(cls) against a full scan of __objects
+
+Usage: ./benchmarks/bench_all_by_class.py [size ...]
+
+For each store size, 200 States are mixed with <size> BaseModels and the
+time to list the States through the class index is compared with the
+time the old implementation took to filter every stored object.
+"""
+import sys
+import os
+import timeit
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models import storage
+from models.base_model import BaseModel
+from models.state import State
+
+
+def scan(cls):
+    """Filter every stored object, as all(cls) used to"""
+    cls_dict = {}
+    for key, obj in storage.all().items():
+        if cls == obj.__class__ or cls == obj.__class__.__name__:
+            cls_dict[key] = obj
+    return cls_dict
+
+
+def fill(size):
+    """Reset storage to 200 States and <size> BaseModels"""
+    storage.reset()
+    for i in range(200):
+        storage.new(State(name="state_{}".format(i)))
+    for i in range(size):
+        storage.new(BaseModel())
+
+
+if __name__ == "__main__":
+    sizes = [int(n) for n in sys.argv[1:]] or [10000, 100000, 1000000]
+    print("{:>10} {:>14} {:>14}".format("objects", "scan (ms)", "index (ms)"))
+    for size in sizes:
+        fill(size)
+        assert scan(State) == storage.all(State)
+        t_scan = min(timeit.repeat(lambda: scan(State), number=1, repeat=5))
+        t_index = min(timeit.repeat(lambda: storage.all(State),
+                                    number=1, repeat=5))
+        print("{:>10} {:>14.3f} {:>14.3f}".format(size, t_scan * 1000,
+                                                  t_index * 1000))
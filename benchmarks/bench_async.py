@@ -0,0 +1,130 @@
+#!/usr/bin/python3
+"""Benchmark sync and asyncio storage under concurrent requests
+
+Usage: ./benchmarks/bench_async.py [requests] [concurrency ...]
+
+Each simulated request looks up one State by id, lists every State and
+releases its session, as the states pages of web_flask do. For each
+concurrency level, <requests> requests (5000 by default) are served:
+  - sync: by a pool of <concurrency> threads, one per request in flight,
+    calling the storage directly;
+  - async: by <concurrency> asyncio tasks on one event loop, awaiting
+    the asyncio facade (whose file storage pool has 8 threads).
+FileStorage is measured on 100 States. DBStorage and AsyncDBStorage are
+measured on a temporary SQLite file when aiosqlite is installed.
+"""
+import asyncio
+import sys
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models import storage
+from models.engine.async_file_storage import AsyncFileStorage
+from models.engine.db_storage import DBStorage
+from models.state import State
+
+
+def serve_sync(store, get, ids, requests, concurrency):
+    """Returns requests per second and threads used, thread per request
+
+    get(id) looks a State up by id in store.
+    """
+    def request(i):
+        get(ids[i % len(ids)])
+        store.all(State)
+        store.close()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(request, range(requests)))
+        threads = threading.active_count()
+    return requests / (time.perf_counter() - start), threads
+
+
+def serve_async(open_store, ids, requests, concurrency):
+    """Returns requests per second and threads used, on one event loop"""
+    async def main():
+        store = await open_store()
+        counter = iter(range(requests))
+
+        async def worker():
+            for i in counter:
+                await store.aget(State, ids[i % len(ids)])
+                await store.aall(State)
+                await store.arelease()
+        start = time.perf_counter()
+        await asyncio.gather(*[worker() for i in range(concurrency)])
+        rate = requests / (time.perf_counter() - start)
+        return rate, threading.active_count(), store
+    rate, threads, store = asyncio.run(main())
+    if hasattr(store, 'shutdown'):
+        store.shutdown()
+    return rate, threads
+
+
+def report(engine, mode, concurrency, result):
+    """Prints one line of results"""
+    print("{:>6} {:>6} {:>12} {:>10.0f} {:>8}".format(
+        engine, mode, concurrency, *result))
+
+
+def bench_file(requests, levels):
+    """Runs the FileStorage rounds"""
+    storage.reset()
+    states = [State(name="state_{}".format(i)) for i in range(100)]
+    storage.bulk_new(states)
+    ids = [state.id for state in states]
+
+    async def open_store():
+        return AsyncFileStorage(storage, workers=8)
+    for concurrency in levels:
+        report("file", "sync", concurrency,
+               serve_sync(storage, lambda id: storage.get(State, id), ids,
+                          requests, concurrency))
+        report("file", "async", concurrency,
+               serve_async(open_store, ids, requests, concurrency))
+    os.remove('file.json')
+
+
+def bench_db(requests, levels):
+    """Runs the DBStorage rounds if the asyncio drivers are installed"""
+    try:
+        from models.engine.async_db_storage import AsyncDBStorage
+        import aiosqlite
+    except ImportError:
+        print("    db skipped: needs sqlalchemy[asyncio] and aiosqlite")
+        return
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    os.environ['HBNB_DB_URL'] = 'sqlite:///' + path
+    try:
+        db = DBStorage()
+        db.reload()
+        states = [State(name="state_{}".format(i)) for i in range(100)]
+        db.bulk_new(states)
+        ids = [state.id for state in states]
+
+        async def open_store():
+            store = AsyncDBStorage()
+            await store.areload()
+            return store
+        for concurrency in levels:
+            report("db", "sync", concurrency,
+                   serve_sync(db, lambda id: db.get(State, id), ids,
+                              requests, concurrency))
+            report("db", "async", concurrency,
+                   serve_async(open_store, ids, requests, concurrency))
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    levels = [int(n) for n in sys.argv[2:]] or [10, 100, 1000]
+    print("{:>6} {:>6} {:>12} {:>10} {:>8}".format(
+        "engine", "mode", "concurrency", "req/s", "threads"))
+    bench_file(requests, levels)
+    bench_db(requests, levels)
@@ -0,0 +1,83 @@
+#!/usr/bin/python3
+"""Benchmark per-object saves against bulk_new() on file and SQLite
+
+Usage: ./benchmarks/bench_bulk_insert.py [places] [old limit]
+
+Inserts <places> Places (100000 by default) with one bulk_new() call
+on FileStorage and on DBStorage backed by a temporary SQLite file. The
+old path, new() then save() for every object as BaseModel.save() does,
+rewrites the file or commits once per object, so it is only run for
+the first <old limit> Places (2000 by default) and the rate is shown.
+"""
+import sys
+import os
+import tempfile
+import time
+import uuid
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models import storage
+from models.engine.db_storage import DBStorage
+from models.place import Place
+
+
+def places(count):
+    """Returns count new Places"""
+    city_id = str(uuid.uuid4())
+    user_id = str(uuid.uuid4())
+    return [Place(name="place_{}".format(i), city_id=city_id,
+                  user_id=user_id) for i in range(count)]
+
+
+def one_by_one(engine, objs):
+    """Saves objs one at a time, as BaseModel.save() does"""
+    for obj in objs:
+        engine.new(obj)
+        engine.save()
+
+
+def file_storage():
+    """Returns the file storage emptied of every object"""
+    storage.reset()
+    return storage
+
+
+def db_storage(directory):
+    """Returns a DBStorage on a new SQLite file in directory"""
+    path = os.path.join(directory, "{}.db".format(uuid.uuid4()))
+    os.environ['HBNB_DB_URL'] = 'sqlite:///' + path
+    db = DBStorage()
+    db.reload()
+    return db
+
+
+def timed(func, *args):
+    """Returns the seconds func(*args) took"""
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    limit = min(count, int(sys.argv[2]) if len(sys.argv) > 2 else 2000)
+    directory = tempfile.mkdtemp()
+    os.chdir(directory)
+    print("{:>8} {:>6} {:>8} {:>10} {:>10}".format(
+        "backend", "path", "objects", "time (s)", "obj/s"))
+    for backend in ("file", "sqlite"):
+        for path in ("old", "bulk"):
+            if backend == "file":
+                engine = file_storage()
+            else:
+                engine = db_storage(directory)
+            if path == "old":
+                size = limit
+                seconds = timed(one_by_one, engine, places(size))
+            else:
+                size = count
+                seconds = timed(engine.bulk_new, places(size))
+            print("{:>8} {:>6} {:>8} {:>10.2f} {:>10.0f}".format(
+                backend, path, size, seconds, size / seconds))
+            if backend == "sqlite":
+                engine.close()
@@ -0,0 +1,51 @@
+#!/usr/bin/python3
+"""Benchmark Place.reviews through the foreign-key index against a scan
+
+Usage: ./benchmarks/bench_children.py [size ...]
+
+For each store size, <size> Reviews are spread over size / 10 Places
+and the time to list the reviews of one place through the index is
+compared with filtering every stored Review on place_id.
+"""
+import sys
+import os
+import timeit
+import uuid
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models import storage
+from models.place import Place
+from models.review import Review
+
+
+def scan(place):
+    """Filter every stored Review on place_id"""
+    return [review for review in storage.all(Review).values()
+            if review.place_id == place.id]
+
+
+def fill(size):
+    """Reset storage to size / 10 Places with 10 Reviews each"""
+    storage.reset()
+    places = [Place(name="place_{}".format(i)) for i in range(size // 10)]
+    user_id = str(uuid.uuid4())
+    objs = list(places)
+    for i in range(size):
+        objs.append(Review(text="review_{}".format(i), user_id=user_id,
+                           place_id=places[i % len(places)].id))
+    for obj in objs:
+        storage.new(obj)
+    return places[len(places) // 2]
+
+
+if __name__ == "__main__":
+    sizes = [int(n) for n in sys.argv[1:]] or [10000, 100000, 1000000]
+    print("{:>10} {:>14} {:>14}".format("reviews", "scan (ms)", "index (ms)"))
+    for size in sizes:
+        place = fill(size)
+        assert scan(place) == place.reviews
+        t_scan = min(timeit.repeat(lambda: scan(place), number=1, repeat=5))
+        t_index = min(timeit.repeat(lambda: place.reviews,
+                                    number=1, repeat=5))
+        print("{:>10} {:>14.3f} {:>14.3f}".format(size, t_scan * 1000,
+                                                  t_index * 1000))
@@ -0,0 +1,57 @@
+#!/usr/bin/python3
+"""Benchmark the JSON and binary snapshot codecs of FileStorage
+
+Usage: ./benchmarks/bench_codecs.py [objects]
+
+<objects> States and Places (100000 by default) are saved and reloaded
+with each codec from models.engine.codec; save time (every object
+encoded), file size and reload time are reported.
+"""
+import sys
+import os
+import tempfile
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models import storage
+from models.engine.codec import codecs
+from models.engine.file_storage import FileStorage
+from models.place import Place
+from models.state import State
+
+
+def forget():
+    """Drop every in-memory object and cached fragment"""
+    storage.reset()
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    os.chdir(tempfile.mkdtemp())
+    forget()
+    for i in range(size):
+        if i % 2:
+            storage.new(State(name="state_{}".format(i)))
+        else:
+            storage.new(Place(name="place_{}".format(i), number_rooms=i % 5,
+                              price_by_night=i % 300, latitude=0.5 * i,
+                              city_id="city", user_id="user"))
+    print("{} objects".format(size))
+    print("{:>8} {:>10} {:>12} {:>10}".format("codec", "save (s)",
+                                              "size (KB)", "load (s)"))
+    for name, codec in codecs.items():
+        fs = FileStorage()
+        fs._FileStorage__codec = codec()
+        storage._FileStorage__fragments.clear()
+        start = time.perf_counter()
+        fs.save()
+        t_save = time.perf_counter() - start
+        kbytes = os.path.getsize(fs.snapshot_path) // 1024
+        forget()
+        start = time.perf_counter()
+        fs.reload()
+        t_load = time.perf_counter() - start
+        assert len(storage.all()) == size
+        print("{:>8} {:>10.3f} {:>12} {:>10.3f}".format(name, t_save, kbytes,
+                                                       t_load))
+        os.remove(fs.snapshot_path)
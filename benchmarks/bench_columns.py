@@ -0,0 +1,104 @@
+#!/usr/bin/python3
+"""Benchmark columnar aggregations against Python loops over the objects
+
+Usage: ./benchmarks/bench_columns.py [size ...]
+
+For each store size (1000000 by default), <size> Places spread over
+1000 cities are put in file storage, then four reports are computed
+with a Python loop over storage.all(Place) and with the table returned
+by storage.columns(Place): the mean price_by_night per city, the total
+max_guest of places with a price under 100, the number_rooms histogram
+and the 90th percentile of price_by_night per city. Building the table
+is timed separately, in seconds, and the reports in milliseconds.
+"""
+import sys
+import os
+import random
+import timeit
+from collections import Counter, defaultdict
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models import storage
+from models.place import Place
+
+
+def fill(size):
+    """Reset storage to <size> Places"""
+    storage.reset()
+    rand = random.Random(0)
+    cities = ["city_{}".format(i) for i in range(1000)]
+    for i in range(size):
+        storage.new(Place(name="place_{}".format(i), user_id="u",
+                          city_id=rand.choice(cities),
+                          price_by_night=rand.randint(20, 500),
+                          max_guest=rand.randint(1, 10),
+                          number_rooms=rand.randint(1, 6)))
+
+
+def loop_mean_price():
+    """Mean price per city, as a loop"""
+    sums, counts = defaultdict(int), defaultdict(int)
+    for place in storage.all(Place).values():
+        sums[place.city_id] += place.price_by_night
+        counts[place.city_id] += 1
+    return {city: sums[city] / counts[city] for city in sums}
+
+
+def loop_guests():
+    """Total guests of the cheap places, as a loop"""
+    return sum(place.max_guest for place in storage.all(Place).values()
+               if place.price_by_night < 100)
+
+
+def loop_rooms():
+    """Histogram of the number of rooms, as a loop"""
+    return Counter(place.number_rooms
+                   for place in storage.all(Place).values())
+
+
+def loop_p90():
+    """90th percentile of the price per city, as a loop"""
+    prices = defaultdict(list)
+    for place in storage.all(Place).values():
+        prices[place.city_id].append(place.price_by_night)
+    resu = {}
+    for city, values in prices.items():
+        values.sort()
+        position = (len(values) - 1) * 0.9
+        low = int(position)
+        high = min(low + 1, len(values) - 1)
+        resu[city] = values[low] + (values[high] - values[low]) * \
+            (position - low)
+    return resu
+
+
+REPORTS = [
+    ("mean price per city", loop_mean_price,
+     lambda t: t.group_by('city_id').mean('price_by_night')),
+    ("guests under 100", loop_guests,
+     lambda t: t.filter(price_by_night__lt=100).sum('max_guest')),
+    ("rooms histogram", loop_rooms,
+     lambda t: t.histogram('number_rooms')),
+    ("p90 price per city", loop_p90,
+     lambda t: t.group_by('city_id').percentile('price_by_night', 90)),
+]
+
+
+def best(func):
+    """Returns the best time of one call of func in milliseconds"""
+    return min(timeit.repeat(func, number=1, repeat=3)) * 1000
+
+
+if __name__ == "__main__":
+    sizes = [int(n) for n in sys.argv[1:]] or [1000000]
+    print("{:>8} {:>22} {:>12} {:>12} {:>8}".format(
+        "places", "report", "loop (ms)", "table (ms)", "speedup"))
+    for size in sizes:
+        fill(size)
+        build = timeit.timeit(lambda: storage.columns(Place), number=1)
+        print("{:>8} {:>22} {:>25.3f} s".format(size, "build table", build))
+        table = storage.columns(Place)
+        for name, loop, vectorized in REPORTS:
+            slow, fast = best(loop), best(lambda: vectorized(table))
+            print("{:>8} {:>22} {:>12.1f} {:>12.1f} {:>7.0f}x".format(
+                size, name, slow, fast, slow / fast))
@@ -0,0 +1,96 @@
+#!/usr/bin/python3
+"""Benchmark the memory held by a big store in eager, lazy and compact mode
+
+Usage: ./benchmarks/bench_compact.py [records]
+
+A file.json with <records> records (1000000 by default) spread over
+State, City and Place is written to a temporary directory, then a fresh
+interpreter imports models with eager reload, lazy reload
+(HBNB_FILE_LAZY=1) and compact reload (HBNB_FILE_COMPACT=1). Each
+reports its import time, its resident memory once the store is loaded
+(Linux only) and at its peak, and the time to look up and print 1000
+objects by id.
+"""
+import sys
+import os
+import json
+import subprocess
+import tempfile
+import uuid
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+CHILD = """
+import json, os, resource, sys, time
+start = time.perf_counter()
+import models
+seconds = time.perf_counter() - start
+try:
+    with open('/proc/self/statm') as f:
+        pages = int(f.read().split()[1])
+    current = pages * os.sysconf('SC_PAGE_SIZE') // 1024
+except OSError:
+    current = 0
+keys = json.loads(sys.stdin.read())
+start = time.perf_counter()
+for key in keys:
+    cls, _id = key.split('.')
+    str(models.storage.get(cls, _id))
+print(seconds, current, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+      time.perf_counter() - start)
+"""
+MODES = (("eager", {}), ("lazy", {'HBNB_FILE_LAZY': '1'}),
+         ("compact", {'HBNB_FILE_COMPACT': '1'}))
+
+
+def write_store(records):
+    """Write a synthetic file.json, return 1000 of its keys"""
+    stamp = "2020-02-18T14:21:12.096959"
+    state_ids = [str(uuid.uuid4()) for i in range(50)]
+    city_ids = [str(uuid.uuid4()) for i in range(1000)]
+    keys = []
+    with open('file.json', 'w') as f:
+        f.write('{')
+        for i in range(records):
+            _id = str(uuid.uuid4())
+            val = {'id': _id, 'created_at': stamp, 'updated_at': stamp,
+                   'name': "name_{}".format(i)}
+            if i % 3 == 0:
+                val['__class__'] = 'State'
+            elif i % 3 == 1:
+                val.update(__class__='City', state_id=state_ids[i % 50])
+            else:
+                val.update(__class__='Place', city_id=city_ids[i % 1000],
+                           user_id=state_ids[i % 50], number_rooms=i % 5,
+                           price_by_night=i % 300, latitude=1.5,
+                           longitude=2.5)
+            key = val['__class__'] + '.' + _id
+            if i % max(1, records // 1000) == 0:
+                keys.append(key)
+            f.write('{}"{}": {}'.format(', ' if i else '', key,
+                                        json.dumps(val)))
+        f.write('}')
+    return keys
+
+
+def run(settings, keys):
+    """Import models in a child interpreter with settings, return its
+    (seconds, RSS KB, max RSS KB, lookup seconds)"""
+    env = dict(os.environ, PYTHONPATH=ROOT, **settings)
+    out = subprocess.run([sys.executable, '-c', CHILD], env=env,
+                         input=json.dumps(keys), capture_output=True,
+                         text=True, check=True).stdout
+    seconds, current, rss, lookups = out.split()
+    return float(seconds), int(current), int(rss), float(lookups)
+
+
+if __name__ == "__main__":
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    os.chdir(tempfile.mkdtemp())
+    keys = write_store(records)
+    print("{} records".format(records))
+    for name, settings in MODES:
+        seconds, current, rss, lookups = run(settings, keys)
+        print("{:>8}: {:8.3f} s load  {:10d} KB RSS  {:10d} KB peak RSS"
+              "  {:6.3f} s for {} lookups".format(
+                  name, seconds, current, rss, lookups, len(keys)))
+    os.remove('file.json')
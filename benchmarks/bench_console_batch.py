@@ -0,0 +1,65 @@
+#!/usr/bin/python3
+"""Benchmark a console script run command by command and as one batch
+
+Usage: ./benchmarks/bench_console_batch.py [commands]
+
+A file.json of <commands> / 2 States is written to a temporary
+directory, then a script of <commands> lines (10000 by default) is piped
+into console.py: half create a State, a quarter update a stored State
+and a quarter destroy one. The script runs once as is, saving storage
+after every command, and once with --batch, saving it at EOF. Wall time
+and throughput are reported for each run.
+"""
+import sys
+import os
+import json
+import subprocess
+import tempfile
+import time
+import uuid
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+STAMP = "2020-02-18T14:21:12.096959"
+
+
+def write_store(size):
+    """Write a file.json of size States, return their ids"""
+    ids = [str(uuid.uuid4()) for i in range(size)]
+    with open('file.json', 'w') as f:
+        json.dump({'State.' + _id: {'id': _id, 'created_at': STAMP,
+                                    'updated_at': STAMP, 'name': "s",
+                                    '__class__': 'State'}
+                   for _id in ids}, f)
+    return ids
+
+
+def script(commands, ids):
+    """Returns the lines of the script"""
+    lines = ["create State"] * (commands // 2)
+    for i, _id in enumerate(ids[:commands - len(lines)]):
+        if i % 2:
+            lines.append("destroy State {}".format(_id))
+        else:
+            lines.append('update State {} name "Ohio"'.format(_id))
+    return '\n'.join(lines) + '\n'
+
+
+def run(text, *flags):
+    """Pipe text into console.py, return the wall time in seconds"""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, os.path.join(ROOT, 'console.py')] +
+                   list(flags), input=text, text=True, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                   env=dict(os.environ, PYTHONPATH=ROOT))
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    commands = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    os.chdir(tempfile.mkdtemp())
+    for name, flags in (("per command", ()), ("batch", ("--batch",))):
+        text = script(commands, write_store(commands // 2))
+        seconds = run(text, *flags)
+        print("{:>12}: {} commands in {:8.3f} s ({:8.0f} commands/s)".format(
+            name, commands, seconds, commands / seconds))
+    os.remove('file.json')
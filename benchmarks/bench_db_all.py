@@ -0,0 +1,104 @@
+#!/usr/bin/python3
+"""Benchmark DBStorage.all() on a SQLite stand-in for MySQL
+
+Usage: ./benchmarks/bench_db_all.py [rows] [batch ...]
+
+Seeds a temporary SQLite database with <rows> rows (1000000 by default)
+spread over the six mapped tables, then times all(State), all(Place)
+and all() for each batch size passed to yield_per (HBNB_DB_BATCH).
+"""
+import sys
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models.engine.db_storage import DBStorage
+from models.base_model import Base
+from models.place import Place
+from models.state import State
+
+# share of the rows going to each table, parents first
+SHARES = [("states", 0.01), ("cities", 0.04), ("users", 0.05),
+          ("amenities", 0.05), ("places", 0.30), ("reviews", 0.55)]
+
+
+def seed(engine, rows, chunk=20000):
+    """Inserts <rows> rows with valid foreign keys, chunk rows at a time"""
+    now = datetime.utcnow()
+    ids = {}
+    with engine.begin() as conn:
+        for table_name, share in SHARES:
+            table = Base.metadata.tables[table_name]
+            count = max(1, int(rows * share))
+            ids[table_name] = [str(uuid.uuid4()) for i in range(count)]
+            for start in range(0, count, chunk):
+                batch = []
+                for i in range(start, min(start + chunk, count)):
+                    row = {"id": ids[table_name][i], "created_at": now,
+                           "updated_at": now}
+                    row.update(columns(table_name, i, ids))
+                    batch.append(row)
+                conn.execute(table.insert(), batch)
+
+
+def columns(table_name, i, ids):
+    """Returns the non-BaseModel columns of row i of a table"""
+    def parent(name):
+        return ids[name][i % len(ids[name])]
+    name = "{}_{}".format(table_name, i)
+    if table_name == "cities":
+        return {"name": name, "state_id": parent("states")}
+    if table_name == "users":
+        return {"email": name + "@hbnb.io", "password": "pwd"}
+    if table_name == "places":
+        return {"name": name, "city_id": parent("cities"),
+                "user_id": parent("users")}
+    if table_name == "reviews":
+        return {"text": name, "place_id": parent("places"),
+                "user_id": parent("users")}
+    return {"name": name}
+
+
+def open_storage(path, batch):
+    """Returns a reloaded DBStorage on the SQLite file at path"""
+    os.environ['HBNB_DB_URL'] = 'sqlite:///' + path
+    os.environ['HBNB_DB_BATCH'] = str(batch)
+    storage = DBStorage()
+    storage.reload()
+    return storage
+
+
+def timed(storage, cls):
+    """Returns (seconds, object count) of one all(cls) in a new session"""
+    storage.close()
+    start = time.perf_counter()
+    count = len(storage.all(cls))
+    return time.perf_counter() - start, count
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    batches = [int(n) for n in sys.argv[2:]] or [100, 1000, 10000]
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        storage = open_storage(path, batches[0])
+        start = time.perf_counter()
+        seed(storage._DBStorage__engine, rows)
+        print("seeded {} rows in {:.1f}s".format(
+            rows, time.perf_counter() - start))
+        print("{:>8} {:>10} {:>10} {:>10} {:>10}".format(
+            "batch", "target", "objects", "time (s)", "obj/s"))
+        for batch in batches:
+            storage = open_storage(path, batch)
+            for cls in (State, Place, None):
+                seconds, count = timed(storage, cls)
+                print("{:>8} {:>10} {:>10} {:>10.2f} {:>10.0f}".format(
+                    batch, cls.__name__ if cls else "all", count, seconds,
+                    count / seconds))
+            storage.close()
+    finally:
+        os.remove(path)
@@ -0,0 +1,69 @@
+#!/usr/bin/python3
+"""Benchmark the DBStorage cache on the reads of the web pages
+
+Usage: ./benchmarks/bench_db_cache.py [rows] [requests] [latency_ms]
+
+Seeds a temporary SQLite database with <rows> rows (5000 by default:
+50 states and 250 amenities) as bench_db_all.py does, then serves
+<requests> simulated requests (1000 by default), each reading
+all(State), all(Amenity) and one State by name in a new session,
+without the cache and with HBNB_DB_CACHE_SIZE=1000. SQLite runs in
+process, so every statement can be made to wait <latency_ms> (0 by
+default) to stand for the round trip to a MySQL server.
+"""
+import sys
+import os
+import tempfile
+import time
+from sqlalchemy import event
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bench_db_all import seed
+from models.engine.db_storage import DBStorage
+from models.amenity import Amenity
+from models.state import State
+
+
+def open_storage(path, cache_size, latency=0):
+    """Returns a DBStorage on path whose statements wait latency seconds"""
+    os.environ['HBNB_DB_URL'] = 'sqlite:///' + path
+    os.environ['HBNB_DB_CACHE_SIZE'] = str(cache_size)
+    storage = DBStorage()
+    storage.reload()
+    if latency:
+        event.listen(storage._DBStorage__engine, 'before_cursor_execute',
+                     lambda *args: time.sleep(latency))
+    return storage
+
+
+def serve(storage, requests):
+    """Returns the milliseconds per request of <requests> requests"""
+    start = time.perf_counter()
+    for i in range(requests):
+        storage.all(State)
+        storage.all(Amenity)
+        storage.query(State).filter(name="states_{}".format(i % 10)).first()
+        storage.close()
+    return (time.perf_counter() - start) * 1000 / requests
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    latency = float(sys.argv[3]) / 1000 if len(sys.argv) > 3 else 0
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        storage = open_storage(path, 0)
+        seed(storage._DBStorage__engine, rows)
+        print("{:>8} {:>14} {:>10}".format("cache", "ms/request", "hit rate"))
+        for size in (0, 1000):
+            storage = open_storage(path, size, latency)
+            ms = serve(storage, requests)
+            stats = storage.cache_stats()
+            rate = "-" if stats is None else "{:.1%}".format(
+                stats['hits'] / (stats['hits'] + stats['misses']))
+            print("{:>8} {:>14.2f} {:>10}".format(size, ms, rate))
+            storage.close()
+    finally:
+        os.remove(path)
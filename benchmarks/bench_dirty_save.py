@@ -0,0 +1,52 @@
+#!/usr/bin/python3
+"""Benchmark FileStorage.save() with one dirty object in a large store
+
+Usage: ./benchmarks/bench_dirty_save.py [size]
+
+The store is filled with <size> BaseModels (500000 by default) and saved
+once. One object is then modified and the store saved again, first the
+way save() used to work (to_dict() and json.dump of every object), then
+through FileStorage.save(), which only re-encodes the dirty object.
+"""
+import sys
+import os
+import json
+import tempfile
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models import storage
+from models.base_model import BaseModel
+
+
+def full_save():
+    """Serialize every object, as FileStorage.save() used to"""
+    temp = {}
+    for key, obj in storage.all().items():
+        temp[key] = obj.to_dict()
+    with open('file.json', 'w') as f:
+        json.dump(temp, f)
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    os.chdir(tempfile.mkdtemp())
+    objs = [BaseModel() for i in range(size)]
+    for obj in objs:
+        storage.new(obj)
+    storage.save()
+
+    objs[size // 2].name = "dirty"
+    start = time.perf_counter()
+    full_save()
+    t_full = time.perf_counter() - start
+
+    objs[size // 2].name = "dirtier"
+    start = time.perf_counter()
+    storage.save()
+    t_dirty = time.perf_counter() - start
+
+    os.remove('file.json')
+    print("{} objects, 1 dirty".format(size))
+    print("full re-serialization: {:8.3f} s".format(t_full))
+    print("dirty tracking:        {:8.3f} s".format(t_dirty))
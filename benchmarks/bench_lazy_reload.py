@@ -0,0 +1,60 @@
+#!/usr/bin/python3
+"""Benchmark startup time and peak RSS of importing models on a big store
+
+Usage: ./benchmarks/bench_lazy_reload.py [records]
+
+A file.json with <records> records (1000000 by default) spread over
+State, City and BaseModel is written to a temporary directory, then a
+fresh interpreter imports models with eager and with lazy reload
+(HBNB_FILE_LAZY=1) and reports its import time and peak RSS.
+"""
+import sys
+import os
+import json
+import subprocess
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+CHILD = """
+import resource, time
+start = time.perf_counter()
+import models
+print(time.perf_counter() - start,
+      resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def write_store(records):
+    """Write a synthetic file.json with the given number of records"""
+    stamp = "2020-02-18T14:21:12.096959"
+    classes = ('State', 'City', 'BaseModel')
+    with open('file.json', 'w') as f:
+        f.write('{')
+        for i in range(records):
+            cls = classes[i % len(classes)]
+            _id = "{:08d}-0000-4000-8000-000000000000".format(i)
+            val = {'id': _id, 'created_at': stamp, 'updated_at': stamp,
+                   'name': "name_{}".format(i), '__class__': cls}
+            f.write('{}"{}.{}": {}'.format(', ' if i else '', cls, _id,
+                                           json.dumps(val)))
+        f.write('}')
+
+
+def run(lazy):
+    """Import models in a child interpreter, return (seconds, max RSS KB)"""
+    env = dict(os.environ, PYTHONPATH=ROOT, HBNB_FILE_LAZY=lazy)
+    out = subprocess.check_output([sys.executable, '-c', CHILD], env=env)
+    seconds, rss = out.split()
+    return float(seconds), int(rss)
+
+
+if __name__ == "__main__":
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    os.chdir(tempfile.mkdtemp())
+    write_store(records)
+    print("{} records".format(records))
+    for name, lazy in (("eager", "0"), ("lazy", "1")):
+        seconds, rss = run(lazy)
+        print("{:>6}: {:8.3f} s  {:10d} KB peak RSS".format(name, seconds,
+                                                          rss))
+    os.remove('file.json')
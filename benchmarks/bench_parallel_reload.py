@@ -0,0 +1,82 @@
+#!/usr/bin/python3
+"""Benchmark reload wall time against the number of worker processes
+
+Usage: ./benchmarks/bench_parallel_reload.py [records [workers ...]]
+
+A file.json with <records> records (1000000 by default) spread over
+State, City and Place is written to a temporary directory, then a fresh
+interpreter imports models with HBNB_FILE_WORKERS set to each worker
+count (1, 2, 4, 8 and 16 by default), once with eager reload and once
+with lazy reload (HBNB_FILE_LAZY=1), and reports the import time.
+Worker counts past the number of CPUs cannot go faster; the CPU count
+is printed first.
+"""
+import sys
+import os
+import json
+import subprocess
+import tempfile
+import uuid
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+CHILD = """
+import time
+start = time.perf_counter()
+import models
+print(time.perf_counter() - start, models.storage.count())
+"""
+
+
+def write_store(records):
+    """Write a synthetic file.json of records records"""
+    stamp = "2020-02-18T14:21:12.096959"
+    state_ids = [str(uuid.uuid4()) for i in range(50)]
+    city_ids = [str(uuid.uuid4()) for i in range(1000)]
+    with open('file.json', 'w') as f:
+        f.write('{')
+        for i in range(records):
+            _id = str(uuid.uuid4())
+            val = {'id': _id, 'created_at': stamp, 'updated_at': stamp,
+                   'name': "name_{}".format(i)}
+            if i % 3 == 0:
+                val['__class__'] = 'State'
+            elif i % 3 == 1:
+                val.update(__class__='City', state_id=state_ids[i % 50])
+            else:
+                val.update(__class__='Place', city_id=city_ids[i % 1000],
+                           user_id=state_ids[i % 50], number_rooms=i % 5,
+                           price_by_night=i % 300, latitude=1.5,
+                           longitude=2.5)
+            f.write('{}"{}.{}": {}'.format(', ' if i else '',
+                                           val['__class__'], _id,
+                                           json.dumps(val)))
+        f.write('}')
+
+
+def run(settings):
+    """Import models in a child interpreter, return (seconds, count)"""
+    env = dict(os.environ, PYTHONPATH=ROOT, **settings)
+    out = subprocess.run([sys.executable, '-c', CHILD], env=env,
+                         capture_output=True, text=True,
+                         check=True).stdout
+    seconds, count = out.split()
+    return float(seconds), int(count)
+
+
+if __name__ == "__main__":
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    workers = [int(n) for n in sys.argv[2:]] or [1, 2, 4, 8, 16]
+    os.chdir(tempfile.mkdtemp())
+    write_store(records)
+    print("{} records, {} MB, {} CPUs".format(
+        records, os.path.getsize('file.json') >> 20, os.cpu_count()))
+    print("{:>8} {:>10} {:>10}".format("workers", "eager (s)", "lazy (s)"))
+    for count in workers:
+        times = []
+        for lazy in ('', '1'):
+            seconds, found = run({'HBNB_FILE_WORKERS': str(count),
+                                  'HBNB_FILE_LAZY': lazy})
+            assert found == records
+            times.append(seconds)
+        print("{:>8} {:10.3f} {:10.3f}".format(count, *times))
+    os.remove('file.json')
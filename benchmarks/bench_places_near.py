@@ -0,0 +1,87 @@
+#!/usr/bin/python3
+"""Benchmark storage.places_near() against a linear scan
+
+Usage: ./benchmarks/bench_places_near.py [size ...]
+
+For each store size, <size> Places are scattered over a 10 x 10 degree
+square and the 20 places nearest to its centre within 25 km are looked
+up three ways: a linear scan computing the distance to every stored
+Place, places_near() on FileStorage (grid index) and places_near() on
+DBStorage backed by a temporary SQLite file (bounding-box query).
+"""
+import sys
+import os
+import random
+import tempfile
+import timeit
+from unittest.mock import patch
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models import storage
+from models.engine import geo
+from models.engine.db_storage import DBStorage
+from models.place import Place
+
+LAT, LON, RADIUS, LIMIT = 45.0, 5.0, 25, 20
+
+
+def scan():
+    """The nearest places by distance to every stored Place"""
+    found = []
+    for place in storage.all(Place).values():
+        km = geo.distance(LAT, LON, place.latitude, place.longitude)
+        if km <= RADIUS:
+            found.append((km, place.id, place))
+    return [place for km, i, place in sorted(found)[:LIMIT]]
+
+
+def places(size):
+    """Returns <size> Places scattered around (LAT, LON)"""
+    rand = random.Random(0)
+    return [Place(name="place_{}".format(i), city_id="c", user_id="u",
+                  latitude=LAT + rand.uniform(-5, 5),
+                  longitude=LON + rand.uniform(-5, 5))
+            for i in range(size)]
+
+
+def fill(size):
+    """Reset file storage to <size> Places"""
+    storage.reset()
+    storage.bulk_new(places(size))
+
+
+def open_db(path, size):
+    """Returns a DBStorage on a SQLite file holding <size> Places"""
+    with patch.dict(os.environ, {'HBNB_DB_URL': 'sqlite:///' + path}):
+        db = DBStorage()
+    db.reload()
+    db.bulk_new(places(size))
+    return db
+
+
+def best(func):
+    """Returns the best time of func in milliseconds"""
+    return min(timeit.repeat(func, number=1, repeat=5)) * 1000
+
+
+if __name__ == "__main__":
+    sizes = [int(n) for n in sys.argv[1:]] or [100000, 1000000]
+    print("{:>10} {:>12} {:>12} {:>12}".format(
+        "places", "scan (ms)", "grid (ms)", "sqlite (ms)"))
+    for size in sizes:
+        fill(size)
+        grid = storage.places_near(LAT, LON, RADIUS, LIMIT)
+        assert [p.id for p in grid] == [p.id for p in scan()]
+        fd, path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        try:
+            db = open_db(path, size)
+            near = db.places_near(LAT, LON, RADIUS, LIMIT)
+            assert [p.name for p in near] == [p.name for p in grid]
+            print("{:>10} {:>12.3f} {:>12.3f} {:>12.3f}".format(
+                size, best(scan),
+                best(lambda: storage.places_near(LAT, LON, RADIUS, LIMIT)),
+                best(lambda: db.places_near(LAT, LON, RADIUS, LIMIT))))
+            db.close()
+        finally:
+            os.remove(path)
@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+"""Benchmark range and top-k Place queries with and without sorted indexes
+
+Usage: ./benchmarks/bench_range_query.py [size ...]
+
+For each store size, <size> Places with random prices and guest counts
+are stored and three queries are timed as a linear scan of all(Place)
+and through storage.query() once Place.price_by_night has a sorted
+index: a 1% price range, a price range combined with a guest count,
+and the ten most expensive places.
+"""
+import sys
+import os
+import random
+import timeit
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models import storage
+from models.place import Place
+
+
+def scans():
+    """The queries as linear scans of every stored Place"""
+    def in_range():
+        return [p for p in storage.all(Place).values()
+                if 100 <= p.price_by_night < 110]
+
+    def in_range_for_four():
+        return [p for p in storage.all(Place).values()
+                if 100 <= p.price_by_night < 200 and p.max_guest >= 4]
+
+    def top_ten():
+        return sorted(storage.all(Place).values(),
+                      key=lambda p: p.price_by_night, reverse=True)[:10]
+    return [in_range, in_range_for_four, top_ten]
+
+
+def queries():
+    """The same queries through storage.query()"""
+    places = storage.query(Place)
+    return [
+        lambda: list(places.filter(price_by_night__ge=100,
+                                   price_by_night__lt=110)),
+        lambda: list(places.filter(price_by_night__ge=100,
+                                   price_by_night__lt=200,
+                                   max_guest__ge=4)),
+        lambda: list(places.order_by("-price_by_night").limit(10))]
+
+
+def fill(size):
+    """Reset storage to <size> Places"""
+    storage.reset()
+    rand = random.Random(0)
+    for i in range(size):
+        storage.new(Place(name="place_{}".format(i),
+                          price_by_night=rand.randrange(1000),
+                          max_guest=rand.randrange(1, 9)))
+
+
+def best(func):
+    """Returns the best time of func in milliseconds"""
+    return min(timeit.repeat(func, number=1, repeat=5)) * 1000
+
+
+if __name__ == "__main__":
+    sizes = [int(n) for n in sys.argv[1:]] or [10000, 100000, 1000000]
+    names = ["range 1%", "range + guests", "top 10"]
+    print("{:>10} {:>16} {:>12} {:>12}".format(
+        "places", "query", "scan (ms)", "index (ms)"))
+    for size in sizes:
+        fill(size)
+        storage.add_index(Place, "price_by_night")
+        for name, scan, query in zip(names, scans(), queries()):
+            prices = [sorted(p.price_by_night for p in func())
+                      for func in (scan, query)]
+            assert prices[0] == prices[1]
+            print("{:>10} {:>16} {:>12.3f} {:>12.3f}".format(
+                size, name, best(scan), best(query)))
@@ -0,0 +1,84 @@
+#!/usr/bin/python3
+"""Benchmark the full-text index behind storage.search()
+
+Usage: ./benchmarks/bench_search.py [size ...]
+
+For each store size, <size> Places with 150-word descriptions drawn from
+a 20000-word vocabulary are stored, then:
+  - the index is built from scratch and read back from its saved file
+    (HBNB_FILE_SEARCH_INDEX=1), reported in places per second;
+  - single updates of a description are timed, in microseconds;
+  - one-word and three-word searches for the ten best places are timed
+    against a substring scan of every description, in milliseconds.
+"""
+import sys
+import os
+import random
+import timeit
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models import storage
+from models.engine.file_storage import FileStorage
+from models.place import Place
+
+WORDS = ["w{}".format(i) for i in range(20000)]
+
+
+def text(rand):
+    """Returns a random 150-word description"""
+    return ' '.join(rand.choice(WORDS) for i in range(150))
+
+
+def fill(size):
+    """Reset storage to <size> Places"""
+    storage.reset()
+    rand = random.Random(0)
+    storage.bulk_new([Place(name="place_{}".format(i), description=text(rand))
+                      for i in range(size)])
+
+
+def scan(words):
+    """The places whose description contains any word, as a scan"""
+    return [p for p in storage.all(Place).values()
+            if any(word in p.description for word in words)][:10]
+
+
+def seconds(func):
+    """Returns how long one call of func takes, in seconds"""
+    return timeit.timeit(func, number=1)
+
+
+def best(func, number=1):
+    """Returns the best time of one call of func in milliseconds"""
+    return min(timeit.repeat(func, number=number, repeat=5)) * 1000 / number
+
+
+if __name__ == "__main__":
+    sizes = [int(n) for n in sys.argv[1:]] or [10000, 100000]
+    storage._FileStorage__search_index = True
+    texts = FileStorage._FileStorage__texts
+    print("{:>10} {:>26} {:>12}".format("places", "measure", "value"))
+    for size in sizes:
+        fill(size)
+        build = seconds(lambda: storage.search(Place, "w1"))
+        storage.save()
+        texts.clear()
+        load = seconds(lambda: storage.search(Place, "w1"))
+        place = next(iter(storage.all(Place).values()))
+        rand = random.Random(1)
+
+        def update():
+            place.description = text(rand)
+        rows = [("build (places/s)", size / build),
+                ("load saved (places/s)", size / load),
+                ("update (us)", best(update, 100) * 1000)]
+        for words in (["w42"], ["w42", "w4242", "w17"]):
+            query = ' '.join(words)
+            rows.append(("search {} word(s) (ms)".format(len(words)),
+                         best(lambda: storage.search(Place, query, 10))))
+            rows.append(("scan {} word(s) (ms)".format(len(words)),
+                         best(lambda: scan(words))))
+        for name, value in rows:
+            print("{:>10} {:>26} {:>12.1f}".format(size, name, value))
+        os.remove(storage.search_path('Place'))
+    os.remove('file.json')
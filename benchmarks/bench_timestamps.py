@@ -0,0 +1,94 @@
+#!/usr/bin/python3
+"""Benchmark the per-object cost of the BaseModel timestamp codec
+
+Usage: ./benchmarks/bench_timestamps.py [objects]
+
+For each model class, <objects> records (10000 by default) shaped like
+the ones reload() reads are turned into objects (load: cls(**record))
+and back into dictionaries (dump: obj.to_dict()). Both are timed with
+the strptime/strftime codec BaseModel used before and with parse_time/
+format_time from models.engine.codec, along with the part of each
+spent converting the two timestamps alone. Half the records have
+created_at == updated_at, as objects never updated since their creation
+do.
+"""
+import sys
+import os
+import timeit
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import models.base_model
+from models.engine.codec import TIME_FORMAT, format_time, parse_time
+from models.base_model import BaseModel
+from models.amenity import Amenity
+from models.city import City
+from models.place import Place
+from models.review import Review
+from models.state import State
+from models.user import User
+
+ATTRS = {
+    BaseModel: {},
+    User: {'email': "a@b.c", 'password': "pwd", 'first_name': "Ann"},
+    State: {'name': "Ohio"},
+    City: {'name': "Akron", 'state_id': "state"},
+    Amenity: {'name': "Wifi"},
+    Place: {'name': "Loft", 'city_id': "city", 'user_id': "user",
+            'number_rooms': 2, 'price_by_night': 80, 'latitude': 1.5},
+    Review: {'text': "Nice", 'place_id': "place", 'user_id': "user"},
+}
+CODECS = (
+    ("before", lambda text: datetime.strptime(text, TIME_FORMAT),
+     lambda value: value.strftime(TIME_FORMAT)),
+    ("after", parse_time, format_time),
+)
+
+
+def records(cls, size):
+    """Returns <size> to_dict() style records of cls"""
+    start = datetime(2020, 2, 18, 14, 21, 12, 96959)
+    resu = []
+    for i in range(size):
+        created = start + timedelta(seconds=i, microseconds=i)
+        updated = created if i % 2 else created + timedelta(hours=1)
+        record = dict(ATTRS[cls], id="id-{}".format(i),
+                      created_at=created.strftime(TIME_FORMAT),
+                      updated_at=updated.strftime(TIME_FORMAT),
+                      __class__=cls.__name__)
+        resu.append(record)
+    return resu
+
+
+def use(parse, dump):
+    """Makes BaseModel read and write timestamps with parse and dump"""
+    models.base_model.parse_time = parse
+    models.base_model.format_time = dump
+
+
+def best(func, size):
+    """Returns the best time of func in microseconds per object"""
+    return min(timeit.repeat(func, number=1, repeat=3)) / size * 1e6
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    print("{:>10} {:>6} {:>10} {:>12} {:>10} {:>12}".format(
+        "class", "codec", "load (us)", "of which ts", "dump (us)",
+        "of which ts"))
+    for cls in ATTRS:
+        dicts = records(cls, size)
+        for name, parse, dump in CODECS:
+            use(parse, dump)
+            objs = [cls(**record) for record in dicts]
+            load = best(lambda: [cls(**r) for r in dicts], size)
+            parsing = best(lambda: [(parse(r['created_at']),
+                                     parse(r['updated_at']))
+                                    for r in dicts], size)
+            dumping = best(lambda: [o.to_dict() for o in objs], size)
+            formatting = best(lambda: [(dump(o.created_at),
+                                        dump(o.updated_at))
+                                       for o in objs], size)
+            print("{:>10} {:>6} {:10.2f} {:12.2f} {:10.2f} {:12.2f}".format(
+                cls.__name__, name, load, parsing, dumping, formatting))
+    use(parse_time, format_time)
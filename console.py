@@ -1,9 +1,15 @@
 #!/usr/bin/python3
 """ Console Module """
 import cmd
+import re
+import shlex
 import sys
+import time
+from datetime import datetime
+from sqlalchemy import inspect
+from sqlalchemy.exc import SQLAlchemyError
 from models.base_model import BaseModel
-from models.__init__ import storage
+from models import storage
 from models.user import User
 from models.place import Place
 from models.state import State
@@ -29,6 +35,12 @@ class HBNBCommand(cmd.Cmd):
              'max_guest': int, 'price_by_night': int,
              'latitude': float, 'longitude': float
             }
+    ops = {'=': 'eq', '!=': 'ne', '<': 'lt', '<=': 'le', '>': 'gt', '>=': 'ge'}
+    # commands that open, close or end a batch are not counted in it
+    batch_cmds = ['begin', 'commit', 'quit', 'EOF']
+
+    # [start time, commands run] while a batch defers saving storage
+    batch = None
 
     def preloop(self):
         """Prints if isatty is false"""
@@ -43,6 +55,10 @@ class HBNBCommand(cmd.Cmd):
         """
         _cmd = _cls = _id = _args = ''  # initialize line elements
 
+        if self.batch is not None and line.strip() and \
+                line.split()[0] not in HBNBCommand.batch_cmds:
+            self.batch[1] += 1
+
         # scan for general formating - i.e '.', '(', ')'
         if not ('.' in line and '(' in line and ')' in line):
             return line
@@ -94,6 +110,9 @@ class HBNBCommand(cmd.Cmd):
 
     def do_quit(self, command):
         """ Method to exit the HBNB console"""
+        if self.batch is not None:
+            self.do_commit('')
+        storage.close()
         exit()
 
     def help_quit(self):
@@ -103,6 +122,9 @@ class HBNBCommand(cmd.Cmd):
     def do_EOF(self, arg):
         """ Handles EOF to exit program """
         print()
+        if self.batch is not None:
+            self.do_commit('')
+        storage.close()
         exit()
 
     def help_EOF(self):
@@ -113,6 +135,47 @@ class HBNBCommand(cmd.Cmd):
         """ Overrides the emptyline method of CMD """
         pass
 
+    def persist(self):
+        """ Saves storage, unless a batch leaves it to commit """
+        if self.batch is None:
+            storage.save()
+
+    def do_begin(self, args):
+        """ Opens a batch: storage is saved once, on commit """
+        if self.batch is not None:
+            print("** batch already open **")
+            return
+        self.batch = [time.perf_counter(), 0]
+
+    def help_begin(self):
+        """ Help information for the begin command """
+        print("Defers saving until commit, quit or EOF, so that a script")
+        print("is saved once (in db mode, as one transaction)")
+        print("[Usage]: begin\n")
+
+    def do_commit(self, args):
+        """ Saves storage once for the open batch and reports throughput"""
+        if self.batch is None:
+            print("** no batch open **")
+            return
+        start, commands = self.batch
+        self.batch = None
+        try:
+            storage.save()
+        except SQLAlchemyError as e:
+            print("** batch rolled back: {} **".format(getattr(e, 'orig', e)))
+            return
+        seconds = time.perf_counter() - start
+        print("** {} commands in {:.3f} s ({:.0f} commands/s) **".format(
+            commands, seconds, commands / seconds if seconds else 0),
+            file=sys.stderr)
+
+    def help_commit(self):
+        """ Help information for the commit command """
+        print("Saves the changes of the open batch and prints its")
+        print("throughput to stderr")
+        print("[Usage]: commit\n")
+
     def do_create(self, args):
         """ Create an object of any class"""
         if not args:
@@ -122,9 +185,9 @@ class HBNBCommand(cmd.Cmd):
             print("** class doesn't exist **")
             return
         new_instance = HBNBCommand.classes[args]()
-        storage.save()
+        storage.new(new_instance)
+        self.persist()
         print(new_instance.id)
-        storage.save()
 
     def help_create(self):
         """ Help information for the create method """
@@ -153,11 +216,11 @@ class HBNBCommand(cmd.Cmd):
             print("** instance id missing **")
             return
 
-        key = c_name + "." + c_id
-        try:
-            print(storage._FileStorage__objects[key])
-        except KeyError:
+        obj = storage.get(c_name, c_id)
+        if obj is None:
             print("** no instance found **")
+        else:
+            print(obj)
 
     def help_show(self):
         """ Help information for the show command """
@@ -184,13 +247,12 @@ class HBNBCommand(cmd.Cmd):
             print("** instance id missing **")
             return
 
-        key = c_name + "." + c_id
-
-        try:
-            del(storage.all()[key])
-            storage.save()
-        except KeyError:
+        obj = storage.get(c_name, c_id)
+        if obj is None:
             print("** no instance found **")
+        else:
+            storage.delete(obj)
+            self.persist()
 
     def help_destroy(self):
         """ Help information for the destroy command """
@@ -202,35 +264,125 @@ class HBNBCommand(cmd.Cmd):
         print_list = []
 
         if args:
-            args = args.split(' ')[0]  # remove possible trailing args
-            if args not in HBNBCommand.classes:
+            try:  # conditions may follow the class name
+                args = shlex.split(args)
+            except ValueError:
+                print("** invalid condition **")
+                return
+            if args[0] not in HBNBCommand.classes:
                 print("** class doesn't exist **")
                 return
-            for k, v in storage._FileStorage__objects.items():
-                if k.split('.')[0] == args:
+            if len(args) == 1:
+                objs = storage.all(args[0]).values()
+            else:
+                objs = self.parse_query(args[0], args[1:])
+                if objs is None:
+                    return
+            try:
+                for v in objs:
                     print_list.append(str(v))
+            except (TypeError, ValueError):
+                print("** invalid condition **")
+                return
         else:
-            for k, v in storage._FileStorage__objects.items():
+            for v in storage.all().values():
                 print_list.append(str(v))
 
         print(print_list)
 
+    def parse_query(self, c_name, conditions):
+        """ Builds a storage query from <attName><op><value> conditions
+
+        op is one of = != < <= > >=. order_by=[-]<attName>[,...],
+        limit=<n> and offset=<n> sort and page the results. Conditions
+        are split like shell words, so values with spaces are quoted:
+        name="Big house". Returns None after printing an error if a
+        condition is malformed.
+        """
+        query = storage.query(c_name)
+        for condition in conditions:
+            match = re.match(r'(\w+)(<=|>=|!=|<|>|=)(.+)$', condition)
+            if match is None:
+                print("** invalid condition **")
+                return None
+            att_name, op, att_val = match.groups()
+            try:
+                if op == '=' and att_name == 'order_by':
+                    query = query.order_by(*att_val.split(','))
+                elif op == '=' and att_name in ('limit', 'offset'):
+                    query = getattr(query, att_name)(int(att_val))
+                else:
+                    if att_name in HBNBCommand.types:
+                        att_val = HBNBCommand.types[att_name](att_val)
+                    lookup = att_name + '__' + HBNBCommand.ops[op]
+                    query = query.filter(**{lookup: att_val})
+            except (TypeError, ValueError):
+                print("** invalid condition **")
+                return None
+        return query
+
     def help_all(self):
         """ Help information for the all command """
         print("Shows all objects, or all of a class")
-        print("[Usage]: all <className>\n")
+        print("[Usage]: all <className>")
+        print("[Usage]: all <className> <attName><op><value> ... "
+              "[order_by=[-]<attName>] [limit=<n>] [offset=<n>]")
+        print("  <op> is one of = != < <= > >=\n")
+
+    def do_search(self, args):
+        """ Shows the objects of a class matching words, best first"""
+        words = args.split()
+        if not words:
+            print("** class name missing **")
+            return
+        c_name = words.pop(0)
+        if c_name not in HBNBCommand.classes:
+            print("** class doesn't exist **")
+            return
+        limit = None
+        if words and words[-1].startswith('limit='):
+            try:
+                limit = int(words.pop()[len('limit='):])
+            except ValueError:
+                print("** invalid limit **")
+                return
+        if not words:
+            print("** search text missing **")
+            return
+        try:
+            objs = storage.search(c_name, ' '.join(words), limit)
+        except ValueError:
+            print("** class not searchable **")
+            return
+        print([str(obj) for obj in objs])
+
+    def help_search(self):
+        """ Help information for the search command """
+        print("Shows the objects of a class whose text matches words,")
+        print("most relevant first")
+        print("[Usage]: search <className> <word> ... [limit=<n>]\n")
 
     def do_count(self, args):
         """Count current number of class instances"""
-        count = 0
-        for k, v in storage._FileStorage__objects.items():
-            if args == k.split('.')[0]:
-                count += 1
-        print(count)
+        args = args.split()
+        print(storage.count(args[0] if args else None))
 
     def help_count(self):
         """ """
-        print("Usage: count <class_name>")
+        print("Counts the instances of a class, or of every class")
+        print("Usage: count [<class_name>]")
+
+    def do_compact(self, args):
+        """ Compacts the storage journal or record file """
+        if not hasattr(storage, 'compact'):
+            print("** compaction not supported **")
+            return
+        storage.compact()
+
+    def help_compact(self):
+        """ Help information for the compact command """
+        print("Drops superseded records from the storage files")
+        print("[Usage]: compact\n")
 
     def do_update(self, args):
         """ Updates a certain object with new info """
@@ -255,11 +407,9 @@ class HBNBCommand(cmd.Cmd):
             print("** instance id missing **")
             return
 
-        # generate key from class and id
-        key = c_name + "." + c_id
-
-        # determine if key is present
-        if key not in storage.all():
+        # retrieve the object to update
+        new_dict = storage.get(c_name, c_id)
+        if new_dict is None:
             print("** no instance found **")
             return
 
@@ -292,9 +442,6 @@ class HBNBCommand(cmd.Cmd):
 
             args = [att_name, att_val]
 
-        # retrieve dictionary of current objects
-        new_dict = storage.all()[key]
-
         # iterate through attr names and values
         for i, att_name in enumerate(args):
             # block only runs on even iterations
@@ -306,14 +453,31 @@ class HBNBCommand(cmd.Cmd):
                 if not att_val:  # check for att_value
                     print("** value missing **")
                     return
+                if not HBNBCommand.settable(new_dict, att_name):
+                    print("** attribute can't be set **")
+                    return
                 # type cast as necessary
                 if att_name in HBNBCommand.types:
                     att_val = HBNBCommand.types[att_name](att_val)
 
                 # update dictionary with name, value pair
-                new_dict.__dict__.update({att_name: att_val})
+                setattr(new_dict, att_name, att_val)
 
-        new_dict.save()  # save updates to file
+        if self.batch is None:
+            new_dict.save()  # save updates to file
+        else:
+            new_dict.updated_at = datetime.utcnow()
+
+    @staticmethod
+    def settable(obj, att_name):
+        """ Tells if update may set att_name on obj: relationships,
+        properties (the related objects in file mode) and methods are
+        not plain values """
+        attr = getattr(type(obj), att_name, None)
+        if isinstance(attr, property) or callable(attr):
+            return False
+        mapper = inspect(type(obj), raiseerr=False)
+        return mapper is None or att_name not in mapper.relationships
 
     def help_update(self):
         """ Help information for the update class """
@@ -321,4 +485,7 @@ class HBNBCommand(cmd.Cmd):
         print("Usage: update <className> <id> <attName> <attVal>\n")
 
 if __name__ == "__main__":
-    HBNBCommand().cmdloop()
\ No newline at end of file
+    console = HBNBCommand()
+    if '--batch' in sys.argv[1:]:
+        console.do_begin('')
+    console.cmdloop()
\ No newline at end of file
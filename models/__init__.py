@@ -12,3 +12,18 @@ else:
     storage = FileStorage()
 
 storage.reload()
+
+
+async def open_async_storage():
+    """Returns an asyncio facade over the configured storage engine
+
+    In db mode it opens its own asyncio engine, see
+    models.engine.async_db_storage; otherwise it wraps storage.
+    """
+    if storage_type == 'db':
+        from models.engine.async_db_storage import AsyncDBStorage
+        async_storage = AsyncDBStorage()
+        await async_storage.areload()
+        return async_storage
+    from models.engine.async_file_storage import AsyncFileStorage
+    return AsyncFileStorage(storage)
@@ -1,8 +1,9 @@
 #!/usr/bin/python3
 """This module defines the City class"""
 
+import models
 from models.base_model import BaseModel, Base
-from sqlalchemy import Column, String
+from sqlalchemy import Column, String, ForeignKey
 from sqlalchemy.orm import relationship
 
 
@@ -12,7 +13,15 @@ class City(BaseModel, Base):
     __tablename__ = "cities"
 
     name = Column(String(128), nullable=False)
+    state_id = Column(String(60), ForeignKey("states.id"), nullable=False)
 
-    places = relationship(
-        "Place", backref="cities", cascade="all, delete", passive_deletes=True
-    )
+    if models.storage_type == "db":
+        places = relationship(
+            "Place", backref="cities", cascade="all, delete",
+            passive_deletes=True
+        )
+    else:
+        @property
+        def places(self):
+            """Places whose city_id is the id of this city"""
+            return models.storage.children("Place", "city_id", self.id)
@@ -0,0 +1,136 @@
+#!/usr/bin/python3
+"""This module defines the asyncio counterpart of DBStorage
+
+AsyncDBStorage reads and writes the same tables as DBStorage through
+SQLAlchemy's async engine, so a coroutine waiting on the database
+leaves the event loop free. It needs the sqlalchemy[asyncio] extra and
+an asyncio driver: aiomysql for MySQL or aiosqlite for the SQLite
+stand-in. HBNB_DB_URL and the HBNB_MYSQL_* variables are read as by
+DBStorage, and the synchronous driver of the URL is swapped for its
+asyncio counterpart (see drivers).
+
+Sessions are scoped to the asyncio task, so arelease() must be
+awaited at the end of every request. Relationships are never lazy loaded, as
+that would need blocking I/O: aall(cls, load=...) eager-loads the
+paths it is given, as DBStorage.all() does.
+"""
+import asyncio
+from os import getenv
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_scoped_session
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import lazyload
+from models.base_model import Base
+from models.engine.db_storage import classes, loader_options, pool_settings
+
+# synchronous driver -> asyncio driver for the same database
+drivers = {"mysql": "mysql+aiomysql", "mysql+mysqldb": "mysql+aiomysql",
+           "sqlite": "sqlite+aiosqlite"}
+
+
+def async_url(url):
+    """Return url with its driver replaced by the asyncio one"""
+    scheme, sep, rest = url.partition("://")
+    return drivers.get(scheme, scheme) + sep + rest
+
+
+class AsyncDBStorage:
+    """Awaitable storage of HBNB models in the database
+
+    Attributes:
+        __engine (AsyncEngine): The asyncio database engine
+        __session (async_scoped_session): The per-task database sessions
+    """
+
+    def __init__(self):
+        """Create the asyncio engine; areload() opens the sessions"""
+        url = getenv('HBNB_DB_URL') or "mysql+mysqldb://{}:{}@{}/{}".format(
+            getenv('HBNB_MYSQL_USER'), getenv('HBNB_MYSQL_PWD'),
+            getenv('HBNB_MYSQL_HOST'), getenv('HBNB_MYSQL_DB'))
+        pool = {arg: int(getenv(name)) for name, arg in pool_settings.items()
+                if getenv(name)}
+        self.__engine = create_async_engine(async_url(url),
+                                            pool_pre_ping=True, **pool)
+        self.__session = None
+
+    async def aall(self, cls=None, load=None):
+        """Return {<class name>.<id>: obj} for cls, or for every class
+
+        cls may be a class or a class name; load eager-loads
+        relationship paths of cls as in DBStorage.all().
+        """
+        if cls is None:
+            if load:
+                raise ValueError("load needs a class")
+            targets = classes.values()
+        else:
+            if isinstance(cls, str):
+                cls = classes.get(cls)
+            targets = [cls] if cls in classes.values() else []
+        resu = {}
+        for target in targets:
+            query = select(target)
+            if load:
+                query = query.options(*loader_options(target, load))
+            else:
+                query = query.options(lazyload('*'))
+            for obj in await self.__session.scalars(query):
+                resu[target.__name__ + "." + obj.id] = obj
+        return resu
+
+    async def aget(self, cls, id):
+        """Return the object of class cls with the given id, or None"""
+        if isinstance(cls, str):
+            cls = classes.get(cls)
+        if cls not in classes.values():
+            return None
+        return await self.__session.get(cls, id, options=[lazyload('*')])
+
+    async def acount(self, cls=None):
+        """Return the number of objects of cls, or of every class"""
+        if cls is None:
+            targets = list(classes.values())
+        else:
+            if isinstance(cls, str):
+                cls = classes.get(cls)
+            if cls not in classes.values():
+                return 0
+            targets = [cls]
+        counts = [select(func.count()).select_from(target).scalar_subquery()
+                  for target in targets]
+        return sum((await self.__session.execute(select(*counts))).one())
+
+    async def anew(self, obj):
+        """Add obj to the session of the current task"""
+        self.__session.add(obj)
+
+    async def asave(self):
+        """Commit the changes of the session of the current task"""
+        await self.__session.commit()
+
+    async def adelete(self, obj=None):
+        """Delete obj from the session of the current task"""
+        if obj:
+            await self.__session.delete(obj)
+
+    async def areload(self):
+        """Create the tables and open the per-task sessions"""
+        async with self.__engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        if self.__session is not None:
+            await self.__session.remove()
+        factory = async_sessionmaker(self.__engine, expire_on_commit=False)
+        self.__session = async_scoped_session(factory,
+                                              scopefunc=asyncio.current_task)
+
+    async def arelease(self):
+        """Close the session of the current task and release it"""
+        await self.__session.remove()
+
+    async def aclose(self):
+        """Release the session of the current task, at shutdown"""
+        await self.arelease()
+
+    async def adispose(self):
+        """Close every pooled connection"""
+        await self.__engine.dispose()
@@ -0,0 +1,72 @@
+#!/usr/bin/python3
+"""This module defines the asyncio facade over FileStorage
+
+FileStorage serves reads from memory behind one lock, but save(),
+reload(), the write-behind flush and the first look at lazy or
+record-file objects touch the disk while holding it. AsyncFileStorage
+runs every call in a bounded thread pool, so a coroutine awaiting it
+never blocks the event loop, however many requests are in flight.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+
+class AsyncFileStorage:
+    """Awaitable versions of the FileStorage methods
+
+    Attributes:
+        storage (FileStorage): the storage the calls are run on
+    """
+
+    def __init__(self, storage, workers=None):
+        """Wraps storage, running its calls on at most workers threads"""
+        self.storage = storage
+        self.__executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='hbnb-storage')
+
+    async def aall(self, cls=None, load=None):
+        """Returns the objects in storage, or those of cls"""
+        return await self.__run(self.storage.all, cls, load)
+
+    async def aget(self, cls, id):
+        """Returns the object of class cls with the given id, or None"""
+        return await self.__run(self.storage.get, cls, id)
+
+    async def acount(self, cls=None):
+        """Returns the number of objects in storage, or of cls"""
+        return await self.__run(self.storage.count, cls)
+
+    async def anew(self, obj):
+        """Adds obj to storage"""
+        await self.__run(self.storage.new, obj)
+
+    async def asave(self):
+        """Saves storage to disk"""
+        await self.__run(self.storage.save)
+
+    async def adelete(self, obj=None):
+        """Deletes obj from storage"""
+        await self.__run(self.storage.delete, obj)
+
+    async def areload(self):
+        """Loads storage from disk"""
+        await self.__run(self.storage.reload)
+
+    async def arelease(self):
+        """Ends a request: nothing to release, see FileStorage.release"""
+        self.storage.release()
+
+    async def aclose(self):
+        """Flushes the writes storage still holds back, at shutdown"""
+        await self.__run(self.storage.close)
+
+    def shutdown(self):
+        """Stops the worker threads once the pending calls are done"""
+        self.__executor.shutdown()
+
+    async def __run(self, func, *args):
+        """Returns func(*args), called on a worker thread"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.__executor,
+                                          partial(func, *args))
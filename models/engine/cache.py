@@ -0,0 +1,76 @@
+#!/usr/bin/python3
+"""This module defines the read-through cache kept in front of DBStorage
+
+An LRUCache holds at most maxsize entries, each for at most ttl seconds:
+a lookup of an expired entry drops it and counts as a miss, and adding
+an entry to a full cache evicts the least recently used one. The hit,
+miss, eviction and expiration counters are returned by stats().
+"""
+from collections import OrderedDict
+import threading
+import time
+
+
+class LRUCache:
+    """A size bounded, time bounded mapping in least recently used order
+
+    Attributes:
+        maxsize (int): number of entries kept at most
+        ttl (float): seconds an entry stays valid, None for no limit
+    """
+
+    def __init__(self, maxsize, ttl=None, clock=time.monotonic):
+        """Creates an empty cache; clock returns the time in seconds"""
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.__clock = clock
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+        self.__counts = dict.fromkeys(
+            ('hits', 'misses', 'evictions', 'expirations'), 0)
+
+    def __len__(self):
+        """Returns the number of entries, expired ones included"""
+        return len(self.__entries)
+
+    def get(self, key, default=None):
+        """Returns the value cached under key, or default"""
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None and entry[0] is not None and \
+                    entry[0] <= self.__clock():
+                del self.__entries[key]
+                self.__counts['expirations'] += 1
+                entry = None
+            if entry is None:
+                self.__counts['misses'] += 1
+                return default
+            self.__entries.move_to_end(key)
+            self.__counts['hits'] += 1
+            return entry[1]
+
+    def put(self, key, value):
+        """Caches value under key, evicting the least recently used entries"""
+        expires = None if self.ttl is None else self.__clock() + self.ttl
+        with self.__lock:
+            self.__entries[key] = (expires, value)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.maxsize:
+                self.__entries.popitem(last=False)
+                self.__counts['evictions'] += 1
+
+    def invalidate(self, key):
+        """Drops the entry of key if there is one"""
+        with self.__lock:
+            self.__entries.pop(key, None)
+
+    def clear(self):
+        """Drops every entry"""
+        with self.__lock:
+            self.__entries.clear()
+
+    def stats(self):
+        """Returns the counters and the current size of the cache"""
+        with self.__lock:
+            return dict(self.__counts, size=len(self.__entries),
+                        maxsize=self.maxsize)
@@ -0,0 +1,488 @@
+#!/usr/bin/python3
+"""This module defines the on-disk snapshot formats of FileStorage
+
+A codec turns one stored object into a self-contained fragment
+(encode/dump), writes a snapshot from a stream of (key, fragment) pairs
+(write) and streams (key, record) pairs back out of a snapshot (read).
+Records are the dictionaries handed to the model constructors.
+
+Usage: python3 -m models.engine.codec <source> <destination>
+converts a snapshot between formats, picked by file extension.
+"""
+from datetime import datetime, timedelta
+import json
+import struct
+import sys
+
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+_parsed = (None, None)
+_formatted = (None, None)
+
+
+def parse_time(text):
+    """Returns the datetime of a timestamp in TIME_FORMAT
+
+    Timestamps shaped like isoformat() output of a naive datetime with
+    microseconds (six digits after the '.', no offset) are read by
+    fromisoformat, which is much faster than strptime; anything else
+    still goes through strptime, which raises the same errors as before.
+    The last timestamp read is kept, since created_at and updated_at are
+    often equal.
+    """
+    global _parsed
+    last = _parsed
+    if last[0] == text:
+        return last[1]
+    value = None
+    if (len(text) == 26 and text[4] == text[7] == '-' and
+            text[10] == 'T' and text[13] == text[16] == ':' and
+            text[19] == '.' and text[20:].isdigit()):
+        try:
+            value = datetime.fromisoformat(text)
+        except ValueError:
+            pass
+    if value is None:
+        value = datetime.strptime(text, TIME_FORMAT)
+    _parsed = (text, value)
+    return value
+
+
+def format_time(value):
+    """Returns a datetime as a string in TIME_FORMAT
+
+    isoformat() gives the same string, faster, for naive datetimes with
+    microseconds and a four digit year; the others go through strftime.
+    The last datetime formatted is kept, since updated_at is often the
+    very object of created_at.
+    """
+    global _formatted
+    last = _formatted
+    if last[0] is value:
+        return last[1]
+    if value.microsecond and value.tzinfo is None and value.year >= 1000:
+        text = value.isoformat()
+    else:
+        text = value.strftime(TIME_FORMAT)
+    _formatted = (value, text)
+    return text
+
+
+def _isoformat(value):
+    """JSON fallback for datetimes read from a binary snapshot"""
+    if isinstance(value, datetime):
+        return format_time(value)
+    raise TypeError("{} is not JSON serializable".format(type(value)))
+
+
+class JSONCodec:
+    """The file.json format: one object mapping <class>.<id> to to_dict()"""
+
+    name = 'json'
+    extension = '.json'
+    binary = False
+
+    def dump(self, obj):
+        """Returns the fragment of a model instance"""
+        return json.dumps(obj.to_dict())
+
+    def encode(self, record):
+        """Returns the fragment of a record dictionary"""
+        return json.dumps(record, default=_isoformat)
+
+    def write(self, f, fragments):
+        """Writes (key, fragment) pairs to f as one JSON object"""
+        sep = '{'
+        for key, text in fragments:
+            f.write(sep)
+            f.write(json.dumps(key))
+            f.write(': ')
+            f.write(text)
+            sep = ', '
+        f.write('}' if sep == ', ' else '{}')
+
+    def read(self, f, chunk_size=1 << 16):
+        """Yields the (key, record) pairs of a file.json one at a time
+
+        The file is decoded in chunks of chunk_size characters, so only
+        the current chunk and the record being decoded are held in memory.
+        """
+        decoder = json.JSONDecoder()
+        buf = ''
+        pos = 0
+        eof = False
+        state = 'open'
+        while True:
+            while pos < len(buf) and buf[pos] in ' \t\n\r':
+                pos += 1
+            if pos == len(buf):
+                if eof:
+                    break
+                data = f.read(chunk_size)
+                eof = not data
+                buf, pos = data, 0
+                continue
+            if state in ('key', 'first', 'value'):
+                if state == 'first' and buf[pos] == '}':
+                    pos += 1
+                    state = 'done'
+                    continue
+                try:
+                    item, end = decoder.raw_decode(buf, pos)
+                    complete = end < len(buf) or eof
+                except ValueError:
+                    if eof:
+                        raise
+                    complete = False
+                if not complete:
+                    data = f.read(chunk_size)
+                    eof = not data
+                    buf, pos = buf[pos:] + data, 0
+                    continue
+                pos = end
+                if state == 'value':
+                    yield key, item
+                    state = 'comma'
+                elif not isinstance(item, str):
+                    raise ValueError("Malformed JSON snapshot")
+                else:
+                    key = item
+                    state = 'colon'
+                continue
+            expected = {'open': '{', 'colon': ':', 'comma': ',}',
+                        'done': ''}[state]
+            if not expected or buf[pos] not in expected:
+                raise ValueError("Malformed JSON snapshot")
+            if state == 'open':
+                state = 'first'
+            elif state == 'colon':
+                state = 'value'
+            else:
+                state = 'key' if buf[pos] == ',' else 'done'
+            pos += 1
+        if state != 'done':
+            raise ValueError("Unexpected end of JSON snapshot")
+
+
+class BinaryCodec:
+    """A compact struct-packed snapshot format
+
+    The file starts with MAGIC and is a sequence of entries, each a kind
+    byte, a little-endian u32 body length and a body starting with a u16
+    tag. Class and attribute names are interned: a 'C' or 'F' entry
+    binds a tag to a name before the first record using it. An 'L'
+    entry binds a layout tag to a class tag and the attribute tags and
+    type bytes of a record shape. An 'R' entry holds a record: its
+    layout tag, the fixed-width values of its fields in one struct
+    (string and JSON fields as their byte length), then the bytes of
+    its string and JSON fields, in field order. Each layout is compiled
+    into a struct.Struct once, so a record is packed or unpacked with
+    one call plus one slice per string. Datetimes, including the
+    created_at and updated_at strings of JSON records, are stored as
+    integer microseconds since the epoch and read back as datetime
+    objects.
+
+    Tags and layouts are shared by every instance for the life of the
+    process, so a fragment encoded for one snapshot stays valid for the
+    next one. Snapshots of the first version of the format (MAGIC_V1, a
+    type byte per field) are still read.
+    """
+
+    name = 'binary'
+    extension = '.bin'
+    binary = True
+    MAGIC = b'HBNB\x02'
+    MAGIC_V1 = b'HBNB\x01'
+    EPOCH = datetime(1970, 1, 1)
+    CHUNK = 1 << 16
+    # struct code of the fixed-width part of each type byte
+    CODES = {'N': '0s', 'b': '?', 'i': 'q', 'f': 'd', 'T': 'q',
+             's': 'I', 'j': 'I'}
+    __entry = struct.Struct('<cIH')
+    __head = struct.Struct('<HH')
+    __field = struct.Struct('<Hc')
+    __tags = {}
+    __layouts = {}
+    __shapes = {}
+    __defs = []
+    __count = [0, 0]
+
+    def dump(self, obj):
+        """Returns the fragment of a model instance without to_dict()"""
+        attrs = obj.__dict__.copy()
+        attrs.pop('_sa_instance_state', None)
+        return self.__pack(obj.__class__.__name__, attrs)
+
+    def encode(self, record):
+        """Returns the fragment of a record dictionary"""
+        attrs = dict(record)
+        cls_name = attrs.pop('__class__')
+        for name in ('created_at', 'updated_at'):
+            if type(attrs.get(name)) is str:
+                attrs[name] = parse_time(attrs[name])
+        return self.__pack(cls_name, attrs)
+
+    def write(self, f, fragments):
+        """Writes MAGIC, the tag and layout table and (key, fragment)
+        pairs to f"""
+        defs = BinaryCodec.__defs
+        f.write(self.MAGIC)
+        done = 0
+        for key, data in fragments:
+            if done < len(defs):
+                f.write(b''.join(defs[done:]))
+                done = len(defs)
+            f.write(data)
+        f.write(b''.join(defs[done:]))
+
+    def read(self, f):
+        """Yields the (key, record) pairs of a binary snapshot
+
+        The file is read CHUNK bytes at a time, so only the current
+        chunk and the record being decoded are held in memory.
+        """
+        magic = f.read(len(self.MAGIC))
+        if magic not in (self.MAGIC, self.MAGIC_V1):
+            raise ValueError("Not a binary snapshot")
+        legacy = magic == self.MAGIC_V1
+        entry = self.__entry
+        names = {}
+        layouts = {}
+        buf = b''
+        pos = 0
+        while True:
+            if len(buf) - pos < entry.size:
+                buf, pos = self.__fill(f, buf, pos, entry.size), 0
+                if not buf:
+                    return
+                if len(buf) < entry.size:
+                    raise ValueError("Unexpected end of binary snapshot")
+            kind, size, tag = entry.unpack_from(buf, pos)
+            end = pos + 5 + size
+            if end > len(buf):
+                buf, pos = self.__fill(f, buf, pos, 5 + size), 0
+                end = 5 + size
+                if end > len(buf):
+                    raise ValueError("Unexpected end of binary snapshot")
+            if kind == b'R':
+                if legacy:
+                    record = self.__decode_v1(buf[pos + 5:end], names)
+                else:
+                    record = self.__decode(buf, pos + entry.size, end,
+                                           layouts.get(tag))
+                yield record['__class__'] + '.' + record['id'], record
+            elif kind == b'L':
+                layouts[tag] = self.__read_layout(buf[pos + 7:end], names)
+            else:
+                names[tag] = buf[pos + 7:end].decode('utf-8')
+            pos = end
+
+    def __fill(self, f, buf, pos, need):
+        """Returns the bytes of buf from pos on, followed by enough of f
+        to hold need bytes if f has them"""
+        buf = buf[pos:]
+        while len(buf) < need:
+            data = f.read(max(self.CHUNK, need - len(buf)))
+            if not data:
+                break
+            buf += data
+        return buf
+
+    def __pack(self, cls_name, attrs):
+        """Returns the 'R' entry of attrs, a record of class cls_name"""
+        values = list(attrs.values())
+        key = (cls_name, tuple(attrs), tuple(map(type, values)))
+        layout = BinaryCodec.__shapes.get(key)
+        if layout is None:
+            layout = BinaryCodec.__shapes[key] = self.__layout(
+                cls_name, key[1], tuple(map(self.__kind, values)))
+        try:
+            return self.__pack_values(layout, values)
+        except struct.error:
+            # an int too large for 64 bits: store it as JSON
+            return self.__pack_values(self.__layout(
+                cls_name, key[1], tuple(map(self.__kind, values))), values)
+
+    def __pack_values(self, layout, values):
+        """Returns the 'R' entry of values packed with layout"""
+        tag, packer, dates, strings, nones = layout
+        values = list(values)
+        for i in dates:
+            values[i] = (values[i] - self.EPOCH) // timedelta(microseconds=1)
+        for i in nones:
+            values[i] = b''
+        tail = []
+        for i, is_json in strings:
+            if is_json:
+                data = json.dumps(values[i], default=_isoformat)
+            else:
+                data = values[i]
+            data = data.encode('utf-8')
+            values[i] = len(data)
+            tail.append(data)
+        tail = b''.join(tail)
+        return packer.pack(b'R', packer.size - 5 + len(tail), tag,
+                           *values) + tail
+
+    def __kind(self, value):
+        """Returns the type byte a value is stored with"""
+        if value is None:
+            return 'N'
+        if value is True or value is False:
+            return 'b'
+        if type(value) is int and -(1 << 63) <= value < (1 << 63):
+            return 'i'
+        if type(value) is float:
+            return 'f'
+        if type(value) is datetime:
+            return 'T'
+        if type(value) is str:
+            return 's'
+        return 'j'
+
+    def __layout(self, cls_name, names, kinds):
+        """Returns the layout of a record shape, defining it if needed"""
+        key = (cls_name, names, kinds)
+        layout = BinaryCodec.__layouts.get(key)
+        if layout is None:
+            ctag = self.__tag('C', cls_name)
+            ftags = [self.__tag('F', name) for name in names]
+            tag = self.__next(1)
+            body = struct.pack('<HHH', tag, ctag, len(names)) + b''.join(
+                self.__field.pack(ftag, kind.encode())
+                for ftag, kind in zip(ftags, kinds))
+            BinaryCodec.__defs.append(
+                struct.pack('<cI', b'L', len(body)) + body)
+            unpacker, names, dates, strings, nones, cls_name = \
+                self.__compile(cls_name, names, kinds)
+            layout = BinaryCodec.__layouts[key] = (
+                tag, struct.Struct('<cIH' + unpacker.format[1:]), dates,
+                strings, nones)
+        return layout
+
+    def __compile(self, cls_name, names, kinds):
+        """Returns the decoding plan of a record shape: its struct of
+        fixed-width values, field names, datetime indexes, (index, is
+        JSON) pairs of string fields, None indexes and class name"""
+        codes = ''.join(self.CODES[kind] for kind in kinds)
+        return (struct.Struct('<' + codes), names,
+                [i for i, kind in enumerate(kinds) if kind == 'T'],
+                [(i, kind == 'j') for i, kind in enumerate(kinds)
+                 if kind in 'sj'],
+                [i for i, kind in enumerate(kinds) if kind == 'N'],
+                cls_name)
+
+    def __read_layout(self, body, names):
+        """Returns the decoding plan of the body of an 'L' entry"""
+        ctag, count = self.__head.unpack_from(body)
+        fields = [self.__field.unpack_from(body, 4 + 3 * i)
+                  for i in range(count)]
+        kinds = tuple(kind.decode() for tag, kind in fields)
+        if any(kind not in self.CODES for kind in kinds):
+            raise ValueError("Unknown field type in {!r}".format(kinds))
+        return self.__compile(names[ctag], [names[tag] for tag, kind in
+                                            fields], kinds)
+
+    def __decode(self, buf, pos, end, plan):
+        """Unpacks the record from pos to end of buf with a layout plan"""
+        if plan is None:
+            raise ValueError("Record of an undefined layout")
+        unpacker, names, dates, strings, nones, cls_name = plan
+        values = list(unpacker.unpack_from(buf, pos))
+        pos += unpacker.size
+        epoch = self.EPOCH
+        for i in dates:
+            values[i] = epoch + timedelta(microseconds=values[i])
+        for i, is_json in strings:
+            size = values[i]
+            text = buf[pos:pos + size].decode('utf-8')
+            pos += size
+            values[i] = json.loads(text) if is_json else text
+        for i in nones:
+            values[i] = None
+        if pos != end:
+            raise ValueError("Malformed binary record")
+        record = dict(zip(names, values))
+        record['__class__'] = cls_name
+        return record
+
+    def __next(self, space):
+        """Returns the next free tag of names (0) or layouts (1)"""
+        tag = BinaryCodec.__count[space]
+        if tag > 0xffff:
+            raise ValueError("Too many distinct names or layouts to intern")
+        BinaryCodec.__count[space] += 1
+        return tag
+
+    def __tag(self, kind, name):
+        """Returns the tag of a class or attribute name, creating it"""
+        tag = BinaryCodec.__tags.get((kind, name))
+        if tag is None:
+            tag = BinaryCodec.__tags[(kind, name)] = self.__next(0)
+            data = name.encode('utf-8')
+            BinaryCodec.__defs.append(struct.pack(
+                '<cIH', kind.encode(), len(data) + 2, tag) + data)
+        return tag
+
+    def __decode_v1(self, body, names):
+        """Unpacks the body of a first version 'R' entry, a type byte
+        and a value per field, into a record dictionary"""
+        ctag, count = self.__head.unpack_from(body)
+        record = {}
+        pos = self.__head.size
+        for i in range(count):
+            tag, kind = self.__field.unpack_from(body, pos)
+            pos += 3
+            if kind == b's' or kind == b'j':
+                size = struct.unpack_from('<I', body, pos)[0]
+                value = body[pos + 4:pos + 4 + size].decode('utf-8')
+                if kind == b'j':
+                    value = json.loads(value)
+                pos += 4 + size
+            elif kind == b'T':
+                value = self.EPOCH + timedelta(
+                    microseconds=struct.unpack_from('<q', body, pos)[0])
+                pos += 8
+            elif kind == b'i':
+                value = struct.unpack_from('<q', body, pos)[0]
+                pos += 8
+            elif kind == b'f':
+                value = struct.unpack_from('<d', body, pos)[0]
+                pos += 8
+            elif kind == b'b':
+                value = body[pos] != 0
+                pos += 1
+            elif kind == b'N':
+                value = None
+            else:
+                raise ValueError("Unknown field type {!r}".format(kind))
+            record[names[tag]] = value
+        record['__class__'] = names[ctag]
+        return record
+
+
+codecs = {'json': JSONCodec, 'binary': BinaryCodec}
+
+
+def codec_for(path):
+    """Returns a codec instance for a snapshot path, by extension"""
+    for cls in codecs.values():
+        if path.endswith(cls.extension):
+            return cls()
+    raise ValueError("No snapshot codec for " + path)
+
+
+def convert(src, dst):
+    """Rewrites the snapshot at src in the format of dst"""
+    reader = codec_for(src)
+    writer = codec_for(dst)
+    with open(src, 'rb' if reader.binary else 'r') as fin, \
+            open(dst, 'wb' if writer.binary else 'w') as fout:
+        writer.write(fout, ((key, writer.encode(record))
+                            for key, record in reader.read(fin)))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: {} <source> <destination>".format(sys.argv[0]))
+        sys.exit(1)
+    convert(sys.argv[1], sys.argv[2])
@@ -0,0 +1,379 @@
+#!/usr/bin/python3
+"""This module defines the columnar tables returned by storage.columns(cls)
+
+A Table holds some mapped attributes of every object of one class as
+NumPy arrays, one per attribute: Integer and Float columns as int64 or
+float64 arrays (None as NaN), DateTime columns as datetime64[us] arrays
+(None as NaT) and String columns dictionary-encoded, as int32 codes
+into an array of their distinct values (None as -1). Foreign keys such
+as Place.city_id, shared by many rows, are thus stored as small codes.
+
+Tables are filtered and aggregated without looking at one row at a
+time in Python:
+
+    places = storage.columns(Place)
+    places.filter(max_guest__ge=4).group_by('city_id').mean(
+        'price_by_night')
+    places.sum('max_guest'), places.histogram('number_rooms')
+
+filter() takes the <attribute>__<operator>=<value> conditions of
+storage.query(), with the same handling of None. Aggregations skip
+None values, as SQL does, while group_by() keeps None as a group of
+its own. Results are plain Python values.
+"""
+from datetime import datetime
+import numpy as np
+from models.engine.compact import pack_time
+from models.engine.query import operators
+
+NAT = np.iinfo(np.int64).min
+
+
+def kinds(mapped, attrs=()):
+    """Returns {attribute: kind} for attrs of the mapped class
+
+    The kind is 'number', 'time' or 'text'. Without attrs, every
+    numeric and DateTime column and every foreign key is returned.
+    Unknown attributes raise ValueError.
+    """
+    table = getattr(mapped, '__table__', None)
+    if table is None:
+        raise ValueError("{} has no columns".format(mapped.__name__))
+    resu = {}
+    for column in table.columns:
+        if attrs and column.name not in attrs:
+            continue
+        python_type = column.type.python_type
+        if python_type in (int, float):
+            resu[column.name] = 'number'
+        elif python_type is datetime:
+            resu[column.name] = 'time'
+        elif attrs or column.foreign_keys:
+            resu[column.name] = 'text'
+    for attr in attrs:
+        if attr not in resu:
+            raise ValueError("Unknown column {} of {}".format(
+                attr, mapped.__name__))
+    return resu
+
+
+def micros(value):
+    """Returns a timestamp as microseconds since the epoch, NAT for None
+
+    Integers are taken as microseconds already, as kept by CompactTable.
+    """
+    if type(value) is int:
+        return value
+    value = None if value is None else pack_time(value)
+    return NAT if value is None else value
+
+
+def encode(kind, values):
+    """Returns the array of a list of values and, for text, its dictionary
+    """
+    if kind == 'number':
+        if all(type(value) is int for value in values):
+            return np.array(values, dtype=np.int64), None
+        return np.array(values, dtype=np.float64), None
+    if kind == 'time':
+        array = np.fromiter((micros(value) for value in values),
+                            dtype=np.int64, count=len(values))
+        return array.view('datetime64[us]'), None
+    codes = {}
+    array = np.fromiter((-1 if value is None else
+                         codes.setdefault(value, len(codes))
+                         for value in values), dtype=np.int32,
+                        count=len(values))
+    dictionary = np.empty(len(codes), dtype=object)
+    dictionary[:] = list(codes)
+    return array, dictionary
+
+
+def present(values):
+    """Tells which entries of a column array are not None"""
+    if values.dtype.kind == 'f':
+        return ~np.isnan(values)
+    if values.dtype.kind == 'M':
+        return ~np.isnat(values)
+    if values.dtype == np.int32:
+        return values >= 0
+    return np.ones(len(values), dtype=bool)
+
+
+class Table:
+    """Attributes of the objects of one class, one array per attribute
+
+    Attributes:
+        cls (str): name of the class the rows belong to
+    """
+
+    def __init__(self, cls, columns, dictionaries, mask=None):
+        """Wraps the arrays of columns, rows outside mask excluded
+
+        dictionaries maps each text attribute to its distinct values.
+        """
+        self.cls = cls
+        self.__columns = columns
+        self.__dictionaries = dictionaries
+        self.__mask = mask
+
+    @classmethod
+    def build(cls, name, kinds, values):
+        """Returns the table of {attribute: list of values} of class name"""
+        columns = {}
+        dictionaries = {}
+        for attr, kind in kinds.items():
+            columns[attr], dictionary = encode(kind, values[attr])
+            if dictionary is not None:
+                dictionaries[attr] = dictionary
+        return cls(name, columns, dictionaries)
+
+    def __len__(self):
+        """Returns the number of rows"""
+        if self.__mask is not None:
+            return int(np.count_nonzero(self.__mask))
+        return self.__size()
+
+    @property
+    def attrs(self):
+        """The attribute names of the columns"""
+        return list(self.__columns)
+
+    def column(self, attr):
+        """Returns the values of attr as an array
+
+        Text is decoded to an object array, None where there is none.
+        """
+        values = self.values(attr)
+        if attr in self.__dictionaries:
+            return self.__decode(attr, values)
+        return values
+
+    def encoded(self, attr):
+        """Tells if attr is text, stored as codes into its distinct values"""
+        return attr in self.__dictionaries
+
+    def values(self, attr):
+        """Returns the array of attr as stored, text as its codes"""
+        if attr not in self.__columns:
+            raise ValueError("No column {} in the {} table".format(
+                attr, self.cls))
+        column = self.__columns[attr]
+        return column if self.__mask is None else column[self.__mask]
+
+    def numbers(self, attr):
+        """Returns the values of attr, rows without one left out"""
+        if self.encoded(attr):
+            raise ValueError("{} of {} is not a number".format(attr,
+                                                               self.cls))
+        values = self.values(attr)
+        return values[present(values)]
+
+    def filter(self, **conditions):
+        """Returns the table of the rows meeting every condition"""
+        if self.__mask is None:
+            mask = np.ones(self.__size(), dtype=bool)
+        else:
+            mask = self.__mask.copy()
+        for lookup, value in conditions.items():
+            attr, sep, op = lookup.rpartition('__')
+            if not sep or op not in operators:
+                attr, op = lookup, 'eq'
+            mask &= self.__match(attr, op, value)
+        return Table(self.cls, self.__columns, self.__dictionaries, mask)
+
+    def count(self, attr=None):
+        """Returns the number of rows, or of rows where attr is not None"""
+        if attr is None:
+            return len(self)
+        return int(np.count_nonzero(present(self.values(attr))))
+
+    def sum(self, attr):
+        """Returns the sum of attr"""
+        return self.numbers(attr).sum().item()
+
+    def mean(self, attr):
+        """Returns the mean of attr, None if no row has a value"""
+        values = self.numbers(attr)
+        return values.mean().item() if len(values) else None
+
+    def min(self, attr):
+        """Returns the smallest value of attr, None if there is none"""
+        values = self.numbers(attr)
+        return values.min().item() if len(values) else None
+
+    def max(self, attr):
+        """Returns the largest value of attr, None if there is none"""
+        values = self.numbers(attr)
+        return values.max().item() if len(values) else None
+
+    def percentile(self, attr, q):
+        """Returns the q-th percentile of attr, a list if q is a list
+
+        Values are interpolated linearly between the closest ranks.
+        """
+        values = self.numbers(attr)
+        if not len(values):
+            return [None] * len(q) if isinstance(q, list) else None
+        return np.percentile(values, q).tolist()
+
+    def histogram(self, attr, bins=None):
+        """Returns {value: count} of attr, or the (counts, edges) of bins
+
+        bins is a number of equal-width bins or a list of bin edges, as
+        taken by numpy.histogram; rows without a value are left out of
+        bins. Values are in increasing order, None last.
+        """
+        if bins is not None:
+            counts, edges = np.histogram(self.numbers(attr), bins)
+            return counts.tolist(), edges.tolist()
+        counts = self.group_by(attr).count()
+        return dict(sorted(counts.items(), key=lambda item: (
+            item[0] is None, 0 if item[0] is None else item[0])))
+
+    def group_by(self, attr):
+        """Returns the Groups of rows sharing a value of attr"""
+        values = self.values(attr)
+        keys, inverse = np.unique(values, return_inverse=True)
+        if attr in self.__dictionaries:
+            keys = self.__decode(attr, keys).tolist()
+        else:
+            missing = np.flatnonzero(~present(keys)).tolist()
+            keys = keys.tolist()
+            for i in missing:
+                keys[i] = None
+        return Groups(self, keys, inverse.reshape(-1))
+
+    def __size(self):
+        """Returns the number of rows before the mask"""
+        for column in self.__columns.values():
+            return len(column)
+        return 0
+
+    def __decode(self, attr, codes):
+        """Returns the text of codes of attr, None for -1"""
+        text = np.empty(len(codes), dtype=object)
+        found = codes >= 0
+        text[found] = self.__dictionaries[attr][codes[found]]
+        return text
+
+    def __match(self, attr, op, value):
+        """Returns the mask of the rows meeting a condition, before the
+        table mask"""
+        if attr not in self.__columns:
+            raise ValueError("No column {} in the {} table".format(
+                attr, self.cls))
+        column = self.__columns[attr]
+        found = present(column)
+        if value is None:
+            if op == 'eq':
+                return ~found
+            return found if op == 'ne' else np.zeros(len(column), bool)
+        dictionary = self.__dictionaries.get(attr)
+        if dictionary is not None:
+            # the condition is tested once per distinct text, then read
+            # through the codes; the False appended is read by code -1
+            matches = [operators[op](text, value) for text in dictionary]
+            return np.array(matches + [False], dtype=bool)[column]
+        if column.dtype.kind == 'M':
+            value = [np.datetime64(v, 'us') for v in value] \
+                if op == 'in' else np.datetime64(value, 'us')
+        if op == 'in':
+            return found & np.isin(column, list(value))
+        return found & operators[op](column, value)
+
+
+class Groups:
+    """The rows of a table grouped by the value of one attribute
+
+    Every aggregation returns {group value: result}, with None for the
+    groups without a value to aggregate.
+
+    Attributes:
+        table (Table): the grouped table
+        keys (list): the distinct values of the grouping attribute
+    """
+
+    def __init__(self, table, keys, inverse):
+        """Groups the rows of table: row i is in group keys[inverse[i]]"""
+        self.table = table
+        self.keys = keys
+        self.__inverse = inverse
+
+    def count(self, attr=None):
+        """Returns the number of rows per group, or of rows with attr"""
+        groups = self.__inverse
+        if attr is not None:
+            groups = groups[present(self.table.values(attr))]
+        counts = np.bincount(groups, minlength=len(self.keys))
+        return dict(zip(self.keys, counts.tolist()))
+
+    def sum(self, attr):
+        """Returns the sum of attr per group"""
+        groups, values = self.__numbers(attr)
+        counts = np.bincount(groups, minlength=len(self.keys))
+        sums = np.bincount(groups, weights=values, minlength=len(self.keys))
+        if values.dtype.kind == 'i':
+            sums = sums.round().astype(np.int64)
+        return {key: total if count else None for key, total, count in
+                zip(self.keys, sums.tolist(), counts.tolist())}
+
+    def mean(self, attr):
+        """Returns the mean of attr per group"""
+        groups, values = self.__numbers(attr)
+        counts = np.bincount(groups, minlength=len(self.keys))
+        sums = np.bincount(groups, weights=values, minlength=len(self.keys))
+        means = sums / np.maximum(counts, 1)
+        return {key: mean if count else None for key, mean, count in
+                zip(self.keys, means.tolist(), counts.tolist())}
+
+    def min(self, attr):
+        """Returns the smallest value of attr per group"""
+        return self.__pick(attr, 0.0)
+
+    def max(self, attr):
+        """Returns the largest value of attr per group"""
+        return self.__pick(attr, 1.0)
+
+    def percentile(self, attr, q):
+        """Returns the q-th percentile of attr per group
+
+        Values are interpolated linearly between the closest ranks, as
+        numpy.percentile does.
+        """
+        return self.__pick(attr, q / 100.0)
+
+    def __numbers(self, attr):
+        """Returns the groups and values of the rows with a value of attr"""
+        if self.table.encoded(attr):
+            raise ValueError("{} of {} is not a number".format(
+                attr, self.table.cls))
+        values = self.table.values(attr)
+        found = present(values)
+        return self.__inverse[found], values[found]
+
+    def __pick(self, attr, fraction):
+        """Returns the value at fraction of each group sorted by attr
+
+        Values between two ranks are interpolated linearly.
+        """
+        groups, values = self.__numbers(attr)
+        counts = np.bincount(groups, minlength=len(self.keys))
+        resu = dict.fromkeys(self.keys)
+        found = np.flatnonzero(counts)
+        if not len(found):
+            return resu
+        values = values[np.lexsort((values, groups))]
+        starts = np.cumsum(counts) - counts
+        position = starts[found] + (counts[found] - 1) * fraction
+        low = np.floor(position).astype(np.int64)
+        high = np.ceil(position).astype(np.int64)
+        if fraction in (0.0, 1.0):
+            picked = values[low]
+        else:
+            values = values.astype(np.float64)
+            picked = values[low] + (values[high] - values[low]) * \
+                (position - low)
+        for i, value in zip(found.tolist(), picked.tolist()):
+            resu[self.keys[i]] = value
+        return resu
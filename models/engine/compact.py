@@ -0,0 +1,284 @@
+#!/usr/bin/python3
+"""This module defines the compact record table kept by FileStorage
+
+A CompactTable holds the records of one class that were reloaded but
+not built into model objects yet, column by column instead of one
+dictionary per record: ids are packed as 16-byte UUIDs in a single
+bytearray kept in id order, created_at and updated_at as integer
+microseconds since the epoch in two arrays, and every other attribute
+in one list per attribute, with the strings of *_id attributes interned
+so that the parent ids shared by many records are stored once.
+
+The table is a mapping of <class name>.<id> keys to record dictionaries,
+rebuilt on lookup, so it stands in for the plain dictionaries of lazy
+reload. A lookup bisects the sorted ids within the bucket of their
+leading bits; rows added since the last pack() are found through a
+small dictionary. Records that do not fit
+the columns, such as ids that are not canonical UUIDs, are kept whole.
+"""
+from array import array
+from collections.abc import MutableMapping
+from datetime import datetime, timedelta
+from itertools import compress
+import sys
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+TIMES = ('created_at', 'updated_at')
+_MISSING = object()
+
+
+def pack_id(id):
+    """Returns the 16 bytes of a canonical UUID string, or None"""
+    if (type(id) is not str or len(id) != 36 or
+            id[8] != '-' or id[13] != '-' or id[18] != '-' or
+            id[23] != '-' or id != id.lower()):
+        return None
+    try:
+        raw = bytes.fromhex(id[:8] + id[9:13] + id[14:18] + id[19:23] +
+                            id[24:])
+    except ValueError:
+        return None
+    return raw if len(raw) == 16 else None
+
+
+def unpack_id(raw):
+    """Returns the UUID string of 16 bytes"""
+    h = raw.hex()
+    return '-'.join((h[:8], h[8:12], h[12:16], h[16:20], h[20:]))
+
+
+def pack_time(value):
+    """Returns a timestamp as microseconds since the epoch, or None
+
+    Datetimes and strings in the to_dict() format are accepted.
+    """
+    if type(value) is str:
+        if len(value) != 26 or value[10] != 'T' or value[19] != '.':
+            return None
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if type(value) is not datetime or value.tzinfo is not None:
+        return None
+    return (value - EPOCH) // MICROSECOND
+
+
+class CompactTable(MutableMapping):
+    """The records of one class, stored column by column
+
+    Attributes:
+        name (str): the class name of the records
+    """
+
+    def __init__(self, name):
+        """Creates an empty table of records of class name"""
+        self.name = name
+        self.__prefix = name + '.'
+        self.__ids = bytearray()
+        self.__live = bytearray()
+        self.__times = {attr: array('q') for attr in TIMES}
+        self.__columns = {}
+        self.__sorted = 0
+        self.__shift = 16
+        self.__starts = array('I', [0, 0])
+        self.__tail = {}
+        self.__odd = {}
+        self.__size = 0
+
+    def __len__(self):
+        """Returns the number of records"""
+        return self.__size + len(self.__odd)
+
+    def __contains__(self, key):
+        """Tells if a record is stored under key"""
+        return key in self.__odd or self.__row(key) is not None
+
+    def __getitem__(self, key):
+        """Returns the record stored under key"""
+        if key in self.__odd:
+            return self.__odd[key]
+        row = self.__row(key)
+        if row is None:
+            raise KeyError(key)
+        return self.__record(row)
+
+    def __setitem__(self, key, record):
+        """Stores record under key, replacing any previous one"""
+        self.__odd.pop(key, None)
+        fit = self.__fit(key, record)
+        if fit is None:
+            row = self.__row(key)
+            if row is not None:
+                self.__drop(row)
+            self.__odd[key] = record
+            return
+        raw, times = fit
+        row = self.__find(raw)
+        if row is not None:
+            self.__drop(row)
+        row = len(self.__live)
+        self.__ids += raw
+        self.__live.append(1)
+        for attr, value in zip(TIMES, times):
+            self.__times[attr].append(value)
+        for attr, value in record.items():
+            if attr in TIMES or attr in ('id', '__class__'):
+                continue
+            column = self.__columns.get(attr)
+            if column is None:
+                column = self.__columns[attr] = [_MISSING] * row
+            if type(value) is str and attr.endswith('_id'):
+                value = sys.intern(value)
+            column.append(value)
+        for column in self.__columns.values():
+            if len(column) == row:
+                column.append(_MISSING)
+        self.__tail[raw] = row
+        self.__size += 1
+        if len(self.__tail) > max(4096, self.__sorted):
+            self.pack()
+
+    def __delitem__(self, key):
+        """Drops the record stored under key"""
+        if self.__odd.pop(key, None) is not None:
+            return
+        row = self.__row(key)
+        if row is None:
+            raise KeyError(key)
+        self.__drop(row)
+
+    def __iter__(self):
+        """Yields the keys of the records"""
+        for key, record in self.items():
+            yield key
+
+    def keys(self):
+        """Yields the keys of the records without rebuilding them"""
+        yield from self.__odd
+        ids, live, prefix = self.__ids, self.__live, self.__prefix
+        for row in range(len(live)):
+            if live[row]:
+                yield prefix + unpack_id(ids[row * 16:row * 16 + 16])
+
+    def items(self):
+        """Yields (key, record) for every record"""
+        yield from list(self.__odd.items())
+        live = self.__live
+        for row in range(len(live)):
+            if live[row]:
+                record = self.__record(row)
+                yield self.__prefix + record['id'], record
+
+    def column(self, attr):
+        """Yields the value of attr in every record, in the order of keys()
+
+        None is yielded where a record has no such attribute, and the
+        timestamps of the columns as integer microseconds.
+        """
+        for record in self.__odd.values():
+            yield record.get(attr)
+        live = self.__live
+        if attr == 'id':
+            ids = self.__ids
+            for row in compress(range(len(live)), live):
+                yield unpack_id(ids[row * 16:row * 16 + 16])
+        elif attr in self.__times:
+            yield from compress(self.__times[attr], live)
+        elif attr in self.__columns:
+            for value in compress(self.__columns[attr], live):
+                yield None if value is _MISSING else value
+        else:
+            for i in range(self.__size):
+                yield None
+
+    def pack(self):
+        """Sorts every row by id, dropping the deleted ones"""
+        ids, live = self.__ids, self.__live
+        rows = [row for row in range(len(live)) if live[row]]
+        rows.sort(key=lambda row: ids[row * 16:row * 16 + 16])
+        self.__ids = bytearray().join(ids[row * 16:row * 16 + 16]
+                                      for row in rows)
+        self.__live = bytearray(b'\x01') * len(rows)
+        for attr, column in self.__times.items():
+            self.__times[attr] = array('q', (column[row] for row in rows))
+        for attr, column in list(self.__columns.items()):
+            column = [column[row] for row in rows]
+            if all(value is _MISSING for value in column):
+                del self.__columns[attr]
+            else:
+                self.__columns[attr] = column
+        self.__sorted = len(rows)
+        self.__shift = 16 - min(16, max(0, len(rows).bit_length() - 4))
+        starts = self.__starts = array(
+            'I', bytes(4 * ((1 << 16 - self.__shift) + 1)))
+        bucket = 0
+        for row in range(len(rows)):
+            first = (self.__ids[row * 16] << 8 |
+                     self.__ids[row * 16 + 1]) >> self.__shift
+            while bucket < first:
+                bucket += 1
+                starts[bucket] = row
+        while bucket < len(starts) - 1:
+            bucket += 1
+            starts[bucket] = len(rows)
+        self.__tail = {}
+
+    def __fit(self, key, record):
+        """Returns the packed id and times of record, None if it won't fit"""
+        if record.get('__class__') != self.name:
+            return None
+        raw = pack_id(record.get('id'))
+        if raw is None or key != self.__prefix + record['id']:
+            return None
+        times = [pack_time(record.get(attr)) for attr in TIMES]
+        if None in times:
+            return None
+        return raw, times
+
+    def __drop(self, row):
+        """Marks row deleted, packing once most rows are deleted"""
+        self.__live[row] = 0
+        self.__tail.pop(bytes(self.__ids[row * 16:row * 16 + 16]), None)
+        self.__size -= 1
+        if len(self.__live) - self.__size > max(4096, self.__size):
+            self.pack()
+
+    def __row(self, key):
+        """Returns the row of the live record stored under key, or None"""
+        if not key.startswith(self.__prefix):
+            return None
+        raw = pack_id(key[len(self.__prefix):])
+        return None if raw is None else self.__find(raw)
+
+    def __find(self, raw):
+        """Returns the row of the live record with packed id raw, or None"""
+        row = self.__tail.get(raw)
+        if row is None:
+            ids = self.__ids
+            first = (raw[0] << 8 | raw[1]) >> self.__shift
+            lo, hi = self.__starts[first], self.__starts[first + 1]
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if ids[mid * 16:mid * 16 + 16] < raw:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            if (lo == self.__starts[first + 1] or
+                    ids[lo * 16:lo * 16 + 16] != raw):
+                return None
+            row = lo
+        return row if self.__live[row] else None
+
+    def __record(self, row):
+        """Rebuilds the record dictionary of row"""
+        record = {'id': unpack_id(self.__ids[row * 16:row * 16 + 16])}
+        for attr, column in self.__times.items():
+            record[attr] = EPOCH + column[row] * MICROSECOND
+        for attr, column in self.__columns.items():
+            value = column[row]
+            if value is not _MISSING:
+                record[attr] = value
+        record['__class__'] = self.name
+        return record
@@ -5,7 +5,11 @@ The DBStorage class manages the storage of HBNB models in the database
 It provides methods for querying, adding, saving, and deleting objects
 """
 
-from sqlalchemy import create_engine
+from datetime import datetime
+import itertools
+import threading
+from sqlalchemy import create_engine, event, func, insert, inspect, or_
+from sqlalchemy import select, update
 from os import getenv
 from models.amenity import Amenity
 from models.city import City
@@ -14,15 +18,102 @@ from models.review import Review
 from models.state import State
 from models.user import User
 from models.base_model import BaseModel, Base
-from sqlalchemy.orm import sessionmaker, scoped_session
+from models.engine.cache import LRUCache
+from models.engine.query import DBQuery
+from models.engine import geo
+from models.engine import text_index
+from models.engine.text_index import TextIndex
+from sqlalchemy.orm import joinedload, lazyload, selectinload, subqueryload
+from sqlalchemy.orm import Session, sessionmaker, scoped_session
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+classes = {"Amenity": Amenity, "City": City, "Place": Place,
+           "Review": Review, "State": State, "User": User}
+
+# eager loading strategies accepted by all(load=...)
+loaders = {"selectin": selectinload, "joined": joinedload,
+           "subquery": subqueryload}
+
+# full-text indexes kept by search(), at most one per searched class
+search_indexes = 8
+
+# connection pool settings: environment variable -> create_engine argument
+pool_settings = {"HBNB_MYSQL_POOL_SIZE": "pool_size",
+                 "HBNB_MYSQL_MAX_OVERFLOW": "max_overflow",
+                 "HBNB_MYSQL_POOL_RECYCLE": "pool_recycle",
+                 "HBNB_MYSQL_POOL_TIMEOUT": "pool_timeout"}
+
+
+def loader_options(cls, load):
+    """Return the loader options of the relationship paths in load
+
+    load is a list of paths such as "cities.places", loaded with the
+    selectin strategy, or a dict mapping each path to a strategy name.
+    """
+    if not isinstance(load, dict):
+        load = dict.fromkeys(load, "selectin")
+    options = []
+    for path, strategy in load.items():
+        if strategy not in loaders:
+            raise ValueError("Unknown loading strategy " + strategy)
+        option = None
+        mapper = inspect(cls)
+        for name in path.split("."):
+            if name not in mapper.relationships:
+                raise ValueError("Unknown relationship {} of {}".format(
+                    name, mapper.class_.__name__))
+            attr = getattr(mapper.class_, name)
+            if option is None:
+                option = loaders[strategy](attr)
+            else:
+                option = getattr(option, loaders[strategy].__name__)(attr)
+            mapper = mapper.relationships[name].mapper
+        options.append(option)
+    return options
 
 
 class DBStorage():
     """DBStorage class for the HBNB project
 
+    HBNB_DB_URL, when set, is used as the database URL instead of the
+    MySQL URL built from the HBNB_MYSQL_* variables (e.g. a SQLite file
+    for local runs). all() fetches rows HBNB_DB_BATCH at a time, and
+    bulk_new() and bulk_update() write HBNB_DB_BATCH rows per transaction,
+    in a session of their own so that the changes pending in the session
+    of the calling thread are neither flushed nor committed.
+
+    The connection pool is sized by HBNB_MYSQL_POOL_SIZE,
+    HBNB_MYSQL_MAX_OVERFLOW, HBNB_MYSQL_POOL_RECYCLE and
+    HBNB_MYSQL_POOL_TIMEOUT; unset ones keep the SQLAlchemy defaults.
+    Every thread gets its own session, opened on first use. release()
+    discards the session of the calling thread and returns its
+    connection to the pool, so it must run at the end of every request;
+    close() does the same at process shutdown.
+
+    With HBNB_DB_CACHE_SIZE set, the column values of the objects read
+    by all(cls), query() and id lookups are cached, keyed by class
+    generation and query signature, in an LRUCache of that many entries
+    that expire after HBNB_DB_CACHE_TTL seconds (60 by default). A hit
+    issues no query: the cached rows are merged into the session of the
+    calling thread. new(), save(), delete() and the bulk writes move
+    the generation of the classes they change, so reads through the
+    same storage never see stale rows; writes made by other processes
+    show up once entries expire. Rows are only cached if the generation
+    of their class has not moved since their transaction began, as a
+    REPEATABLE READ transaction keeps reading the rows of its start.
+    cache_stats() returns the counters.
+
+    search() ranks objects with one TextIndex per class, built from the
+    searched columns on first use and kept, whether or not the cache is
+    enabled, for HBNB_DB_CACHE_TTL seconds. Writes through this storage
+    update it in place: a flush records the text of the objects it
+    writes, which reaches the index once the transaction commits, and
+    the bulk writes index the rows of each chunk they commit.
+
     Attributes:
         __engine (Engine): The database engine for SQLAlchemy
-        __session (Session): The current database session
+        __session (scoped_session): The per-thread database sessions
     """
 
     __engine = None
@@ -30,52 +121,486 @@ class DBStorage():
 
     def __init__(self):
         """Initialize a new database storage and create the engine."""
-        self.__engine = create_engine("mysql+mysqldb://{}:{}@{}/{}".
-                                      format(getenv('HBNB_MYSQL_USER'),
-                                             getenv('HBNB_MYSQL_PWD'),
-                                             getenv('HBNB_MYSQL_HOST'),
-                                             getenv('HBNB_MYSQL_DB')),
-                                      pool_pre_ping=True)
+        url = getenv('HBNB_DB_URL') or "mysql+mysqldb://{}:{}@{}/{}".format(
+            getenv('HBNB_MYSQL_USER'), getenv('HBNB_MYSQL_PWD'),
+            getenv('HBNB_MYSQL_HOST'), getenv('HBNB_MYSQL_DB'))
+        self.__batch = int(getenv('HBNB_DB_BATCH', 1000))
+        pool = {arg: int(getenv(name)) for name, arg in pool_settings.items()
+                if getenv(name)}
+        self.__engine = create_engine(url, pool_pre_ping=True, **pool)
+        size = int(getenv('HBNB_DB_CACHE_SIZE', 0))
+        self.__cache = None
+        if size > 0:
+            self.__cache = LRUCache(size,
+                                    float(getenv('HBNB_DB_CACHE_TTL', 60)))
+        self.__texts = LRUCache(search_indexes,
+                                float(getenv('HBNB_DB_CACHE_TTL', 60)))
+        self.__texts_lock = threading.Lock()
+        self.__generations = {}
+        self.__counter = itertools.count(1)
         if getenv('HBNB_ENV') == 'test':
             Base.metadata.drop_all(self.__engine)
 
-    def all(self, cls=None):
+    def all(self, cls=None, load=None):
         """Query the current database session for objects of the given class
 
-        If cls is None, it queries all types of objects
+        If cls is None, it queries all types of objects, one query per
+        class. cls may be a class or a class name. Rows are streamed in
+        batches of HBNB_DB_BATCH and relationships are left unloaded.
+
+        load eager-loads relationship paths of cls, such as
+        "cities.places", so that walking them issues no further query.
+        It is a list of paths, loaded with the selectin strategy, or a
+        dict mapping each path to "selectin", "joined" or "subquery".
         Returns:
             dict: A dictionary of queried classes in the format
             <class name>.<obj id> = obj
         """
         if cls is None:
-            objs = self.__session.query(State, City, User,
-                                        Review, Place, Amenity).all()
+            if load:
+                raise ValueError("load needs a class")
+            targets = classes.values()
         else:
-            objs = self.__session.query(cls.__class__.__name__)
+            if isinstance(cls, str):
+                cls = classes.get(cls)
+            targets = [cls] if cls in classes.values() else []
         resu = {}
-        for obj in objs:
-            resu[obj.__class__.__name__ + "." + obj.id] = obj
+        for target in targets:
+            prefix = target.__name__ + "."
+            query = self.__session.query(target)
+            if load:
+                query = query.options(*loader_options(target, load))
+                objs = query.all()
+            elif self.__cache is not None:
+                query = query.options(lazyload('*'))
+                objs = self.__cached(target, ('all',), query.all)
+            else:
+                query = query.options(lazyload('*'))
+                objs = query.yield_per(self.__batch)
+            for obj in objs:
+                resu[prefix + obj.id] = obj
         return resu
 
+    def get(self, cls, id):
+        """Return the object of class cls with the given id, or None
+
+        The object is looked up by primary key, through the cache when
+        it is enabled. cls may be a class or a class name.
+        """
+        if isinstance(cls, str):
+            cls = classes.get(cls)
+        if cls not in classes.values():
+            return None
+        if self.__cache is not None:
+            return self.__by_ids(cls, [id]).get(id)
+        return self.__session.get(cls, id, options=[lazyload('*')])
+
+    def count(self, cls=None):
+        """Return the number of objects of class cls, or of every class
+
+        The rows are counted by the database in a single query. cls may
+        be a class or a class name.
+        """
+        if cls is None:
+            targets = list(classes.values())
+        else:
+            if isinstance(cls, str):
+                cls = classes.get(cls)
+            if cls not in classes.values():
+                return 0
+            targets = [cls]
+        counts = [select(func.count()).select_from(target).scalar_subquery()
+                  for target in targets]
+        return sum(self.__session.execute(select(*counts)).one())
+
+    def places_near(self, lat, lon, radius_km, limit=None):
+        """Return the Places within radius_km of a point, nearest first
+
+        Only the places inside the bounding box of the circle are read,
+        then their exact distances are computed. At most limit places
+        are returned when limit is set.
+        """
+        (min_lat, max_lat), lons = geo.bounding_box(lat, lon, radius_km)
+        query = self.__session.query(Place).options(lazyload('*')).filter(
+            Place.latitude.between(min_lat, max_lat),
+            or_(*[Place.longitude.between(low, high) for low, high in lons]))
+        candidates = ((place, geo.point(place.latitude, place.longitude))
+                      for place in query.yield_per(self.__batch))
+        return geo.nearest(lat, lon, radius_km, candidates, limit)
+
+    def search(self, cls, text, limit=None):
+        """Return the objects of cls matching text, most relevant first
+
+        The searched columns of cls (text_index.fields) are ranked with
+        BM25 by the TextIndex of cls, then the best objects are loaded
+        by id. At most limit objects are returned when limit is set.
+        cls may be a class or a class name; a class without searched
+        columns raises ValueError.
+        """
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        if cls not in text_index.fields or cls not in classes:
+            raise ValueError("{} is not searchable".format(cls))
+        mapped = classes[cls]
+        index = self.__text_index(mapped)
+        with self.__texts_lock:
+            ids = [id for id, score in index.search(text, limit)]
+        found = self.__by_ids(mapped, ids)
+        return [found[id] for id in ids if id in found]
+
+    def query(self, cls):
+        """Return a query over the rows of cls, see models.engine.query
+
+        cls may be a class or a class name.
+        """
+        if isinstance(cls, str):
+            cls = classes[cls]
+        return DBQuery(self.__session, cls, self.__batch,
+                       None if self.__cache is None else self.__cached)
+
+    def columns(self, cls, *attrs):
+        """Return the columns attrs of cls, see models.engine.columns
+
+        Without attrs, the numeric, DateTime and foreign key columns are
+        returned. Only those columns are selected, batch rows at a time,
+        and no object is built. cls may be a class or a class name.
+        """
+        from models.engine import columns
+        if isinstance(cls, str):
+            if cls not in classes:
+                raise ValueError("{} has no columns".format(cls))
+            cls = classes[cls]
+        kinds = columns.kinds(cls, attrs)
+        rows = self.__session.query(*[getattr(cls, attr) for attr in kinds])
+        values = {attr: [] for attr in kinds}
+        appends = [values[attr].append for attr in kinds]
+        for row in rows.yield_per(self.__batch):
+            for append, value in zip(appends, row):
+                append(value)
+        return columns.Table.build(cls.__name__, kinds, values)
+
+    def cache_stats(self):
+        """Return the counters of the cache, or None if it is disabled"""
+        return None if self.__cache is None else self.__cache.stats()
+
     def new(self, obj):
         """Add obj to the current database session"""
         self.__session.add(obj)
+        self.__invalidate(type(obj))
+
+    def bulk_new(self, objs):
+        """Insert objs with one executemany per class and chunk
+
+        Each chunk is committed on its own, then the objects are attached
+        to the session as if they had been loaded from the database.
+        Objects the session already holds as persistent are skipped;
+        pending ones, passed to new(), are taken out of the session and
+        inserted with the others. A transaction the session has open
+        keeps its snapshot: under REPEATABLE READ it sees the new rows
+        once it ends.
+        """
+        session = self.__session()
+        by_class = {}
+        for obj in objs:
+            state = inspect(obj)
+            if state.persistent or state.deleted:
+                continue
+            if state.pending:
+                session.expunge(obj)
+            by_class.setdefault(type(obj), []).append(obj)
+        for cls, cls_objs in by_class.items():
+            columns = cls.__table__.columns.keys()
+            for start in range(0, len(cls_objs), self.__batch):
+                chunk = cls_objs[start:start + self.__batch]
+                texts = {(cls.__name__, obj.id): self.__text(obj)
+                         for obj in chunk}
+                self.__commit_many(insert(cls), [
+                    {name: obj.__dict__[name] for name in columns
+                     if name in obj.__dict__} for obj in chunk])
+                for obj in chunk:
+                    make_transient_to_detached(obj)
+                    session.add(obj)
+                self.__written(cls, texts)
+
+    def bulk_update(self, changes):
+        """Apply {<class name>.<id>: {attribute: value}} changes
+
+        Rows are updated by primary key with one executemany per class
+        and chunk, each chunk in its own transaction, and updated_at is
+        set on every row. Objects already loaded in the session are
+        updated too. A key that matches no row raises StaleDataError.
+        Rows whose searched columns change are read back for search().
+        """
+        now = datetime.utcnow()
+        by_class = {}
+        for key, attrs in changes.items():
+            cls_name, id = key.split('.', 1)
+            mapping = dict(attrs, id=id, updated_at=now)
+            by_class.setdefault(classes[cls_name], []).append(mapping)
+        session = self.__session()
+        for cls, mappings in by_class.items():
+            fields = text_index.fields.get(cls.__name__, ())
+            for start in range(0, len(mappings), self.__batch):
+                chunk = mappings[start:start + self.__batch]
+                self.__commit_many(update(cls), chunk)
+                for mapping in chunk:
+                    obj = session.identity_map.get(
+                        session.identity_key(cls, mapping['id']))
+                    if obj is not None:
+                        for name, value in mapping.items():
+                            set_committed_value(obj, name, value)
+                self.__written(cls, self.__read_texts(
+                    cls, [mapping['id'] for mapping in chunk
+                          if any(name in mapping for name in fields)]))
+
+    def touch(self, obj):
+        """Nothing to do: the session tracks attribute changes itself"""
+        pass
 
     def save(self):
-        """Commit all changes to the current database session"""
-        self.__session.commit()
+        """Commit all changes to the current database session
+
+        The classes written by the transaction move to a new generation
+        once it commits, see __flushing(). A failed commit is rolled
+        back before the error propagates, so the session stays usable.
+        """
+        try:
+            self.__session.commit()
+        except Exception:
+            self.__session.rollback()
+            raise
 
     def delete(self, obj=None):
         """Delete obj from the current database session"""
         if obj:
             self.__session.delete(obj)
+            self.__invalidate(type(obj))
 
     def reload(self):
         """Reload the database"""
         Base.metadata.create_all(self.__engine)
 
+        if self.__session is not None:
+            self.__session.remove()
         session_factory = sessionmaker(bind=self.__engine,
                                        expire_on_commit=False)
-        Session = scoped_session(session_factory)
+        event.listen(session_factory, 'after_begin', self.__began)
+        event.listen(session_factory, 'before_flush', self.__flushing)
+        event.listen(session_factory, 'after_commit', self.__committed)
+        event.listen(session_factory, 'after_rollback', self.__rolled_back)
+        self.__session = scoped_session(session_factory)
+        if self.__cache is not None:
+            self.__cache.clear()
+        self.__texts.clear()
+
+    def release(self):
+        """Close the session of the current thread and release it"""
+        self.__session.remove()
+
+    def close(self):
+        """Release the session of the current thread, at shutdown"""
+        self.release()
+
+    def __cached(self, cls, signature, run):
+        """Return the objects run() loads, reading the cache first"""
+        key = self.__key(cls, signature)
+        rows = self.__cache.get(key)
+        if rows is not None:
+            session = self.__session()
+            return [self.__merge(session, row) for row in rows]
+        clean = self.__clean()
+        objs = list(run())
+        if clean and self.__current(cls, key[1]):
+            self.__cache.put(key, [self.__row(obj) for obj in objs])
+        return objs
+
+    def __text_index(self, cls):
+        """Return the TextIndex of the searched columns of cls
+
+        The columns are streamed into a new index the first time. The
+        index is kept if it was read from a clean session and no write
+        committed since its transaction began, since that write found
+        no index to update.
+        """
+        index = self.__texts.get(cls.__name__)
+        if index is not None:
+            return index
+        generation = self.__generations.get(cls.__name__)
+        clean = self.__clean()
+        index = TextIndex()
+        columns = [getattr(cls, name)
+                   for name in text_index.fields[cls.__name__]]
+        rows = self.__session.query(cls.id, *columns)
+        for row in rows.yield_per(self.__batch):
+            index.add(row[0], text_index.document(row[1:]))
+        with self.__texts_lock:
+            if clean and self.__current(cls, generation) and \
+                    self.__generations.get(cls.__name__) == generation:
+                self.__texts.put(cls.__name__, index)
+        return index
+
+    def __text(self, obj):
+        """Return the text search() indexes for obj, or None"""
+        fields = text_index.fields.get(type(obj).__name__)
+        if fields is None:
+            return None
+        return text_index.document(getattr(obj, name) for name in fields)
+
+    def __read_texts(self, cls, ids):
+        """Return the texts search() indexes for the rows of cls in ids"""
+        texts = {}
+        if not ids or cls.__name__ not in text_index.fields:
+            return texts
+        columns = [getattr(cls, name)
+                   for name in text_index.fields[cls.__name__]]
+        with Session(self.__engine) as session:
+            for start in range(0, len(ids), self.__batch):
+                for row in session.query(cls.id, *columns).filter(
+                        cls.id.in_(ids[start:start + self.__batch])):
+                    texts[(cls.__name__, row[0])] = \
+                        text_index.document(row[1:])
+        return texts
+
+    def __written(self, cls, texts):
+        """Move cls to a new generation and index the committed texts"""
+        with self.__texts_lock:
+            self.__invalidate(cls)
+            self.__index(texts)
+
+    def __index(self, texts):
+        """Apply {(class name, id): text} to the kept TextIndexes
+
+        A text of None removes the id. Classes whose index is not kept
+        are skipped: they are read in full on their next search().
+        """
+        for (cls_name, id), text in texts.items():
+            index = self.__texts.get(cls_name)
+            if index is None:
+                continue
+            if text is None:
+                index.remove(id)
+            else:
+                index.add(id, text)
+
+    def __by_ids(self, cls, ids):
+        """Return {id: obj} for the objects of cls whose id is in ids"""
+        found = {}
+        missing = ids
+        if self.__cache is not None:
+            session = self.__session()
+            missing = []
+            generation = self.__generations.get(cls.__name__)
+            for id in ids:
+                row = self.__cache.get(self.__key(cls, ('id', id)))
+                if row is None:
+                    missing.append(id)
+                else:
+                    found[id] = self.__merge(session, row)
+            clean = self.__clean()
+        loaded = []
+        for start in range(0, len(missing), self.__batch):
+            query = self.__session.query(cls).options(lazyload('*'))
+            loaded += query.filter(
+                cls.id.in_(missing[start:start + self.__batch]))
+        if self.__cache is not None and clean and \
+                self.__current(cls, generation):
+            for obj in loaded:
+                self.__cache.put((cls.__name__, generation, ('id', obj.id)),
+                                 self.__row(obj))
+        found.update((obj.id, obj) for obj in loaded)
+        return found
+
+    def __key(self, cls, signature):
+        """Return the cache key of signature in the generation of cls"""
+        return cls.__name__, self.__generations.get(cls.__name__), signature
 
-        self.__session = Session()
+    def __current(self, cls, generation):
+        """Tell if the transaction of the session began in generation of cls
+
+        Rows it read may predate writes committed after it began, and
+        are not cached.
+        """
+        began = self.__session.info.get('generations')
+        return began is not None and began.get(cls.__name__) == generation
+
+    def __clean(self):
+        """Tell if the session holds no pending change
+
+        Rows are only cached from clean sessions, so that uncommitted
+        values never reach other sessions. Changes already flushed but
+        not committed count as pending.
+        """
+        session = self.__session
+        return not (session.new or session.dirty or session.deleted or
+                    session.info.get('flushed'))
+
+    def __row(self, obj):
+        """Return a detached copy of the column values of obj, as cached"""
+        copy = inspect(type(obj)).class_manager.new_instance()
+        for name in obj.__table__.columns.keys():
+            if name in obj.__dict__:
+                set_committed_value(copy, name, obj.__dict__[name])
+        make_transient_to_detached(copy)
+        return copy
+
+    def __merge(self, session, row):
+        """Return the object of session for a cached row
+
+        An object the session already holds is returned as it is, so
+        that its uncommitted changes are kept.
+        """
+        obj = session.identity_map.get(inspect(row).key)
+        if obj is None:
+            obj = session.merge(row, load=False)
+        return obj
+
+    def __began(self, session, transaction, connection):
+        """Remember the class generations a transaction begins in"""
+        session.info['generations'] = dict(self.__generations)
+
+    def __flushing(self, session, flush_context, instances):
+        """Remember the objects a flush is about to write
+
+        A flush, most often the autoflush before a query, empties
+        session.new, dirty and deleted long before the commit, so their
+        classes, and the text search() indexes for them, are kept in
+        the session until its transaction ends.
+        """
+        session.info.setdefault('flushed', set()).update(
+            type(obj) for objs in (session.new, session.dirty,
+                                   session.deleted) for obj in objs)
+        texts = session.info.setdefault('texts', {})
+        for objs, deleted in ((session.new, False), (session.dirty, False),
+                              (session.deleted, True)):
+            for obj in objs:
+                if type(obj).__name__ in text_index.fields:
+                    texts[(type(obj).__name__, obj.id)] = \
+                        None if deleted else self.__text(obj)
+
+    def __committed(self, session):
+        """Invalidate the classes written by the committed transaction
+        and bring their kept TextIndexes up to date"""
+        with self.__texts_lock:
+            for cls in session.info.pop('flushed', ()):
+                self.__invalidate(cls)
+            self.__index(session.info.pop('texts', {}))
+        session.info.pop('generations', None)
+
+    def __rolled_back(self, session):
+        """Forget the objects written by the rolled back transaction"""
+        session.info.pop('flushed', None)
+        session.info.pop('texts', None)
+        session.info.pop('generations', None)
+
+    def __invalidate(self, cls):
+        """Move cls to a new generation, leaving its cached rows unused"""
+        self.__generations[cls.__name__] = next(self.__counter)
+
+    def __commit_many(self, statement, rows):
+        """Execute statement once per row in one committed transaction
+
+        The transaction belongs to a session of its own, which leaves
+        the session of the calling thread as it was.
+        """
+        with Session(self.__engine) as session, session.begin():
+            session.execute(statement, rows)
@@ -1,39 +1,889 @@
 #!/usr/bin/python3
 """This module defines a class to manage file storage for hbnb clone"""
+import atexit
 import json
+import os
+import threading
+from datetime import datetime
+from os import getenv
+from models.engine.codec import codecs, JSONCodec
+from models.engine.compact import CompactTable
+from models.engine.record_file import RecordFile
+from models.engine.query import FileQuery
+from models.engine.sorted_index import SortedIndex
+from models.engine import geo
+from models.engine import parallel
+from models.engine import text_index
+from models.engine.text_index import TextIndex
 
 
 class FileStorage:
-    """This class manages storage of hbnb models in JSON format"""
+    """This class manages storage of hbnb models in JSON format
+
+    Besides the flat <class name>.<id> dictionary, objects are indexed
+    by class name so that listing one class does not scan the others.
+
+    With HBNB_FILE_JOURNAL=1, save() appends one change record per object
+    passed to new() or delete() since the last save to a journal next to
+    the snapshot instead of rewriting the whole file. reload() replays the
+    journal over the snapshot, and the journal is folded back into the
+    snapshot once it grows past HBNB_FILE_JOURNAL_MAX bytes.
+
+    Keys created, deleted or touched (BaseModel reports attribute
+    assignment) since the last save are tracked in __changed, and the JSON
+    text of every other object is cached from the previous write, so a
+    save only serializes the objects that actually changed.
+
+    With HBNB_FILE_LAZY=1, reload() keeps the records it reads as plain
+    dictionaries in __raw and only builds a model object the first time
+    it is looked up through all() or get().
+
+    With HBNB_FILE_COMPACT=1, reload() is lazy and keeps the records of
+    each class column by column in a models.engine.compact.CompactTable
+    (16-byte ids, integer microsecond timestamps) instead of one
+    dictionary per record, so a large store takes a fraction of the
+    memory until its objects are looked up.
+
+    The snapshot is written and read one record at a time, so saving or
+    reloading never holds a second copy of the whole store in memory.
+    It goes to a temporary file that is fsynced and renamed over
+    file.json, so a crash mid-save leaves the previous snapshot intact.
+
+    With HBNB_FILE_WRITE_BEHIND=1, save() only schedules a write: a
+    background thread waits up to HBNB_FILE_FLUSH_DELAY seconds so that
+    a burst of saves is coalesced into one write. flush() and close()
+    are the durability points. Storage methods share one lock with the
+    writer thread, so they wait while a write is in progress.
+
+    With HBNB_FILE_WORKERS set to more than 1, reload() reads a JSON
+    snapshot of at least HBNB_FILE_PARALLEL_MIN bytes (8 MiB by default)
+    with that many forked processes, see models.engine.parallel: each
+    decodes one shard of the file and builds its objects (or keeps its
+    records, when lazy), then the parent adds them in file order. Smaller
+    files, binary snapshots, platforms that cannot fork and files that
+    do not split cleanly are read serially.
+
+    HBNB_FILE_CODEC picks the snapshot format from models.engine.codec:
+    'json' (the default, file.json) or 'binary' (file.bin). In binary
+    mode an existing file.json is still loaded when there is no file.bin
+    yet, and the next save writes the binary snapshot.
+
+    With HBNB_FILE_RECORDS=1, there is no snapshot: objects live in an
+    append-only record file (file.rec) with a sorted key index, see
+    models.engine.record_file. reload() only maps those files, get()
+    reads a single record, all(cls) reads the records of one class and
+    count() reads the key index.
+    An existing file.json is imported into the record file on first use.
+
+    Objects of the classes in __foreign_keys are also indexed by the ids
+    their foreign keys point to, kept up to date by new(), delete() and
+    touch(), so children() lists the cities of a state or the reviews of
+    a place without scanning the store.
+
+    HBNB_FILE_INDEXES lists <class name>.<attribute> pairs, such as
+    Place.price_by_night, whose numeric values are kept in a sorted
+    index (models.engine.sorted_index) that query() uses for range
+    conditions and ordering. Indexes are updated one object at a time
+    by new(), delete() and touch(), and rebuilt in one sort after
+    reload(), bulk_new() or hydrating lazy records.
+
+    Objects of the classes in __spatial are bucketed by latitude and
+    longitude in a grid (models.engine.geo) for places_near().
+
+    The first search() of a class builds a full-text index of its
+    searched attributes (models.engine.text_index), then new(), delete()
+    and touch() keep it up to date. With HBNB_FILE_SEARCH_INDEX=1, the
+    indexes that changed are written to file.<class name>.fts on save
+    and read back by the first search() of a later run, re-indexing
+    only the objects whose text no longer matches.
+    """
     __file_path = 'file.json'
     __objects = {}
+    __classes = {}
+    __changed = set()
+    __fragments = {}
+    __raw = {}
+    __foreign_keys = {'City': ('state_id',), 'Place': ('city_id', 'user_id'),
+                      'Review': ('place_id', 'user_id')}
+    __children = {}
+    __parents = {}
+    __sorted = {}
+    __spatial = {'Place': ('latitude', 'longitude')}
+    __grids = {}
+    __texts = {}
+    __tables = {}
+    __deferred = 0
+    __stale = set()
+    __lock = threading.RLock()
 
-    def all(self, cls=None):
-        """Returns a dictionary of models currently in storage"""
-        if cls is None:
-            return FileStorage.__objects
-        else:
-            cls_dict = {}
-            for key, obj in FileStorage.__objects.items():
-                if cls == obj.__class__ or cls == obj.__class__.__name__:
-                    cls_dict[key] = obj
-            return cls_dict
+    def __init__(self):
+        """Read the storage settings from the environment"""
+        self.__journal = getenv('HBNB_FILE_JOURNAL') == '1'
+        self.__journal_max = int(getenv('HBNB_FILE_JOURNAL_MAX',
+                                        4 * 1024 * 1024))
+        self.__compact = getenv('HBNB_FILE_COMPACT') == '1'
+        self.__lazy = getenv('HBNB_FILE_LAZY') == '1' or self.__compact
+        self.__codec = codecs[getenv('HBNB_FILE_CODEC', 'json')]()
+        self.__records = getenv('HBNB_FILE_RECORDS') == '1'
+        self.__record_file = None
+        self.__hydrated = set()
+        self.__write_behind = getenv('HBNB_FILE_WRITE_BEHIND') == '1'
+        self.__flush_delay = float(getenv('HBNB_FILE_FLUSH_DELAY', 1.0))
+        self.__wakeup = threading.Condition()
+        self.__scheduled = False
+        self.__closing = False
+        self.__writer = None
+        self.__search_index = getenv('HBNB_FILE_SEARCH_INDEX') == '1'
+        self.__workers = int(getenv('HBNB_FILE_WORKERS', 1))
+        self.__parallel_min = int(getenv('HBNB_FILE_PARALLEL_MIN',
+                                         8 * 1024 * 1024))
+        for name in getenv('HBNB_FILE_INDEXES', '').split(','):
+            if name.strip():
+                self.add_index(*name.strip().split('.'))
+
+    @property
+    def snapshot_path(self):
+        """Path of the snapshot written in the configured format"""
+        return (os.path.splitext(FileStorage.__file_path)[0] +
+                self.__codec.extension)
+
+    @property
+    def record_path(self):
+        """Path of the record file used in records mode"""
+        return os.path.splitext(FileStorage.__file_path)[0] + '.rec'
+
+    def search_path(self, cls_name):
+        """Path of the saved full-text index of a class"""
+        return "{}.{}.fts".format(os.path.splitext(FileStorage.__file_path)[0],
+                                  cls_name)
+
+    @property
+    def journal_path(self):
+        """Path of the change journal kept next to the snapshot"""
+        return FileStorage.__file_path + '.log'
+
+    def all(self, cls=None, load=None):
+        """Returns a dictionary of models currently in storage
+
+        load is accepted for compatibility with DBStorage and ignored:
+        every stored object is already in memory.
+        """
+        with FileStorage.__lock:
+            if cls is None:
+                if FileStorage.__raw:
+                    self.__hydrate()
+                if self.__record_file is not None:
+                    self.__hydrate_records('')
+                return FileStorage.__objects
+            if not isinstance(cls, str):
+                cls = cls.__name__
+            if cls in FileStorage.__raw:
+                self.__hydrate(cls)
+            if self.__record_file is not None:
+                self.__hydrate_records(cls + '.')
+            return dict(FileStorage.__classes.get(cls, {}))
+
+    def get(self, cls, id):
+        """Returns the object of class cls with the given id, or None"""
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        key = "{}.{}".format(cls, id)
+        obj = FileStorage.__objects.get(key)
+        if obj is not None:
+            return obj
+        with FileStorage.__lock:
+            # another thread may be building it from its record
+            obj = FileStorage.__objects.get(key)
+            if obj is not None:
+                return obj
+            if key in FileStorage.__raw.get(cls, ()):
+                val = FileStorage.__raw[cls][key]
+                self.__remove(key)
+                obj = self.__models()[val['__class__']](**val)
+                self.__add(key, obj)
+            elif (self.__record_file is not None and
+                    key not in FileStorage.__changed):
+                val = self.__record_file.lookup(key)
+                if val is not None:
+                    obj = self.__models()[val['__class__']](**val)
+                    self.__add(key, obj)
+        return obj
+
+    def count(self, cls=None):
+        """Returns the number of objects in storage, or of class cls
+
+        Counted from the class index and the lazy records, and in record
+        file mode from the key index plus the unsaved changes, so no
+        object is built.
+        """
+        if cls is not None and not isinstance(cls, str):
+            cls = cls.__name__
+        with FileStorage.__lock:
+            if self.__record_file is not None:
+                prefix = '' if cls is None else cls + '.'
+                count = self.__record_file.count(prefix)
+                for key in FileStorage.__changed:
+                    if key.startswith(prefix):
+                        count += ((key in FileStorage.__objects) -
+                                  (key in self.__record_file))
+                return count
+            if cls is None:
+                return len(FileStorage.__objects) + \
+                    sum(len(raw) for raw in FileStorage.__raw.values())
+            return len(FileStorage.__classes.get(cls, ())) + \
+                len(FileStorage.__raw.get(cls, ()))
+
+    def children(self, cls, attr, id):
+        """Returns the stored objects of class cls whose attr is id
+
+        attr is looked up in the foreign-key index when it is declared
+        in __foreign_keys for cls; any other attribute is scanned for.
+        """
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        if not self.indexed(cls, attr):
+            return [obj for obj in self.all(cls).values()
+                    if getattr(obj, attr, None) == id]
+        with FileStorage.__lock:
+            self.__ready(cls)
+            index = FileStorage.__children.get((cls, attr), {})
+            return list(index.get(id, {}).values())
+
+    def indexed(self, cls, attr):
+        """Tells if children() reads attr of cls from an index"""
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        return attr in FileStorage.__foreign_keys.get(cls, ())
+
+    def add_index(self, cls, attr):
+        """Keeps the objects of cls in a sorted index on attr"""
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        with FileStorage.__lock:
+            indexes = FileStorage.__sorted.setdefault(cls, {})
+            if attr not in indexes:
+                indexes[attr] = SortedIndex()
+                FileStorage.__stale.add(cls)
+                self.__defer()
+                self.__resume()
+
+    def sorted_index(self, cls, attr):
+        """Returns the sorted index on attr of cls, or None"""
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        index = FileStorage.__sorted.get(cls, {}).get(attr)
+        if index is not None:
+            with FileStorage.__lock:
+                self.__ready(cls)
+        return index
+
+    def places_near(self, lat, lon, radius_km, limit=None):
+        """Returns the Places within radius_km of a point, nearest first
+
+        At most limit places are returned when limit is set.
+        """
+        with FileStorage.__lock:
+            self.__ready('Place')
+            grid = FileStorage.__grids.get('Place')
+            candidates = [] if grid is None else \
+                grid.candidates(lat, lon, radius_km)
+            return geo.nearest(lat, lon, radius_km, candidates, limit)
+
+    def search(self, cls, text, limit=None):
+        """Returns the objects of cls matching text, most relevant first
+
+        Objects match when a searched attribute contains any word of
+        text, and are ranked with BM25. At most limit objects are
+        returned when limit is set. A class without searched attributes
+        raises ValueError.
+        """
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        with FileStorage.__lock:
+            index = self.__text_index(cls)
+            return [FileStorage.__objects[key]
+                    for key, score in index.search(text, limit)]
+
+    def query(self, cls):
+        """Returns a query over the objects of cls, see models.engine.query"""
+        return FileQuery(self, cls)
+
+    def columns(self, cls, *attrs):
+        """Returns the columns attrs of cls, see models.engine.columns
+
+        Without attrs, the numeric, DateTime and foreign key columns are
+        returned. Values are read from the stored objects and straight
+        from the lazy or compact records, without building objects. The
+        table is kept until an object of cls is added, changed or
+        deleted.
+        """
+        from models.engine import columns
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        if cls not in self.__models():
+            raise ValueError("{} has no columns".format(cls))
+        kinds = columns.kinds(self.__models()[cls], attrs)
+        with FileStorage.__lock:
+            if self.__record_file is not None:
+                self.__hydrate_records(cls + '.')
+            tables = FileStorage.__tables.setdefault(cls, {})
+            table = tables.get(tuple(kinds))
+            if table is None:
+                objs = FileStorage.__classes.get(cls, {}).values()
+                records = FileStorage.__raw.get(cls, {})
+                values = {}
+                for attr in kinds:
+                    values[attr] = [getattr(obj, attr, None) for obj in objs]
+                    if isinstance(records, CompactTable):
+                        values[attr].extend(records.column(attr))
+                    else:
+                        values[attr].extend(val.get(attr)
+                                            for val in records.values())
+                table = tables[tuple(kinds)] = columns.Table.build(
+                    cls, kinds, values)
+            return table
 
     def new(self, obj):
         """Adds new object to storage dictionary"""
         key = "{}.{}".format(obj.__class__.__name__, obj.id)
-        FileStorage.__objects[key] = obj
+        with FileStorage.__lock:
+            self.__remove(key)
+            self.__add(key, obj)
+            FileStorage.__changed.add(key)
+
+    def bulk_new(self, objs):
+        """Adds every object of objs to storage and saves once"""
+        with FileStorage.__lock:
+            self.__defer()
+            try:
+                for obj in objs:
+                    key = "{}.{}".format(obj.__class__.__name__, obj.id)
+                    self.__remove(key)
+                    self.__add(key, obj)
+                    FileStorage.__changed.add(key)
+            finally:
+                self.__resume()
+        self.save()
+
+    def bulk_update(self, changes):
+        """Applies {<class name>.<id>: {attribute: value}} changes
+
+        updated_at is set on every updated object and storage is saved
+        once. Nothing is changed if a key is not in storage (KeyError).
+        The sorted indexes of the updated classes are rebuilt once.
+        """
+        now = datetime.utcnow()
+        with FileStorage.__lock:
+            objs = []
+            for key, attrs in changes.items():
+                obj = self.get(*key.split('.', 1))
+                if obj is None:
+                    raise KeyError(key)
+                objs.append((key, obj, attrs))
+            self.__defer()
+            try:
+                for key, obj, attrs in objs:
+                    for name, value in attrs.items():
+                        setattr(obj, name, value)
+                    obj.updated_at = now
+                    FileStorage.__changed.add(key)
+            finally:
+                self.__resume()
+        self.save()
+
+    def touch(self, obj):
+        """Flags a stored object as changed since the last save"""
+        key = "{}.{}".format(obj.__class__.__name__, obj.id)
+        if FileStorage.__objects.get(key) is obj:
+            with FileStorage.__lock:
+                FileStorage.__changed.add(key)
+                self.__drop_tables(key)
+                self.__link(key, obj)
+                self.__locate(key, obj)
+                self.__index_text(key, obj)
+                cls_name = key.split('.')[0]
+                indexes = FileStorage.__sorted.get(cls_name)
+                if indexes and FileStorage.__deferred:
+                    FileStorage.__stale.add(cls_name)
+                elif indexes:
+                    for attr, index in indexes.items():
+                        index.add(key, obj, obj.__dict__.get(attr))
 
     def save(self):
         """Saves storage dictionary to file"""
-        temp = {}
-        for key, obj in FileStorage.__objects.items():
-            temp[key] = obj.to_dict()
-        with open(FileStorage.__file_path, 'w') as f:
-            json.dump(temp, f)
+        if not self.__write_behind:
+            self.flush()
+            return
+        with self.__wakeup:
+            if self.__writer is None:
+                self.__closing = False
+                self.__writer = threading.Thread(target=self.__write_loop,
+                                                 daemon=True)
+                self.__writer.start()
+                atexit.register(self.close)
+            if not self.__scheduled:
+                self.__scheduled = True
+                self.__wakeup.notify()
+
+    def flush(self):
+        """Writes the changes made since the last write to disk"""
+        with self.__wakeup:
+            self.__scheduled = False
+        with FileStorage.__lock:
+            if self.__record_file is not None:
+                self.__record_file.append(self.__changes())
+                FileStorage.__changed.clear()
+            elif not self.__journal:
+                self.__write_snapshot()
+                FileStorage.__changed.clear()
+            else:
+                self.__append_journal()
+            if self.__search_index:
+                self.__write_text_indexes()
+
+    def release(self):
+        """Nothing to release at the end of a request: objects are shared
+        by every thread, and pending writes are left to the writer"""
+        pass
+
+    def close(self):
+        """Stops the background writer after flushing pending changes
+
+        Meant for process shutdown, see release() for the end of a
+        request.
+        """
+        with self.__wakeup:
+            writer = self.__writer
+            self.__writer = None
+            self.__closing = True
+            self.__wakeup.notify()
+        if writer is not None:
+            writer.join()
+            atexit.unregister(self.close)
+        if self.__scheduled:
+            self.flush()
+
+    def reset(self):
+        """Forgets every object, index and cached fragment held in memory,
+        as in a new process, leaving the files on disk alone"""
+        with FileStorage.__lock:
+            for state in (FileStorage.__objects, FileStorage.__classes,
+                          FileStorage.__changed, FileStorage.__fragments,
+                          FileStorage.__raw, FileStorage.__children,
+                          FileStorage.__parents, FileStorage.__sorted,
+                          FileStorage.__grids, FileStorage.__texts,
+                          FileStorage.__tables, FileStorage.__stale,
+                          self.__hydrated):
+                state.clear()
+            FileStorage.__deferred = 0
+
+    def compact(self):
+        """Folds the journal into a fresh snapshot and empties it
+
+        In records mode, pending changes are appended and the record
+        file is rewritten without the versions they superseded.
+        """
+        with FileStorage.__lock:
+            if self.__record_file is not None:
+                self.flush()
+                self.__record_file.compact()
+                return
+            self.__write_snapshot()
+            FileStorage.__changed.clear()
+            try:
+                os.remove(self.journal_path)
+            except FileNotFoundError:
+                pass
 
     def reload(self):
         """Loads storage dictionary from file"""
+        classes = self.__models()
+        with FileStorage.__lock:
+            if self.__records:
+                self.__open_records()
+                return
+            self.__defer()
+            try:
+                self.__read_snapshot(self.snapshot_path, self.__codec,
+                                     classes)
+            except FileNotFoundError:
+                if not isinstance(self.__codec, JSONCodec):
+                    try:
+                        self.__read_snapshot(FileStorage.__file_path,
+                                             JSONCodec(), classes)
+                    except FileNotFoundError:
+                        pass
+            finally:
+                self.__resume()
+            if self.__journal:
+                self.__replay(classes)
+            for records in FileStorage.__raw.values():
+                if isinstance(records, CompactTable):
+                    records.pack()
+
+    def delete(self, obj=None):
+        """Deletes an object from __objects if it exists"""
+        if obj is not None:
+            key = "{}.{}".format(obj.__class__.__name__, obj.id)
+            with FileStorage.__lock:
+                if self.__remove(key):
+                    FileStorage.__changed.add(key)
+
+    def __write_loop(self):
+        """Coalesces scheduled saves into one write per flush delay"""
+        while True:
+            with self.__wakeup:
+                self.__wakeup.wait_for(
+                    lambda: self.__scheduled or self.__closing)
+                self.__wakeup.wait_for(lambda: self.__closing,
+                                       self.__flush_delay)
+                if self.__closing:
+                    return
+            try:
+                self.flush()
+            except OSError:
+                with self.__wakeup:
+                    self.__scheduled = True
+
+    def __changes(self):
+        """Returns (key, JSON text) for every changed key, None if deleted"""
+        changes = []
+        for key in FileStorage.__changed:
+            obj = FileStorage.__objects.get(key)
+            if obj is None:
+                changes.append((key, None))
+            elif isinstance(self.__codec, JSONCodec):
+                changes.append((key, self.__fragment(key, obj)))
+            else:
+                changes.append((key, json.dumps(obj.to_dict())))
+        return changes
+
+    def __append_journal(self):
+        """Appends a record for every changed key to the journal"""
+        lines = []
+        for key, text in self.__changes():
+            if text is None:
+                lines.append('["del",{}]\n'.format(json.dumps(key)))
+            else:
+                lines.append('["put",{},{}]\n'.format(json.dumps(key),
+                                                      text))
+        FileStorage.__changed.clear()
+        if lines:
+            with open(self.journal_path, 'a') as f:
+                f.write(''.join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+        if (os.path.exists(self.journal_path) and
+                os.path.getsize(self.journal_path) > self.__journal_max):
+            self.compact()
+
+    def __add(self, key, obj):
+        """Registers obj under key in __objects and the class index"""
+        FileStorage.__objects[key] = obj
+        self.__drop_tables(key)
+        for fragments in FileStorage.__fragments.values():
+            fragments.pop(key, None)
+        cls_name = key.split('.')[0]
+        FileStorage.__classes.setdefault(cls_name, {})[key] = obj
+        self.__link(key, obj)
+        self.__locate(key, obj)
+        self.__index_text(key, obj)
+        indexes = FileStorage.__sorted.get(cls_name)
+        if indexes and FileStorage.__deferred:
+            FileStorage.__stale.add(cls_name)
+        elif indexes:
+            for attr, index in indexes.items():
+                index.add(key, obj, obj.__dict__.get(attr))
+
+    def __drop_tables(self, key):
+        """Forgets the column tables of the class of key"""
+        if FileStorage.__tables:
+            FileStorage.__tables.pop(key.split('.')[0], None)
+
+    def __link(self, key, obj):
+        """Files obj under the ids its foreign keys point to"""
+        cls_name = key.split('.')[0]
+        fks = FileStorage.__foreign_keys.get(cls_name)
+        if fks is None:
+            return
+        self.__unlink(key)
+        parents = {}
+        for fk in fks:
+            parent_id = obj.__dict__.get(fk)
+            if parent_id is not None:
+                index = FileStorage.__children.setdefault((cls_name, fk), {})
+                index.setdefault(parent_id, {})[key] = obj
+                parents[fk] = parent_id
+        FileStorage.__parents[key] = parents
+
+    def __locate(self, key, obj):
+        """Files obj in the grid of its class by its position"""
+        cls_name = key.split('.')[0]
+        spatial = FileStorage.__spatial.get(cls_name)
+        if spatial is not None:
+            grid = FileStorage.__grids.setdefault(cls_name, geo.GridIndex())
+            grid.add(key, obj, obj.__dict__.get(spatial[0]),
+                     obj.__dict__.get(spatial[1]))
+
+    def __index_text(self, key, obj):
+        """Updates the full-text index of the class of obj, if any"""
+        cls_name = key.split('.')[0]
+        index = FileStorage.__texts.get(cls_name)
+        if index is not None:
+            index.add(key, text_index.document(
+                obj.__dict__.get(name)
+                for name in text_index.fields[cls_name]))
+
+    def __text_index(self, cls_name):
+        """Returns the full-text index of a class, building it if needed"""
+        if cls_name not in text_index.fields:
+            raise ValueError("{} is not searchable".format(cls_name))
+        self.__ready(cls_name)
+        index = FileStorage.__texts.get(cls_name)
+        if index is None:
+            index = self.__read_text_index(cls_name)
+            objs = FileStorage.__classes.get(cls_name, {})
+            for key in index.keys():
+                if key not in objs:
+                    index.remove(key)
+            FileStorage.__texts[cls_name] = index
+            for key, obj in objs.items():
+                self.__index_text(key, obj)
+        return index
+
+    def __read_text_index(self, cls_name):
+        """Returns the saved full-text index of a class, or a new one"""
+        if self.__search_index:
+            try:
+                with open(self.search_path(cls_name), 'r') as f:
+                    return TextIndex.from_state(json.load(f))
+            except (FileNotFoundError, ValueError, KeyError):
+                pass
+        return TextIndex()
+
+    def __write_text_indexes(self):
+        """Writes the full-text indexes changed since the last write"""
+        for cls_name, index in FileStorage.__texts.items():
+            if index.changed:
+                self.__replace_file(self.search_path(cls_name),
+                                    lambda f: json.dump(index.state(), f))
+                index.changed = False
+
+    def __unlink(self, key):
+        """Drops key from the foreign-key index"""
+        cls_name = key.split('.')[0]
+        for fk, parent_id in FileStorage.__parents.pop(key, {}).items():
+            index = FileStorage.__children[(cls_name, fk)]
+            del index[parent_id][key]
+            if not index[parent_id]:
+                del index[parent_id]
+
+    def __remove(self, key):
+        """Drops key from storage, returning True if it was stored"""
+        found = FileStorage.__objects.pop(key, None) is not None
+        self.__drop_tables(key)
+        self.__unlink(key)
+        for fragments in FileStorage.__fragments.values():
+            fragments.pop(key, None)
+        cls_name = key.split('.')[0]
+        if cls_name in FileStorage.__grids:
+            FileStorage.__grids[cls_name].remove(key)
+        if cls_name in FileStorage.__texts:
+            FileStorage.__texts[cls_name].remove(key)
+        indexes = FileStorage.__sorted.get(cls_name)
+        if indexes and FileStorage.__deferred:
+            FileStorage.__stale.add(cls_name)
+        elif indexes:
+            for index in indexes.values():
+                index.remove(key)
+        for index in (FileStorage.__classes, FileStorage.__raw):
+            cls_objs = index.get(cls_name)
+            if cls_objs is not None and key in cls_objs:
+                del cls_objs[key]
+                if not cls_objs:
+                    del index[cls_name]
+                found = True
+        return found
+
+    def __load(self, key, val, classes):
+        """Registers a record read from disk, building it unless lazy"""
+        if self.__lazy:
+            self.__remove(key)
+            name = key.split('.')[0]
+            records = FileStorage.__raw.get(name)
+            if records is None:
+                records = FileStorage.__raw[name] = \
+                    CompactTable(name) if self.__compact else {}
+            records[key] = val
+        else:
+            self.__add(key, classes[val['__class__']](**val))
+
+    def __open_records(self):
+        """Maps the record file, importing file.json into a new one"""
+        if self.__record_file is None:
+            self.__record_file = RecordFile(self.record_path)
+        else:
+            self.__record_file.open()
+        self.__hydrated.clear()
+        if (self.__record_file.count() == 0 and
+                os.path.exists(FileStorage.__file_path)):
+            with open(FileStorage.__file_path, 'r') as f:
+                self.__record_file.append(
+                    [(key, json.dumps(val))
+                     for key, val in JSONCodec().read(f)])
+            self.__record_file.compact()
+
+    def __hydrate_records(self, prefix):
+        """Builds every object of the record file whose key has prefix"""
+        if '' in self.__hydrated or prefix in self.__hydrated:
+            return
+        classes = self.__models()
+        record_file = self.__record_file
+        self.__defer()
+        try:
+            for key in list(record_file.keys(prefix)):
+                if (key not in FileStorage.__objects and
+                        key not in FileStorage.__changed):
+                    val = record_file.lookup(key)
+                    self.__add(key, classes[val['__class__']](**val))
+        finally:
+            self.__resume()
+        self.__hydrated.add(prefix)
+
+    def __hydrate(self, cls_name=None):
+        """Builds the raw records of one class, or of every class"""
+        classes = self.__models()
+        names = [cls_name] if cls_name else list(FileStorage.__raw)
+        self.__defer()
+        try:
+            for name in names:
+                for key, val in FileStorage.__raw.pop(name, {}).items():
+                    self.__add(key, classes[val['__class__']](**val))
+        finally:
+            self.__resume()
+
+    def __ready(self, cls_name):
+        """Builds the lazy and record file objects of a class"""
+        if cls_name in FileStorage.__raw:
+            self.__hydrate(cls_name)
+        if self.__record_file is not None:
+            self.__hydrate_records(cls_name + '.')
+
+    def __defer(self):
+        """Stops sorted index upkeep until the matching __resume()"""
+        FileStorage.__deferred += 1
+
+    def __resume(self):
+        """Rebuilds the sorted indexes left stale since __defer()"""
+        FileStorage.__deferred -= 1
+        if FileStorage.__deferred:
+            return
+        for cls_name in FileStorage.__stale:
+            objs = FileStorage.__classes.get(cls_name, {})
+            for attr, index in FileStorage.__sorted.get(cls_name,
+                                                        {}).items():
+                index.rebuild((key, obj, obj.__dict__.get(attr))
+                              for key, obj in objs.items())
+        FileStorage.__stale.clear()
+
+    def __fragment(self, key, obj):
+        """Returns the encoded obj, re-encoding it only if changed"""
+        codec = self.__codec
+        fragments = FileStorage.__fragments.setdefault(codec.name, {})
+        data = fragments.get(key)
+        if data is None or key in FileStorage.__changed:
+            data = codec.dump(obj)
+            fragments[key] = data
+        return data
+
+    def __snapshot_items(self):
+        """Yields (key, fragment) for every stored object and raw record"""
+        for key, obj in FileStorage.__objects.items():
+            yield key, self.__fragment(key, obj)
+        for records in FileStorage.__raw.values():
+            for key, val in records.items():
+                yield key, self.__codec.encode(val)
+
+    def __write_snapshot(self):
+        """Atomically replaces the snapshot with every stored object"""
+        self.__replace_file(
+            self.snapshot_path,
+            lambda f: self.__codec.write(f, self.__snapshot_items()),
+            'wb' if self.__codec.binary else 'w')
+
+    def __replace_file(self, path, write, mode='w'):
+        """Atomically replaces the file at path with what write(f) writes"""
+        tmp_path = path + '.tmp'
+        try:
+            with open(tmp_path, mode) as f:
+                write(f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        dir_fd = os.open(os.path.dirname(path) or '.', os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+    def __read_snapshot(self, path, codec, classes):
+        """Loads every record of the snapshot at path"""
+        if (self.__workers > 1 and isinstance(codec, JSONCodec) and
+                parallel.available() and
+                os.path.getsize(path) >= self.__parallel_min):
+            try:
+                shards = parallel.read(path, self.__workers,
+                                       None if self.__lazy else classes)
+            except ValueError:
+                shards = None
+            if shards is not None:
+                for pairs in shards:
+                    for key, val in pairs:
+                        if self.__lazy:
+                            self.__load(key, val, classes)
+                        else:
+                            self.__add(key, val)
+                return
+        with open(path, 'rb' if codec.binary else 'r') as f:
+            for key, val in codec.read(f):
+                self.__load(key, val, classes)
+
+    def __replay(self, classes):
+        """Applies the journal records on top of the loaded snapshot
+
+        Records are only ever appended, so a crash can only tear the tail:
+        everything from the first unterminated or unreadable record on is
+        dropped and cut off the file so later appends start on a clean line.
+        """
+        try:
+            f = open(self.journal_path, 'r+b')
+        except FileNotFoundError:
+            return
+        with f:
+            good = 0
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                if line.strip():
+                    try:
+                        record = json.loads(line.decode('utf-8'))
+                    except ValueError:
+                        break
+                    if record[0] == "put":
+                        self.__load(record[1], record[2], classes)
+                    elif record[0] == "del":
+                        self.__remove(record[1])
+                good += len(line)
+            f.truncate(good)
+
+    def __models(self):
+        """Returns the model classes storage knows how to rebuild"""
         from models.base_model import BaseModel
         from models.user import User
         from models.place import Place
@@ -42,25 +892,8 @@ class FileStorage:
         from models.amenity import Amenity
         from models.review import Review
 
-        classes = {
+        return {
             'BaseModel': BaseModel, 'User': User, 'Place': Place,
             'State': State, 'City': City, 'Amenity': Amenity,
             'Review': Review
         }
-        try:
-            with open(FileStorage.__file_path, 'r') as f:
-                temp = json.load(f)
-                for key, val in temp.items():
-                    cls_name = val['__class__']
-                    cls = classes[cls_name]
-                    obj = cls(**val)
-                    FileStorage.__objects[key] = obj
-        except FileNotFoundError:
-            pass
-
-    def delete(self, obj=None):
-        """Deletes an object from __objects if it exists"""
-        if obj is not None:
-            key = "{}.{}".format(obj.__class__.__name__, obj.id)
-            if key in FileStorage.__objects:
-                del FileStorage.__objects[key]
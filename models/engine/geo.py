@@ -0,0 +1,137 @@
+#!/usr/bin/python3
+"""This module defines the geospatial helpers behind storage.places_near()
+
+Distances are great-circle distances from the haversine formula. A
+search first narrows the places to those inside the bounding box of
+the search circle, then computes the distance of every candidate in
+one pass over precomputed radians and latitude cosines, and keeps the
+ones inside the circle, nearest first.
+"""
+import heapq
+from math import asin, cos, degrees, pi, radians, sin, sqrt
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def bounding_box(lat, lon, radius_km):
+    """Returns the latitude range and the longitude ranges around a point
+
+    The result is ((min_lat, max_lat), [(min_lon, max_lon), ...]): the
+    longitude range is split in two when the box crosses the
+    antimeridian and covers every longitude when it reaches a pole.
+    """
+    if not -90 <= lat <= 90:
+        raise ValueError("latitude must be between -90 and 90")
+    if radius_km < 0:
+        raise ValueError("radius must not be negative")
+    dlat = degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = lat - dlat, lat + dlat
+    if min_lat <= -90 or max_lat >= 90:
+        return (max(min_lat, -90), min(max_lat, 90)), [(-180, 180)]
+    dlon = degrees(asin(min(1, sin(radians(dlat)) / cos(radians(lat)))))
+    min_lon, max_lon = lon - dlon, lon + dlon
+    if min_lon < -180:
+        lons = [(min_lon + 360, 180), (-180, max_lon)]
+    elif max_lon > 180:
+        lons = [(min_lon, 180), (-180, max_lon - 360)]
+    else:
+        lons = [(min_lon, max_lon)]
+    return (min_lat, max_lat), lons
+
+
+def point(lat, lon):
+    """Returns the latitude and longitude in radians and cos latitude"""
+    lat = radians(lat)
+    return lat, radians(lon), cos(lat)
+
+
+def nearest(lat, lon, radius_km, candidates, limit=None):
+    """Returns the objects of candidates within radius_km, nearest first
+
+    candidates is an iterable of (obj, (latitude, longitude, cos
+    latitude)) pairs as built by point().
+    """
+    lat1, lon1, cos1 = point(lat, lon)
+    # compare haversine terms rather than distances: one asin at the end
+    limit_h = sin(min(radius_km / EARTH_RADIUS_KM, pi) / 2)
+    limit_h *= limit_h
+    found = []
+    for obj, (lat2, lon2, cos2) in candidates:
+        h = (sin((lat2 - lat1) / 2) ** 2 +
+             cos1 * cos2 * sin((lon2 - lon1) / 2) ** 2)
+        if h <= limit_h:
+            found.append((h, len(found), obj))
+    if limit is None:
+        found.sort()
+    else:
+        found = heapq.nsmallest(limit, found)
+    return [obj for h, i, obj in found]
+
+
+def distance(lat1, lon1, lat2, lon2):
+    """Returns the great-circle distance between two points in km"""
+    lat1, lon1, cos1 = point(lat1, lon1)
+    lat2, lon2, cos2 = point(lat2, lon2)
+    h = (sin((lat2 - lat1) / 2) ** 2 +
+         cos1 * cos2 * sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * asin(min(1, sqrt(h)))
+
+
+class GridIndex:
+    """Objects bucketed by position in cells of cell x cell degrees
+
+    Objects without a numeric latitude and longitude are not indexed.
+    """
+
+    def __init__(self, cell=0.1):
+        """Creates an empty index"""
+        self.cell = cell
+        self.__cells = {}
+        self.__points = {}
+
+    def __len__(self):
+        """Returns the number of indexed objects"""
+        return len(self.__points)
+
+    def add(self, key, obj, lat, lon):
+        """Files obj at (lat, lon), replacing where key was filed"""
+        self.remove(key)
+        if type(lat) not in (int, float) or type(lon) not in (int, float):
+            return
+        cell = (int(lat // self.cell), int(lon // self.cell))
+        self.__cells.setdefault(cell, {})[key] = obj
+        self.__points[key] = (cell, point(lat, lon))
+
+    def remove(self, key):
+        """Drops key from the index if it is there"""
+        entry = self.__points.pop(key, None)
+        if entry is not None:
+            objs = self.__cells[entry[0]]
+            del objs[key]
+            if not objs:
+                del self.__cells[entry[0]]
+
+    def candidates(self, lat, lon, radius_km):
+        """Yields (obj, point) for the objects in the cells around a circle
+
+        When the bounding box spans more cells than there are objects,
+        every object is yielded instead.
+        """
+        (min_lat, max_lat), lons = bounding_box(lat, lon, radius_km)
+        rows = range(int(min_lat // self.cell), int(max_lat // self.cell) + 1)
+        spans = [range(int(a // self.cell), int(b // self.cell) + 1)
+                 for a, b in lons]
+        points = self.__points
+        if len(rows) * sum(len(span) for span in spans) > len(points):
+            for objs in self.__cells.values():
+                for key, obj in objs.items():
+                    yield obj, points[key][1]
+            return
+        cells = self.__cells
+        for row in rows:
+            for span in spans:
+                for col in span:
+                    objs = cells.get((row, col))
+                    if objs:
+                        for key, obj in objs.items():
+                            yield obj, points[key][1]
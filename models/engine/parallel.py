@@ -0,0 +1,172 @@
+#!/usr/bin/python3
+"""This module reads a file.json snapshot with a pool of processes
+
+The snapshot, one JSON object mapping <class name>.<id> to records, is
+cut into one shard per worker: past each even cut point, the shard
+starts at the next `, "<key>": {`, the way records follow each other.
+Each worker reads its bytes, decodes them as one JSON object with
+json.loads and, unless the records are kept raw, builds their model
+objects. Unpickling a mapped object costs about as much as building it,
+so workers send back the attributes each constructor set instead, and
+the parent puts them in a bare instance made the way SQLAlchemy makes
+the ones it loads (Mapper.class_manager.new_instance()), in file order.
+No constructor runs in the parent, so the mappers are configured first:
+reload() can be the first thing to use the models in a process.
+
+A cut can still land inside a record, at a key whose value is a
+dictionary. The shard before such a cut then ends inside a record and
+never decodes, so a bad cut raises ValueError instead of yielding
+wrong records: the caller reads the file serially then, which also
+reports a file that is really malformed.
+
+Workers are forked, so they share the classes and settings of the
+parent without importing models again (which would reload storage);
+available() tells if the platform can fork. Calls and results go
+through pipes from the calling thread: reload() runs while models is
+being imported, and a pool's feeder thread would wait for that import
+to pickle anything that refers to models.
+"""
+import json
+import multiprocessing
+import os
+import re
+from sqlalchemy import inspect
+from sqlalchemy.orm import configure_mappers
+
+BOUNDARY = re.compile(rb',\s*("(?:[^"\\]|\\.)*"\s*:\s*\{)')
+WINDOW = 1 << 16
+
+
+def available():
+    """Tells if worker processes can be forked"""
+    return 'fork' in multiprocessing.get_all_start_methods()
+
+
+def cuts(path, count):
+    """Returns the byte offsets of up to count shards of the snapshot
+
+    The first shard starts past the opening brace, the others at the
+    key of a record, as far as the text tells.
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        head = f.read(WINDOW)
+        start = len(head) - len(head.lstrip())
+        if head[start:start + 1] != b'{':
+            raise ValueError("{} is not a JSON object".format(path))
+        offsets = [start + 1]
+        for i in range(1, count):
+            pos = max(size * i // count, offsets[-1])
+            found = None
+            while found is None and pos < size:
+                f.seek(pos)
+                data = f.read(WINDOW)
+                match = BOUNDARY.search(data)
+                if match is not None:
+                    found = pos + match.start(1)
+                elif len(data) < WINDOW:
+                    break
+                else:
+                    # keep a key cut off at the window end
+                    pos += WINDOW - 1024
+            if found is None:
+                break
+            if found > offsets[-1]:
+                offsets.append(found)
+    return offsets
+
+
+def read_shard(path, start, end, classes):
+    """Returns the (key, value) pairs of the bytes of path from start to end
+
+    end is None for the last shard, which holds the closing brace.
+    Values are records, or objects of classes when classes is given.
+    Raises ValueError if the bytes are not the inside of a JSON object.
+    """
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read() if end is None else f.read(end - start)
+    text = data.decode('utf-8').rstrip()
+    closing = '}' if end is None else ','
+    if text and not text.endswith(closing):
+        raise ValueError("shard of {} cut inside a record".format(path))
+    records = json.loads('{' + text[:-1] + '}')
+    if classes is None:
+        return list(records.items())
+    return [(key, classes[val['__class__']](**val))
+            for key, val in records.items()]
+
+
+def read(path, workers, classes=None):
+    """Returns the shards of (key, value) pairs of the snapshot at path
+
+    Shards are read by up to workers processes and returned in file
+    order. Values are records, or objects when classes maps class names
+    to models. Raises what reading a shard raised, ValueError when a
+    shard does not decode or a worker dies.
+    """
+    if classes is not None:
+        configure_mappers()
+    offsets = cuts(path, workers)
+    ends = offsets[1:] + [None]
+    context = multiprocessing.get_context('fork')
+    jobs = []
+    try:
+        for start, end in zip(offsets, ends):
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(target=_work, daemon=True,
+                                      args=(sender, path, start, end,
+                                            classes))
+            jobs.append((process, receiver))
+            process.start()
+            sender.close()
+        shards = []
+        for process, receiver in jobs:
+            try:
+                done, value = receiver.recv()
+            except EOFError:
+                raise ValueError("worker reading {} died".format(path))
+            if not done:
+                raise value
+            if classes is not None:
+                value = [(key, rebuild(classes[name], attrs))
+                         for key, name, attrs in value]
+            shards.append(value)
+        return shards
+    finally:
+        for process, receiver in jobs:
+            receiver.close()
+            if process.pid is not None:
+                process.terminate()
+                process.join()
+
+
+def rebuild(cls, attrs):
+    """Returns an instance of cls holding attrs, without calling __init__"""
+    mapper = inspect(cls, raiseerr=False)
+    if mapper is None:
+        obj = cls.__new__(cls)
+    else:
+        obj = mapper.class_manager.new_instance()
+    obj.__dict__.update(attrs)
+    return obj
+
+
+def _work(sender, path, start, end, classes):
+    """Sends (True, pairs) of a shard to the parent, (False, error) if
+    reading it fails
+
+    Objects are sent as (key, class name, attributes) triples.
+    """
+    try:
+        pairs = read_shard(path, start, end, classes)
+        if classes is not None:
+            pairs = [(key, type(obj).__name__,
+                      {name: value for name, value in obj.__dict__.items()
+                       if name != '_sa_instance_state'})
+                     for key, obj in pairs]
+        result = True, pairs
+    except Exception as e:
+        result = False, e
+    sender.send(result)
+    sender.close()
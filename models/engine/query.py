@@ -0,0 +1,278 @@
+#!/usr/bin/python3
+"""This module defines the query builder returned by storage.query(cls)
+
+A query is built by chaining filter(), order_by(), limit() and offset(),
+each returning a new query, and is only run when it is iterated:
+
+    storage.query(Place).filter(price_by_night__lt=100, max_guest__ge=4)
+                        .order_by("-price_by_night").limit(10)
+
+filter() takes <attribute>__<operator>=<value> conditions, all of which
+must hold; a bare <attribute>=<value> tests equality. order_by() takes
+attribute names, prefixed with '-' for descending order. As in SQL, an
+attribute that is None only matches <attribute>=None, and None sorts
+before every other value.
+"""
+from abc import ABC, abstractmethod
+from functools import cmp_to_key
+import heapq
+from itertools import groupby, islice
+import operator
+from sqlalchemy.orm import lazyload
+from models.engine.sorted_index import numeric
+
+operators = {
+    'eq': operator.eq, 'ne': operator.ne, 'lt': operator.lt,
+    'le': operator.le, 'gt': operator.gt, 'ge': operator.ge,
+    'in': lambda value, choices: value in choices
+}
+
+
+class Query(ABC):
+    """The engine independent part of a query: its conditions and order
+
+    Attributes:
+        cls (str): name of the queried class
+        conditions (list): (attribute, operator name, value) triples
+        ordering (list): (attribute, descending) pairs
+    """
+
+    def __init__(self, cls):
+        """Starts a query over every object of cls"""
+        self.cls = cls if isinstance(cls, str) else cls.__name__
+        self.conditions = []
+        self.ordering = []
+        self._limit = None
+        self._offset = 0
+
+    def filter(self, **conditions):
+        """Returns the query narrowed to objects meeting every condition"""
+        query = self.__copy()
+        for lookup, value in conditions.items():
+            attr, sep, op = lookup.rpartition('__')
+            if not sep or op not in operators:
+                attr, op = lookup, 'eq'
+            query.conditions.append((attr, op, value))
+        return query
+
+    def order_by(self, *attrs):
+        """Returns the query sorted by attrs, '-' marking descending"""
+        query = self.__copy()
+        for attr in attrs:
+            query.ordering.append((attr.lstrip('-'), attr.startswith('-')))
+        return query
+
+    def limit(self, count):
+        """Returns the query stopping after count objects"""
+        query = self.__copy()
+        query._limit = count
+        return query
+
+    def offset(self, count):
+        """Returns the query skipping its first count objects"""
+        query = self.__copy()
+        query._offset = count
+        return query
+
+    def first(self):
+        """Returns the first object of the query, or None"""
+        for obj in self.limit(1):
+            return obj
+        return None
+
+    @abstractmethod
+    def __iter__(self):
+        """Runs the query, yielding matching objects one at a time"""
+
+    def __copy(self):
+        """Returns a query with the same settings"""
+        query = self.__class__.__new__(self.__class__)
+        query.__dict__.update(self.__dict__)
+        query.conditions = list(self.conditions)
+        query.ordering = list(self.ordering)
+        return query
+
+
+class FileQuery(Query):
+    """A query run over the objects of FileStorage
+
+    Candidates come from the foreign-key index when a condition tests
+    an indexed foreign key for equality, or else from a sorted index
+    when conditions bound an attribute that has one. Iteration stops as
+    soon as offset + limit objects matched if there is no ordering, or
+    if the first ordering attribute has a sorted index, which is then
+    walked in order. Other ordered queries with a limit only keep the
+    best offset + limit objects, in a heap.
+    """
+
+    def __init__(self, storage, cls):
+        """Starts a query over the objects of cls in storage"""
+        super().__init__(cls)
+        self.storage = storage
+
+    def __iter__(self):
+        """Runs the query, yielding matching objects one at a time"""
+        index = None
+        if self.ordering and not self.__by_foreign_key():
+            index = self.storage.sorted_index(self.cls, self.ordering[0][0])
+        if index is not None:
+            matches = self.__walk(index)
+        else:
+            matches = (obj for obj in self.__candidates()
+                       if self.__match(obj))
+        if self.ordering and index is None:
+            key = cmp_to_key(self.__compare)
+            if self._limit is None:
+                matches = iter(sorted(matches, key=key))
+            else:
+                matches = iter(heapq.nsmallest(self._offset + self._limit,
+                                               matches, key=key))
+        end = None if self._limit is None else self._offset + self._limit
+        yield from islice(matches, self._offset, end)
+
+    def __by_foreign_key(self):
+        """Returns the foreign-key condition to read candidates from"""
+        for attr, op, value in self.conditions:
+            if op == 'eq' and self.storage.indexed(self.cls, attr):
+                return attr, value
+        return None
+
+    def __candidates(self):
+        """Returns an iterable of the objects that may match"""
+        foreign_key = self.__by_foreign_key()
+        if foreign_key is not None:
+            return self.storage.children(self.cls, *foreign_key)
+        for attr, op, value in self.conditions:
+            bounds = self.__bounds(attr)
+            if bounds is not None:
+                index = self.storage.sorted_index(self.cls, attr)
+                if index is not None:
+                    return (obj for value, obj in index.range(*bounds))
+        return list(self.storage.all(self.cls).values())
+
+    def __walk(self, index):
+        """Yields the matches in order, walking the sorted index"""
+        attr, descending = self.ordering[0]
+        key = cmp_to_key(self.__compare)
+        bounds = self.__bounds(attr)
+        others = []
+        if bounds is None:
+            bounds = (None, None, False, False)
+            others = sorted((obj for obj in index.others()
+                             if self.__match(obj)), key=key)
+        if not descending:
+            yield from others
+        pairs = index.range(*bounds, reverse=descending)
+        for value, group in groupby(pairs, key=operator.itemgetter(0)):
+            objs = [obj for value, obj in group if self.__match(obj)]
+            if len(self.ordering) > 1:
+                objs.sort(key=key)
+            yield from objs
+        if descending:
+            yield from others
+
+    def __bounds(self, attr):
+        """Returns the range the numeric conditions on attr allow, or None
+
+        The range is a (low, high, low_open, high_open) tuple as taken
+        by SortedIndex.range().
+        """
+        low = high = None
+        low_open = high_open = found = False
+        for name, op, value in self.conditions:
+            if name != attr or op == 'ne' or op == 'in' or \
+                    not numeric(value):
+                continue
+            found = True
+            if op in ('eq', 'gt', 'ge') and (
+                    low is None or value > low or
+                    (value == low and op == 'gt')):
+                low, low_open = value, op == 'gt'
+            if op in ('eq', 'lt', 'le') and (
+                    high is None or value < high or
+                    (value == high and op == 'lt')):
+                high, high_open = value, op == 'lt'
+        return (low, high, low_open, high_open) if found else None
+
+    def __match(self, obj):
+        """Tells if obj meets every condition"""
+        for attr, op, value in self.conditions:
+            current = getattr(obj, attr, None)
+            if current is None:
+                if op != 'eq' or value is not None:
+                    return False
+            elif not operators[op](current, value):
+                return False
+        return True
+
+    def __compare(self, a, b):
+        """Orders a and b by the ordering attributes, None first"""
+        for attr, descending in self.ordering:
+            x = getattr(a, attr, None)
+            y = getattr(b, attr, None)
+            if x == y:
+                continue
+            if x is None or (y is not None and x < y):
+                result = -1
+            else:
+                result = 1
+            return -result if descending else result
+        return 0
+
+
+class DBQuery(Query):
+    """A query compiled to SQL and run in a DBStorage session
+
+    Rows are fetched batch rows at a time while the query is iterated.
+    When DBStorage passes its cache, cached(cls, signature, run) returns
+    the objects of the query, calling run() to load them on a miss.
+    """
+
+    def __init__(self, session, cls, batch, cached=None):
+        """Starts a query over the rows of the mapped class cls"""
+        super().__init__(cls)
+        self.session = session
+        self.mapped = cls
+        self.batch = batch
+        self.cached = cached
+
+    def __iter__(self):
+        """Runs the query, yielding matching objects one at a time"""
+        query = self.session.query(self.mapped).options(lazyload('*'))
+        for attr, op, value in self.conditions:
+            column = self.__column(attr)
+            if op == 'in':
+                query = query.filter(column.in_(value))
+            else:
+                query = query.filter(operators[op](column, value))
+        for attr, descending in self.ordering:
+            column = self.__column(attr)
+            query = query.order_by(column.desc() if descending else column)
+        if self._offset:
+            query = query.offset(self._offset)
+        if self._limit is not None:
+            query = query.limit(self._limit)
+        signature = self.__signature()
+        if self.cached is None or signature is None:
+            return iter(query.yield_per(self.batch))
+        return iter(self.cached(self.mapped, signature, query.all))
+
+    def __signature(self):
+        """Returns a hashable description of the query, or None"""
+        signature = ('query', tuple(
+            (attr, op, tuple(value) if op == 'in' else value)
+            for attr, op, value in self.conditions),
+            tuple(self.ordering), self._limit, self._offset)
+        try:
+            hash(signature)
+        except TypeError:
+            return None
+        return signature
+
+    def __column(self, attr):
+        """Returns the column attribute attr of the queried class"""
+        column = self.mapped.__table__.columns.get(attr)
+        if column is None:
+            raise ValueError("Unknown column {} of {}".format(attr,
+                                                               self.cls))
+        return getattr(self.mapped, attr)
@@ -0,0 +1,258 @@
+#!/usr/bin/python3
+"""This module defines the record file used by FileStorage in records mode
+
+The record file is append-only: every save adds one JSON line per
+changed object, ["put", <key>, <to_dict()>] or ["del", <key>], and the
+newest line of a key wins. A sorted sidecar index (<record file>.idx)
+maps keys to the (offset, length) of their line, so a lookup is a binary
+search in the memory-mapped index plus one read of the memory-mapped
+record file. Lines appended after the index was written are found by
+scanning the record file from the end of the indexed part on open.
+compact() drops dead versions and rewrites the index; it runs by itself
+on open or append once the unindexed lines outnumber both the indexed
+keys and compact_min, so reopening never re-parses more than about
+half of the file.
+"""
+import json
+import mmap
+import os
+import struct
+import uuid
+
+
+class RecordFile:
+    """Append-only record file with a sorted, memory-mapped key index
+
+    The first line of the record file is ["hdr", <token>]. The index
+    header repeats the token, so an index left over from another
+    generation of the record file (a crash during compact()) is ignored
+    and the whole record file is scanned instead.
+    """
+
+    MAGIC = b'HBNBIDX1'
+    COMPACT_MIN = 1024
+    __head = struct.Struct('<8s32sQQH')
+    __pos = struct.Struct('<QI')
+
+    def __init__(self, path, compact_min=COMPACT_MIN):
+        """Opens, and creates if needed, the record file at path
+
+        compact_min is the number of unindexed lines below which the
+        file is never compacted by itself.
+        """
+        self.path = path
+        self.compact_min = compact_min
+        self.index_path = path + '.idx'
+        self.__data = None
+        self.__index = None
+        self.__fd = None
+        self.open()
+
+    def open(self):
+        """Maps the record file and its index and scans the unindexed tail"""
+        self.close()
+        if not os.path.exists(self.path):
+            self.__create(self.path, uuid.uuid4().hex, [])
+        self.__fd = os.open(self.path, os.O_RDWR)
+        size = os.fstat(self.__fd).st_size
+        self.__data = mmap.mmap(self.__fd, size, access=mmap.ACCESS_READ)
+        first = self.__data[:self.__data.find(b'\n') + 1]
+        self.__token = json.loads(first)[1].encode()
+        self.__count = 0
+        self.__width = 0
+        self.__tail = {}
+        self.__tail_lines = 0
+        start = len(first)
+        try:
+            with open(self.index_path, 'rb') as f:
+                index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, token, end, count, width = self.__head.unpack_from(index)
+            if magic == self.MAGIC and token == self.__token and end <= size:
+                self.__index = index
+                self.__count = count
+                self.__width = width
+                start = end
+            else:
+                index.close()
+        except (FileNotFoundError, ValueError, struct.error):
+            pass
+        self.__scan(start, size)
+        if self.__grown():
+            self.compact()
+
+    def close(self):
+        """Unmaps and closes the record file and its index"""
+        for mapped in (self.__data, self.__index):
+            if mapped is not None:
+                mapped.close()
+        if self.__fd is not None:
+            os.close(self.__fd)
+        self.__data = self.__index = self.__fd = None
+
+    def __contains__(self, key):
+        """Tells if a live record is stored under key"""
+        return self.__locate(key) is not None
+
+    def lookup(self, key):
+        """Returns the newest record stored under key, or None"""
+        pos = self.__locate(key)
+        if pos is None:
+            return None
+        return json.loads(self.__read(*pos))[2]
+
+    def keys(self, prefix=''):
+        """Yields the live keys starting with prefix
+
+        The indexed keys come first, in key order, then the keys
+        appended since the index was written, in the order they were
+        first appended.
+        """
+        tail = self.__tail
+        raw = prefix.encode('utf-8')
+        for i in range(self.__bisect(raw), self.__count):
+            key = self.__slot_key(i)
+            if not key.startswith(raw):
+                break
+            key = key.decode('utf-8')
+            if key not in tail:
+                yield key
+        for key, pos in list(tail.items()):
+            if pos is not None and key.startswith(prefix):
+                yield key
+
+    def count(self, prefix=''):
+        """Returns the number of live keys starting with prefix"""
+        raw = prefix.encode('utf-8')
+        lo = self.__bisect(raw)
+        hi = self.__bisect(raw + b'\xff')
+        count = hi - lo
+        for key, pos in self.__tail.items():
+            if key.startswith(prefix):
+                indexed = self.__find(key.encode('utf-8')) is not None
+                count += (pos is not None) - indexed
+        return count
+
+    def append(self, entries):
+        """Appends (key, JSON text) pairs; a None text deletes the key"""
+        lines = []
+        for key, text in entries:
+            if text is None:
+                lines.append('["del",{}]\n'.format(json.dumps(key)))
+            else:
+                lines.append('["put",{},{}]\n'.format(json.dumps(key), text))
+        if not lines:
+            return
+        offset = os.lseek(self.__fd, 0, os.SEEK_END)
+        data = ''.join(lines).encode('utf-8')
+        os.write(self.__fd, data)
+        os.fsync(self.__fd)
+        for (key, text), line in zip(entries, lines):
+            length = len(line.encode('utf-8'))
+            self.__tail[key] = None if text is None else (offset, length - 1)
+            offset += length
+        self.__tail_lines += len(lines)
+        if self.__grown():
+            self.compact()
+
+    def compact(self):
+        """Rewrites the live records sorted by key and indexes them"""
+        keys = sorted(self.keys(), key=lambda k: k.encode('utf-8'))
+        token = uuid.uuid4().hex
+        lines = ((key, self.__read(*self.__locate(key))) for key in keys)
+        tmp_path = self.path + '.tmp'
+        positions, end = self.__create(tmp_path, token, lines)
+        width = max([len(k.encode('utf-8')) for k in keys] or [0])
+        slot = struct.Struct('<{}s'.format(width) + self.__pos.format[1:])
+        with open(self.index_path + '.tmp', 'wb') as f:
+            f.write(self.__head.pack(self.MAGIC, token.encode(), end,
+                                     len(keys), width))
+            for key, pos in zip(keys, positions):
+                f.write(slot.pack(key.encode('utf-8'), *pos))
+            f.flush()
+            os.fsync(f.fileno())
+        self.close()
+        os.replace(tmp_path, self.path)
+        os.replace(self.index_path + '.tmp', self.index_path)
+        self.open()
+
+    def __create(self, path, token, lines):
+        """Writes a record file from (key, line) pairs
+
+        Returns the (offset, length) of every line and the file size.
+        """
+        positions = []
+        with open(path, 'wb') as f:
+            f.write('["hdr","{}"]\n'.format(token).encode())
+            offset = f.tell()
+            for key, line in lines:
+                f.write(line + b'\n')
+                positions.append((offset, len(line)))
+                offset += len(line) + 1
+            f.flush()
+            os.fsync(f.fileno())
+        return positions, offset
+
+    def __scan(self, start, size):
+        """Indexes the lines from start on, cutting off a torn last line"""
+        data = self.__data
+        pos = start
+        while pos < size:
+            end = data.find(b'\n', pos)
+            if end == -1:
+                break
+            try:
+                record = json.loads(data[pos:end])
+            except ValueError:
+                break
+            if record[0] == "put":
+                self.__tail[record[1]] = (pos, end - pos)
+            elif record[0] == "del":
+                self.__tail[record[1]] = None
+            self.__tail_lines += 1
+            pos = end + 1
+        if pos < size:
+            os.ftruncate(self.__fd, pos)
+            self.__data.close()
+            self.__data = mmap.mmap(self.__fd, 0, access=mmap.ACCESS_READ)
+
+    def __grown(self):
+        """Tells if the unindexed lines call for a compaction"""
+        return self.__tail_lines > max(self.compact_min, self.__count)
+
+    def __read(self, offset, length):
+        """Returns the bytes of one line, remapping after appends"""
+        if offset + length > len(self.__data):
+            self.__data.close()
+            self.__data = mmap.mmap(self.__fd, 0, access=mmap.ACCESS_READ)
+        return self.__data[offset:offset + length]
+
+    def __locate(self, key):
+        """Returns the (offset, length) of the newest line of key"""
+        if key in self.__tail:
+            return self.__tail[key]
+        return self.__find(key.encode('utf-8'))
+
+    def __slot_key(self, i):
+        """Returns the key bytes of index slot i"""
+        start = self.__head.size + i * (self.__width + self.__pos.size)
+        return self.__index[start:start + self.__width].rstrip(b'\0')
+
+    def __bisect(self, raw):
+        """Returns the first index slot whose key is not below raw"""
+        lo, hi = 0, self.__count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.__slot_key(mid) < raw:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def __find(self, raw):
+        """Returns the indexed (offset, length) of raw, or None"""
+        i = self.__bisect(raw)
+        if i < self.__count and self.__slot_key(i) == raw:
+            start = (self.__head.size + i * (self.__width + self.__pos.size) +
+                     self.__width)
+            return self.__pos.unpack_from(self.__index, start)
+        return None
@@ -0,0 +1,129 @@
+#!/usr/bin/python3
+"""This module defines the sorted attribute index kept by FileStorage
+
+A SortedIndex keeps the objects of one class ordered by the numeric
+value of one attribute, in two parallel lists (the values and the
+(value, key) pairs) searched with bisect. A range or top-k query costs
+O(log n + k); adding or removing an object costs O(log n) comparisons
+plus one list insertion or deletion.
+"""
+from bisect import bisect_left, bisect_right
+
+
+def numeric(value):
+    """Tells if value can be ordered in a sorted index"""
+    return type(value) in (int, float)
+
+
+class SortedIndex:
+    """Objects ordered by the value of one numeric attribute
+
+    Objects whose value is None or not a number are kept apart and
+    returned by others(), so that ordering them stays the caller's job.
+    """
+
+    def __init__(self):
+        """Creates an empty index"""
+        self.__values = []
+        self.__entries = []
+        self.__objs = {}
+        self.__keys = {}
+        self.__others = {}
+        self.__version = 0
+
+    def __len__(self):
+        """Returns the number of objects in the index"""
+        return len(self.__keys) + len(self.__others)
+
+    def add(self, key, obj, value):
+        """Files obj under value, replacing what key was filed under"""
+        if numeric(value):
+            if key in self.__keys and self.__keys[key] == value:
+                self.__objs[key] = obj
+                return
+            self.remove(key)
+            self.__version += 1
+            i = bisect_left(self.__entries, (value, key))
+            self.__entries.insert(i, (value, key))
+            self.__values.insert(i, value)
+            self.__keys[key] = value
+            self.__objs[key] = obj
+        else:
+            self.remove(key)
+            self.__others[key] = obj
+
+    def remove(self, key):
+        """Drops key from the index if it is there"""
+        if key in self.__keys:
+            self.__version += 1
+            i = bisect_left(self.__entries, (self.__keys.pop(key), key))
+            del self.__entries[i]
+            del self.__values[i]
+            del self.__objs[key]
+        else:
+            self.__others.pop(key, None)
+
+    def rebuild(self, items):
+        """Replaces the content with (key, obj, value) triples"""
+        entries = []
+        self.__version += 1
+        self.__objs = {}
+        self.__others = {}
+        for key, obj, value in items:
+            if numeric(value):
+                entries.append((value, key))
+                self.__objs[key] = obj
+            else:
+                self.__others[key] = obj
+        entries.sort()
+        self.__entries = entries
+        self.__values = [value for value, key in entries]
+        self.__keys = {key: value for value, key in entries}
+
+    def range(self, low=None, high=None, low_open=False, high_open=False,
+              reverse=False):
+        """Yields (value, obj) for the values between low and high
+
+        A bound of None is unbounded; low_open and high_open exclude the
+        bound itself. Values come in ascending order, or descending if
+        reverse is set. If the index changes between two steps, the
+        iteration resumes after the last (value, key) pair it yielded.
+        """
+        version = None
+        last = None
+        while True:
+            if version != self.__version:
+                version = self.__version
+                start, end = self.__bounds(low, high, low_open, high_open)
+                if last is None:
+                    i = end - 1 if reverse else start
+                elif reverse:
+                    i = min(end, bisect_left(self.__entries, last)) - 1
+                else:
+                    i = max(start, bisect_right(self.__entries, last))
+            if (i < start) if reverse else (i >= end):
+                return
+            last = self.__entries[i]
+            i += -1 if reverse else 1
+            yield last[0], self.__objs[last[1]]
+
+    def others(self):
+        """Returns the objects whose value is None or not a number"""
+        return list(self.__others.values())
+
+    def __bounds(self, low, high, low_open, high_open):
+        """Returns the slice of the values between low and high"""
+        values = self.__values
+        if low is None:
+            start = 0
+        elif low_open:
+            start = bisect_right(values, low)
+        else:
+            start = bisect_left(values, low)
+        if high is None:
+            end = len(values)
+        elif high_open:
+            end = bisect_left(values, high)
+        else:
+            end = bisect_right(values, high)
+        return start, end
@@ -0,0 +1,154 @@
+#!/usr/bin/python3
+"""This module defines the full-text index behind storage.search()
+
+A TextIndex maps every term to a posting list of the documents that
+contain it, with the term frequency in each, and ranks the documents
+matching any term of a search with BM25. Documents are added, replaced
+and removed one at a time; a document whose text has the same checksum
+as the one already indexed is left as it is.
+
+The state of an index can be written out and read back, posting lists
+included, which is several times faster than tokenizing every document
+again. Each document keeps the checksum of its text, so a saved index
+that fell behind the stored objects is brought up to date by
+re-indexing only the documents whose text differs.
+"""
+from collections import Counter
+import heapq
+from math import log
+import re
+from zlib import crc32
+
+fields = {
+    'Place': ('name', 'description'), 'Review': ('text',),
+    'State': ('name',), 'City': ('name',), 'Amenity': ('name',),
+    'User': ('first_name', 'last_name')
+}
+
+pattern = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Returns the lowercase words of text"""
+    return pattern.findall(text.lower())
+
+
+def document(values):
+    """Returns the text indexed for the values of the searched fields"""
+    return ' '.join(str(value) for value in values if value is not None)
+
+
+class TextIndex:
+    """Posting lists of terms ranked with BM25
+
+    Attributes:
+        k1 (float): term frequency saturation
+        b (float): document length normalization
+        changed (bool): set whenever the index changes
+    """
+
+    def __init__(self, k1=1.2, b=0.75):
+        """Creates an empty index"""
+        self.k1 = k1
+        self.b = b
+        self.changed = False
+        self.__postings = {}
+        self.__docs = {}
+        self.__length = 0
+
+    def __len__(self):
+        """Returns the number of indexed documents"""
+        return len(self.__docs)
+
+    def keys(self):
+        """Returns the keys of the indexed documents"""
+        return list(self.__docs)
+
+    def add(self, key, text):
+        """Indexes text under key, replacing what key was indexed with"""
+        crc = crc32(text.encode())
+        doc = self.__docs.get(key)
+        if doc is not None and doc[0] == crc:
+            return
+        self.remove(key)
+        words = tokenize(text)
+        counts = Counter(words)
+        postings = self.__postings
+        for word, count in counts.items():
+            posting = postings.get(word)
+            if posting is None:
+                postings[word] = {key: count}
+            else:
+                posting[key] = count
+        self.__docs[key] = (crc, len(words), ' '.join(counts))
+        self.__length += len(words)
+        self.changed = True
+
+    def remove(self, key):
+        """Drops key from the index if it is there"""
+        doc = self.__docs.pop(key, None)
+        if doc is None:
+            return
+        postings = self.__postings
+        for word in doc[2].split():
+            posting = postings[word]
+            del posting[key]
+            if not posting:
+                del postings[word]
+        self.__length -= doc[1]
+        self.changed = True
+
+    def search(self, text, limit=None):
+        """Returns (key, score) for the documents matching text, best first
+
+        Documents match when they contain any word of text. At most
+        limit pairs are returned when limit is set; equal scores are
+        ordered by key.
+        """
+        count = len(self.__docs)
+        if not count:
+            return []
+        k1, b = self.k1, self.b
+        average = self.__length / count or 1
+        docs = self.__docs
+        scores = {}
+        for word in set(tokenize(text)):
+            posting = self.__postings.get(word)
+            if posting is None:
+                continue
+            found = len(posting)
+            idf = log(1 + (count - found + 0.5) / (found + 0.5))
+            for key, freq in posting.items():
+                norm = k1 * (1 - b + b * docs[key][1] / average)
+                scores[key] = (scores.get(key, 0) +
+                               idf * freq * (k1 + 1) / (freq + norm))
+        ranked = ((-score, key) for key, score in scores.items())
+        if limit is None:
+            ranked = sorted(ranked)
+        else:
+            ranked = heapq.nsmallest(limit, ranked)
+        return [(key, -score) for score, key in ranked]
+
+    def state(self):
+        """Returns the index as a structure of JSON types"""
+        keys = list(self.__docs)
+        numbers = {key: i for i, key in enumerate(keys)}
+        postings = {}
+        for word, posting in self.__postings.items():
+            postings[word] = [[numbers[key] for key in posting],
+                              list(posting.values())]
+        docs = [list(self.__docs[key]) for key in keys]
+        return {'keys': keys, 'docs': docs, 'postings': postings}
+
+    @classmethod
+    def from_state(cls, state, **kwargs):
+        """Returns the index whose state() was state"""
+        index = cls(**kwargs)
+        keys = state['keys']
+        index.__docs = {key: tuple(doc)
+                        for key, doc in zip(keys, state['docs'])}
+        index.__length = sum(doc[1] for doc in index.__docs.values())
+        index.__postings = {
+            word: dict(zip([keys[i] for i in numbers], counts))
+            for word, (numbers, counts) in state['postings'].items()}
+        return index
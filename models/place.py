@@ -1,10 +1,19 @@
 #!/usr/bin/python3
 """This module defines the Place class"""
 
+import models
 from models.base_model import BaseModel, Base
-from sqlalchemy import Column, String, Integer, Float, ForeignKey
+from sqlalchemy import Column, String, Integer, Float, ForeignKey, Table
 from sqlalchemy.orm import relationship
 
+place_amenity = Table(
+    "place_amenity", Base.metadata,
+    Column("place_id", String(60), ForeignKey("places.id"),
+           primary_key=True, nullable=False),
+    Column("amenity_id", String(60), ForeignKey("amenities.id"),
+           primary_key=True, nullable=False)
+)
+
 
 class Place(BaseModel, Base):
     """The Place class, which inherits from BaseModel and Base"""
@@ -26,37 +35,36 @@ class Place(BaseModel, Base):
     latitude = Column(Float, nullable=True)
     longitude = Column(Float, nullable=True)
 
-    reviews = relationship(
-        "Review", backref="place", cascade="all, delete", passive_deletes=True
-    )
-#!/usr/bin/python3
-"""This module defines the Place class"""
-
-from models.base_model import BaseModel, Base
-from sqlalchemy import Column, String, Integer, Float, ForeignKey
-from sqlalchemy.orm import relationship
+    if models.storage_type == "db":
+        reviews = relationship(
+            "Review", backref="place", cascade="all, delete",
+            passive_deletes=True
+        )
+        amenities = relationship(
+            "Amenity", secondary=place_amenity, viewonly=False,
+            overlaps="place_amenities"
+        )
+    else:
+        amenity_ids = []
 
+        @property
+        def reviews(self):
+            """Reviews whose place_id is the id of this place"""
+            return models.storage.children("Review", "place_id", self.id)
 
-class Place(BaseModel, Base):
-    """The Place class, which inherits from BaseModel and Base"""
-
-    __tablename__ = "places"
-
-    city_id = Column(
-        String(60), ForeignKey("cities.id", ondelete="CASCADE"), nullable=False
-    )
-    user_id = Column(
-        String(60), ForeignKey("users.id", ondelete="CASCADE"), nullable=False
-    )
-    name = Column(String(128), nullable=False)
-    description = Column(String(1024), nullable=True)
-    number_rooms = Column(Integer, nullable=False, default=0)
-    number_bathrooms = Column(Integer, nullable=False, default=0)
-    max_guest = Column(Integer, nullable=False, default=0)
-    price_by_night = Column(Integer, nullable=False, default=0)
-    latitude = Column(Float, nullable=True)
-    longitude = Column(Float, nullable=True)
+        @property
+        def amenities(self):
+            """Amenities whose ids are listed in amenity_ids"""
+            amenities = []
+            for amenity_id in self.amenity_ids:
+                amenity = models.storage.get("Amenity", amenity_id)
+                if amenity is not None:
+                    amenities.append(amenity)
+            return amenities
 
-    reviews = relationship(
-        "Review", backref="place", cascade="all, delete", passive_deletes=True
-    )
\ No newline at end of file
+        @amenities.setter
+        def amenities(self, obj):
+            """Adds the id of an Amenity to amenity_ids"""
+            if type(obj).__name__ == "Amenity" and \
+                    obj.id not in self.amenity_ids:
+                self.amenity_ids = self.amenity_ids + [obj.id]
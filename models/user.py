@@ -1,6 +1,7 @@
 #!/usr/bin/python3
 """This module defines the User class"""
 
+import models
 from models.base_model import BaseModel, Base
 from sqlalchemy import Column, String
 from sqlalchemy.orm import relationship
@@ -16,6 +17,13 @@ class User(BaseModel, Base):
     first_name = Column(String(128), nullable=True)
     last_name = Column(String(128), nullable=True)
 
-    places = relationship(
-        "Place", backref="user", cascade="all, delete", passive_deletes=True
-    )
+    if models.storage_type == "db":
+        places = relationship(
+            "Place", backref="user", cascade="all, delete",
+            passive_deletes=True
+        )
+    else:
+        @property
+        def places(self):
+            """Places whose user_id is the id of this user"""
+            return models.storage.children("Place", "user_id", self.id)
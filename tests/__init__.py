@@ -0,0 +1,4 @@
+#!/usr/bin/python3
+"""Settings shared by the test modules"""
+
+NOT_FILE = "uses the shared FileStorage, not HBNB_TYPE_STORAGE=db"
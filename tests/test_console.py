@@ -0,0 +1,146 @@
+#!/usr/bin/python3
+""" Module for testing the console batch mode"""
+import unittest
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+from console import HBNBCommand
+from models import storage
+from models.engine.db_storage import DBStorage
+from models.place import Place
+from models.state import State
+from tests import NOT_FILE
+
+
+@unittest.skipIf(os.getenv('HBNB_TYPE_STORAGE') == 'db', NOT_FILE)
+class test_console_batch(unittest.TestCase):
+    """ Class to test saving storage once per batch """
+
+    def setUp(self):
+        """ Empties storage """
+        storage.reset()
+        self.console = HBNBCommand()
+
+    def tearDown(self):
+        """ Remove storage file at end of tests """
+        try:
+            os.remove('file.json')
+        except FileNotFoundError:
+            pass
+
+    def run_cmd(self, line):
+        """ Returns what the console prints for line """
+        with patch('sys.stdout', new=StringIO()) as out:
+            self.console.onecmd(self.console.precmd(line))
+        return out.getvalue()
+
+    def saved(self):
+        """ Returns the keys in file.json, None if there is no file """
+        try:
+            with open('file.json') as f:
+                return set(json.load(f))
+        except FileNotFoundError:
+            return None
+
+    def test_create(self):
+        """ create stores and saves the new object """
+        _id = self.run_cmd("create State").strip()
+        self.assertIsNotNone(storage.get(State, _id))
+        self.assertEqual(self.saved(), {'State.' + _id})
+
+    def test_batch(self):
+        """ Changes are saved once, on commit """
+        state = State(name="Ohio")
+        storage.new(state)
+        storage.save()
+        self.run_cmd("begin")
+        _id = self.run_cmd("create State").strip()
+        self.run_cmd('update State {} name "Iowa"'.format(_id))
+        self.run_cmd("destroy State {}".format(state.id))
+        self.assertEqual(self.saved(), {'State.' + state.id})
+        with patch('sys.stderr', new=StringIO()) as err:
+            self.run_cmd("commit")
+        self.assertIn("3 commands", err.getvalue())
+        self.assertEqual(self.saved(), {'State.' + _id})
+        self.assertEqual(storage.get(State, _id).name, "Iowa")
+        self.assertIsNone(self.console.batch)
+
+    def test_batch_errors(self):
+        """ Batches do not nest and commit needs a batch """
+        self.assertEqual(self.run_cmd("commit"), "** no batch open **\n")
+        self.run_cmd("begin")
+        self.assertEqual(self.run_cmd("begin"),
+                         "** batch already open **\n")
+
+    def test_update_read_only(self):
+        """ Related objects and methods are not updated """
+        state = State(name="Ohio")
+        storage.new(state)
+        for att_name in ("cities", "save", "to_dict"):
+            self.assertEqual(self.run_cmd("update State {} {} x".format(
+                state.id, att_name)), "** attribute can't be set **\n")
+        self.assertEqual(self.run_cmd("update State {} name Iowa".format(
+            state.id)), "")
+        self.assertEqual(storage.get(State, state.id).name, "Iowa")
+        self.assertEqual(storage.get(State, state.id).cities, [])
+
+    def test_all_invalid_condition(self):
+        """ Conditions that cannot be compared are reported """
+        storage.new(Place(name="Loft", city_id="c", user_id="u",
+                          price_by_night=80))
+        for line in ("all Place created_at<5", "all Place price_by_night<x",
+                     "all Place price_by_night"):
+            self.assertEqual(self.run_cmd(line), "** invalid condition **\n")
+        self.assertIn("Loft", self.run_cmd("all Place price_by_night<100"))
+
+    def test_all_quoted_value(self):
+        """ Quoted condition values may contain spaces """
+        storage.new(Place(name="Big house", city_id="c", user_id="u"))
+        storage.new(Place(name="Big", city_id="c", user_id="u"))
+        out = self.run_cmd('all Place name="Big house"')
+        self.assertIn("'name': 'Big house'", out)
+        self.assertNotIn("'name': 'Big'", out)
+        self.assertEqual(self.run_cmd('all Place name="Big'),
+                         "** invalid condition **\n")
+
+
+class test_console_db_batch(unittest.TestCase):
+    """ Class to test batch commits against a DBStorage """
+
+    def setUp(self):
+        """ Points the console at a DBStorage on an empty SQLite file """
+        fd, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        with patch.dict(os.environ, {'HBNB_DB_URL': 'sqlite:///' + self.path}):
+            self.storage = DBStorage()
+        self.storage.reload()
+        patcher = patch('console.storage', self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.console = HBNBCommand()
+
+    def tearDown(self):
+        """ Close the session and remove the database """
+        self.storage.close()
+        os.remove(self.path)
+
+    def run_cmd(self, line):
+        """ Returns what the console prints for line """
+        with patch('sys.stdout', new=StringIO()) as out:
+            self.console.onecmd(self.console.precmd(line))
+        return out.getvalue()
+
+    def test_commit_error(self):
+        """ A failed commit is rolled back and ends the batch """
+        self.run_cmd("begin")
+        self.run_cmd("create State")
+        out = self.run_cmd("commit")
+        self.assertTrue(out.startswith("** batch rolled back: "))
+        self.assertTrue(out.endswith(" **\n"))
+        self.assertIsNone(self.console.batch)
+        self.assertEqual(self.run_cmd("count State"), "0\n")
+        self.storage.new(State(name="Ohio"))
+        self.storage.save()
+        self.assertEqual(self.run_cmd("count State"), "1\n")
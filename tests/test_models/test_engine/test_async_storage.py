@@ -0,0 +1,123 @@
+#!/usr/bin/python3
+""" Module for testing the asyncio storage facades"""
+import asyncio
+import unittest
+import os
+import tempfile
+import time
+from unittest.mock import patch
+from models import storage
+from models.engine.async_file_storage import AsyncFileStorage
+from models.state import State
+from tests import NOT_FILE
+
+try:
+    from models.engine.async_db_storage import AsyncDBStorage, async_url
+    import aiosqlite
+    NO_ASYNC_DB = None
+except ImportError:
+    NO_ASYNC_DB = "needs sqlalchemy[asyncio] and aiosqlite"
+
+
+class AsyncStorageTests:
+    """ Tests run against the facade returned by open_storage """
+
+    async def asyncSetUp(self):
+        """ Stores one state """
+        self.storage = await self.open_storage()
+        self.state = State(name="California")
+        await self.storage.anew(self.state)
+        await self.storage.asave()
+        await self.storage.arelease()
+
+    async def test_aget_aall(self):
+        """ Stored objects are found by id and listed by class """
+        found = await self.storage.aget(State, self.state.id)
+        self.assertEqual(found.name, "California")
+        self.assertIsNone(await self.storage.aget('State', "nope"))
+        states = await self.storage.aall('State')
+        self.assertEqual(list(states), ['State.' + self.state.id])
+        self.assertEqual(await self.storage.acount(State), 1)
+        self.assertEqual(await self.storage.acount(), 1)
+        await self.storage.arelease()
+
+    async def test_concurrent_writes(self):
+        """ Concurrent tasks add and save objects """
+        async def create(i):
+            await self.storage.anew(State(name="state_{}".format(i)))
+            await self.storage.asave()
+            await self.storage.arelease()
+        await asyncio.gather(*[create(i) for i in range(50)])
+        self.assertEqual(len(await self.storage.aall(State)), 51)
+        await self.storage.arelease()
+
+    async def test_adelete(self):
+        """ Deleted objects are gone once saved """
+        state = await self.storage.aget(State, self.state.id)
+        await self.storage.adelete(state)
+        await self.storage.asave()
+        self.assertEqual(await self.storage.aall(State), {})
+        await self.storage.arelease()
+
+
+@unittest.skipIf(os.getenv('HBNB_TYPE_STORAGE') == 'db', NOT_FILE)
+class test_AsyncFileStorage(AsyncStorageTests,
+                            unittest.IsolatedAsyncioTestCase):
+    """ Tests the asyncio facade over FileStorage """
+
+    async def open_storage(self):
+        """ Returns the facade over the shared file storage, emptied """
+        storage.reset()
+        self.addCleanup(os.remove, 'file.json')
+        facade = AsyncFileStorage(storage, workers=4)
+        self.addCleanup(facade.shutdown)
+        return facade
+
+    async def test_save_does_not_block_loop(self):
+        """ The event loop keeps running while a save writes """
+        ticks = []
+
+        async def tick():
+            for i in range(5):
+                ticks.append(i)
+                await asyncio.sleep(0.01)
+        with patch.object(type(storage), 'save',
+                          side_effect=lambda: time.sleep(0.2)):
+            start = time.perf_counter()
+            await asyncio.gather(self.storage.asave(), tick())
+        self.assertEqual(len(ticks), 5)
+        self.assertLess(time.perf_counter() - start, 0.4)
+
+    async def test_arelease(self):
+        """ Ending a request neither flushes nor closes storage """
+        with patch.object(type(storage), 'close') as close, \
+                patch.object(type(storage), 'flush') as flush:
+            await self.storage.arelease()
+        close.assert_not_called()
+        flush.assert_not_called()
+
+
+@unittest.skipIf(NO_ASYNC_DB, NO_ASYNC_DB)
+class test_AsyncDBStorage(AsyncStorageTests,
+                          unittest.IsolatedAsyncioTestCase):
+    """ Tests the asyncio DB storage on an aiosqlite database """
+
+    async def open_storage(self):
+        """ Returns an AsyncDBStorage on an empty SQLite database """
+        fd, path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        with patch.dict(os.environ, {'HBNB_DB_URL': 'sqlite:///' + path}):
+            db = AsyncDBStorage()
+        await db.areload()
+        self.addAsyncCleanup(db.adispose)
+        return db
+
+    def test_async_url(self):
+        """ Synchronous drivers are swapped for asyncio ones """
+        self.assertEqual(async_url("mysql+mysqldb://u:p@h/db"),
+                         "mysql+aiomysql://u:p@h/db")
+        self.assertEqual(async_url("sqlite:///hbnb.db"),
+                         "sqlite+aiosqlite:///hbnb.db")
+        self.assertEqual(async_url("postgresql+asyncpg://h/db"),
+                         "postgresql+asyncpg://h/db")
@@ -0,0 +1,55 @@
+#!/usr/bin/python3
+""" Module for testing the LRU cache"""
+import unittest
+from models.engine.cache import LRUCache
+
+
+class test_LRUCache(unittest.TestCase):
+    """ Tests eviction, expiration and the counters """
+
+    def setUp(self):
+        """ A cache of two entries valid for 10 seconds of a fake clock """
+        self.now = 0
+        self.cache = LRUCache(2, ttl=10, clock=lambda: self.now)
+
+    def test_get_put(self):
+        """ Cached values are returned, others give the default """
+        self.cache.put('a', 1)
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('b', 0), 0)
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['size']),
+                         (1, 2, 1))
+
+    def test_lru_eviction(self):
+        """ The least recently used entry is evicted first """
+        self.cache.put('a', 1)
+        self.cache.put('b', 2)
+        self.cache.get('a')
+        self.cache.put('c', 3)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertEqual(self.cache.get('c'), 3)
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+        self.assertEqual(len(self.cache), 2)
+
+    def test_ttl(self):
+        """ Entries expire ttl seconds after they were put """
+        self.cache.put('a', 1)
+        self.now = 9
+        self.assertEqual(self.cache.get('a'), 1)
+        self.now = 10
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.stats()['expirations'], 1)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_invalidate_clear(self):
+        """ invalidate drops one entry and clear drops them all """
+        self.cache.put('a', 1)
+        self.cache.put('b', 2)
+        self.cache.invalidate('a')
+        self.cache.invalidate('x')
+        self.assertIsNone(self.cache.get('a'))
+        self.cache.clear()
+        self.assertIsNone(self.cache.get('b'))
@@ -0,0 +1,165 @@
+#!/usr/bin/python3
+""" Module for testing the snapshot codecs"""
+import unittest
+from datetime import datetime, timezone
+from models.base_model import BaseModel
+from models.engine.codec import BinaryCodec, JSONCodec, codec_for, convert
+from models.engine.codec import TIME_FORMAT, format_time, parse_time
+import io
+import json
+import os
+import struct
+
+
+class test_codec(unittest.TestCase):
+    """ Class to test the snapshot codecs """
+
+    def tearDown(self):
+        """ Remove snapshot files at end of tests """
+        for path in ('codec.json', 'codec.bin', 'back.json'):
+            try:
+                os.remove(path)
+            except:
+                pass
+
+    def roundtrip(self, codec, objs):
+        """ Write objs with codec and read the records back """
+        f = io.BytesIO() if codec.binary else io.StringIO()
+        codec.write(f, (('{}.{}'.format(type(o).__name__, o.id),
+                         codec.dump(o)) for o in objs))
+        f.seek(0)
+        return dict(codec.read(f))
+
+    def test_json_roundtrip(self):
+        """ JSON records are the to_dict() of each object """
+        objs = [BaseModel(), BaseModel()]
+        records = self.roundtrip(JSONCodec(), objs)
+        self.assertEqual(records, {'BaseModel.' + o.id: o.to_dict()
+                                   for o in objs})
+
+    def test_binary_roundtrip(self):
+        """ Binary records keep value types and datetimes """
+        obj = BaseModel()
+        obj.name = "Betty"
+        obj.number = 89
+        obj.ratio = 0.5
+        obj.flag = True
+        obj.nothing = None
+        obj.tags = ["a", 1]
+        record = self.roundtrip(BinaryCodec(), [obj])['BaseModel.' + obj.id]
+        self.assertEqual(record['__class__'], 'BaseModel')
+        self.assertEqual(record['created_at'], obj.created_at)
+        self.assertIs(type(record['created_at']), datetime)
+        for name in ('id', 'name', 'number', 'ratio', 'flag', 'nothing',
+                     'tags'):
+            self.assertEqual(record[name], getattr(obj, name))
+        self.assertEqual(BaseModel(**record).to_dict(), obj.to_dict())
+
+    def test_binary_smaller(self):
+        """ Interned names and packed timestamps save space """
+        objs = [BaseModel() for i in range(100)]
+        sizes = []
+        for codec in (JSONCodec(), BinaryCodec()):
+            f = io.BytesIO() if codec.binary else io.StringIO()
+            codec.write(f, ((o.id, codec.dump(o)) for o in objs))
+            sizes.append(len(f.getvalue()))
+        self.assertLess(sizes[1], sizes[0])
+
+    def test_binary_truncated(self):
+        """ A truncated binary snapshot is rejected """
+        codec = BinaryCodec()
+        f = io.BytesIO()
+        codec.write(f, [('x', codec.dump(BaseModel()))])
+        f = io.BytesIO(f.getvalue()[:-3])
+        with self.assertRaises(ValueError):
+            list(codec.read(f))
+
+    def test_binary_layouts(self):
+        """ Records of one class with different shapes, large ints and
+        JSON values each get a layout that reads back """
+        codec = BinaryCodec()
+        records = [{'__class__': 'State', 'id': '1', 'name': "Ohio"},
+                   {'__class__': 'State', 'id': '2', 'name': None},
+                   {'__class__': 'State', 'id': '3', 'big': 1 << 70,
+                    'small': 3, 'tags': {"a": [1, "é"]}},
+                   {'__class__': 'State', 'id': '4', 'big': 5,
+                    'small': 3, 'tags': {}}]
+        f = io.BytesIO()
+        codec.write(f, [(r['id'], codec.encode(r)) for r in records])
+        f.seek(0)
+        self.assertEqual([record for key, record in codec.read(f)],
+                         records)
+
+    def test_binary_v1(self):
+        """ Snapshots of the first binary format are still read """
+        def entry(kind, body):
+            return struct.pack('<cI', kind, len(body)) + body
+
+        def name(tag, text):
+            return struct.pack('<H', tag) + text.encode()
+        body = (struct.pack('<HH', 0, 3) +
+                struct.pack('<Hc', 1, b's') + struct.pack('<I', 1) + b'7' +
+                struct.pack('<Hc', 2, b'T') + struct.pack('<q', 86400000001) +
+                struct.pack('<Hc', 3, b'i') + struct.pack('<q', -2))
+        data = (BinaryCodec.MAGIC_V1 + entry(b'C', name(0, 'City')) +
+                entry(b'F', name(1, 'id')) + entry(b'F', name(2, 'when')) +
+                entry(b'F', name(3, 'n')) + entry(b'R', body))
+        self.assertEqual(list(BinaryCodec().read(io.BytesIO(data))),
+                         [('City.7', {'id': '7', 'n': -2, '__class__': 'City',
+                                      'when': datetime(1970, 1, 2, 0, 0, 0,
+                                                       1)})])
+
+    def test_binary_malformed(self):
+        """ A record whose length does not match its layout is rejected """
+        codec = BinaryCodec()
+        f = io.BytesIO()
+        fragment = codec.dump(BaseModel())
+        codec.write(f, [('x', fragment)])
+        data = f.getvalue()
+        at = len(data) - len(fragment)
+        size = struct.unpack_from('<I', data, at + 1)[0]
+        data = data[:at + 1] + struct.pack('<I', size + 1) + \
+            data[at + 5:] + b'\0'
+        with self.assertRaises(ValueError):
+            list(codec.read(io.BytesIO(data)))
+
+    def test_convert(self):
+        """ Converting to binary and back keeps file.json contents """
+        objs = [BaseModel() for i in range(3)]
+        codec = JSONCodec()
+        with open('codec.json', 'w') as f:
+            codec.write(f, (('BaseModel.' + o.id, codec.dump(o))
+                            for o in objs))
+        convert('codec.json', 'codec.bin')
+        convert('codec.bin', 'back.json')
+        with open('codec.json') as f, open('back.json') as g:
+            self.assertEqual(json.load(f), json.load(g))
+
+    def test_codec_for(self):
+        """ Codecs are picked by file extension """
+        self.assertIsInstance(codec_for('file.json'), JSONCodec)
+        self.assertIsInstance(codec_for('file.bin'), BinaryCodec)
+        with self.assertRaises(ValueError):
+            codec_for('file.txt')
+
+    def test_time_format(self):
+        """ Timestamps are written and read as with strftime/strptime """
+        for value in (datetime(2020, 2, 18, 14, 21, 12, 96959),
+                      datetime(2020, 2, 18, 14, 21, 12),
+                      datetime(2020, 2, 18, 1, 2, 3, 4, timezone.utc)):
+            text = format_time(value)
+            self.assertEqual(text, value.strftime(TIME_FORMAT))
+            self.assertEqual(format_time(value), text)
+            self.assertEqual(parse_time(text),
+                             datetime.strptime(text, TIME_FORMAT))
+        value = datetime(999, 1, 2, 3, 4, 5, 6)
+        self.assertEqual(format_time(value), value.strftime(TIME_FORMAT))
+        self.assertEqual(parse_time("2020-2-18T14:21:12.5"),
+                         datetime(2020, 2, 18, 14, 21, 12, 500000))
+        for text in ("2020-02-18T14:21:12", "2020-02-18 14:21:12.096959",
+                     "2020-02-18T14:21:12.09695x",
+                     "2024-01-01T00:00:00.00000Z",
+                     "2024-01-01T00:00:00.1+0100",
+                     "2020-W08-2T14:21:12.096959"):
+            with self.assertRaises(ValueError):
+                parse_time(text)
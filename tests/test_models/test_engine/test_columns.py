@@ -0,0 +1,193 @@
+#!/usr/bin/python3
+""" Module for testing the columnar tables and their aggregations"""
+import unittest
+import os
+import tempfile
+from unittest.mock import patch
+from models import storage
+from models.engine.db_storage import DBStorage
+from models.engine.file_storage import FileStorage
+from models.place import Place
+from models.state import State
+from tests import NOT_FILE
+
+try:
+    import numpy
+    NO_NUMPY = None
+except ImportError:
+    NO_NUMPY = "needs numpy"
+
+
+class ColumnsTests:
+    """ Table tests run against the storage returned by open_storage """
+
+    def setUp(self):
+        """ Stores six places in three cities """
+        self.storage = self.open_storage()
+        self.places = []
+        for i, (city, price, guests, rooms) in enumerate([
+                ("a", 50, 2, 1), ("a", 80, 4, 2), ("a", 120, 6, 3),
+                ("b", 90, 5, 2), ("b", 60, 1, 1), ("c", 200, 8, 4)]):
+            self.places.append(Place(name="place_{}".format(i), city_id=city,
+                                     user_id="u", price_by_night=price,
+                                     max_guest=guests, number_rooms=rooms,
+                                     number_bathrooms=1,
+                                     description=None if i == 5 else
+                                     "view" if i % 2 else "quiet",
+                                     latitude=None if i == 4 else 1.5 * i))
+        self.storage.bulk_new(self.places)
+
+    def test_columns(self):
+        """ Numbers, timestamps and foreign keys are columns by default """
+        table = self.storage.columns(Place)
+        self.assertEqual(len(table), 6)
+        self.assertIn('city_id', table.attrs)
+        self.assertIn('created_at', table.attrs)
+        self.assertNotIn('name', table.attrs)
+        self.assertEqual(sorted(table.column('price_by_night').tolist()),
+                         [50, 60, 80, 90, 120, 200])
+        self.assertEqual(sorted(table.column('city_id').tolist()),
+                         ['a', 'a', 'a', 'b', 'b', 'c'])
+        table = self.storage.columns('Place', 'name', 'description')
+        self.assertEqual(table.attrs, ['name', 'description'])
+        self.assertEqual(table.column('description').tolist().count(None),
+                         1)
+
+    def test_unknown_columns(self):
+        """ Unknown attributes and classes without columns fail """
+        with self.assertRaises(ValueError):
+            self.storage.columns(Place, 'nope')
+        with self.assertRaises(ValueError):
+            self.storage.columns('BaseModel')
+        with self.assertRaises(ValueError):
+            self.storage.columns('Nope')
+
+    def test_aggregations(self):
+        """ Aggregations skip missing values """
+        table = self.storage.columns(Place)
+        self.assertEqual(table.sum('max_guest'), 26)
+        self.assertEqual(table.mean('price_by_night'), 100)
+        self.assertEqual(table.min('price_by_night'), 50)
+        self.assertEqual(table.max('price_by_night'), 200)
+        self.assertEqual(table.percentile('price_by_night', [50, 100]),
+                         [85.0, 200.0])
+        self.assertEqual(table.count('latitude'), 5)
+        self.assertAlmostEqual(table.mean('latitude'), 3.3)
+        with self.assertRaises(ValueError):
+            table.sum('city_id')
+
+    def test_filter(self):
+        """ filter() takes the conditions of query() """
+        table = self.storage.columns(Place)
+        self.assertEqual(len(table.filter(price_by_night__lt=100,
+                                          max_guest__ge=4)), 2)
+        self.assertEqual(len(table.filter(city_id='a')), 3)
+        self.assertEqual(len(table.filter(city_id__in=['a', 'b'])), 5)
+        self.assertEqual(len(table.filter(city_id__ne='a')), 3)
+        self.assertEqual(len(table.filter(city_id__gt='a')), 3)
+        self.assertEqual(len(table.filter(latitude=None)), 1)
+        self.assertEqual(len(table.filter(latitude__ge=0)), 5)
+        cheap = table.filter(price_by_night__le=90)
+        self.assertEqual(cheap.filter(city_id='b').sum('max_guest'), 6)
+        self.assertEqual(len(table), 6)
+        text = self.storage.columns(Place, 'description')
+        self.assertEqual(len(text.filter(description=None)), 1)
+        self.assertEqual(len(text.filter(description__ne=None)), 5)
+        self.assertEqual(len(text.filter(description__ne="view")), 3)
+        created = self.places[3].created_at
+        self.assertEqual(len(table.filter(created_at__gt=created)), 2)
+
+    def test_group_by(self):
+        """ Groups are aggregated per value, skipping missing values """
+        groups = self.storage.columns(Place).group_by('city_id')
+        self.assertEqual(groups.count(), {'a': 3, 'b': 2, 'c': 1})
+        self.assertEqual(groups.mean('price_by_night'),
+                         {'a': 250 / 3, 'b': 75.0, 'c': 200.0})
+        self.assertEqual(groups.sum('max_guest'), {'a': 12, 'b': 6, 'c': 8})
+        self.assertEqual(groups.min('price_by_night'),
+                         {'a': 50, 'b': 60, 'c': 200})
+        self.assertEqual(groups.max('price_by_night'),
+                         {'a': 120, 'b': 90, 'c': 200})
+        self.assertEqual(groups.percentile('price_by_night', 50),
+                         {'a': 80.0, 'b': 75.0, 'c': 200.0})
+        self.assertEqual(groups.count('latitude'), {'a': 3, 'b': 1, 'c': 1})
+        self.assertEqual(groups.mean('latitude')['b'], 4.5)
+        self.assertEqual(groups.sum('latitude')['b'], 4.5)
+
+    def test_group_by_none(self):
+        """ None is a group of its own, last in histograms """
+        table = self.storage.columns(Place, 'description', 'max_guest',
+                                     'latitude')
+        self.assertEqual(table.group_by('description').sum('max_guest'),
+                         {'quiet': 9, 'view': 9, None: 8})
+        self.assertEqual(table.histogram('description'),
+                         {'quiet': 3, 'view': 2, None: 1})
+        groups = table.filter(latitude=None).group_by('description')
+        self.assertEqual(groups.mean('latitude'), {'quiet': None})
+
+    def test_histogram(self):
+        """ Histograms count values or bins """
+        table = self.storage.columns(Place)
+        self.assertEqual(table.histogram('number_rooms'),
+                         {1: 2, 2: 2, 3: 1, 4: 1})
+        self.assertEqual(table.histogram('price_by_night', [0, 100, 300]),
+                         ([4, 2], [0, 100, 300]))
+
+
+@unittest.skipIf(NO_NUMPY, NO_NUMPY)
+@unittest.skipIf(os.getenv('HBNB_TYPE_STORAGE') == 'db', NOT_FILE)
+class test_FileColumns(ColumnsTests, unittest.TestCase):
+    """ Table tests on FileStorage """
+
+    def open_storage(self):
+        """ Returns the shared file storage, emptied """
+        storage.reset()
+        self.addCleanup(os.remove, 'file.json')
+        return storage
+
+    def test_table_follows_changes(self):
+        """ The table is kept until an object of its class changes """
+        table = self.storage.columns(Place)
+        self.assertIs(self.storage.columns(Place), table)
+        self.storage.new(State(name="Ohio"))
+        self.assertIs(self.storage.columns(Place), table)
+        self.places[0].price_by_night = 150
+        self.assertEqual(self.storage.columns(Place).max('price_by_night'),
+                         200)
+        self.assertEqual(self.storage.columns(Place).sum('price_by_night'),
+                         700)
+        self.storage.delete(self.places[5])
+        self.assertEqual(len(self.storage.columns(Place)), 5)
+
+    def test_lazy_records(self):
+        """ Lazy and compact records are read without building objects """
+        for setting in ('_FileStorage__lazy', '_FileStorage__compact'):
+            storage.reset()
+            fs = FileStorage()
+            setattr(fs, setting, True)
+            fs._FileStorage__lazy = True
+            fs.reload()
+            fs.get(Place, self.places[0].id)
+            table = fs.columns(Place)
+            self.assertEqual(len(storage._FileStorage__objects), 1)
+            self.assertEqual(table.group_by('city_id').count(),
+                             {'a': 3, 'b': 2, 'c': 1})
+            self.assertAlmostEqual(table.mean('latitude'), 3.3)
+            self.assertEqual(len(table.filter(
+                created_at__ge=self.places[0].created_at)), 6)
+
+
+@unittest.skipIf(NO_NUMPY, NO_NUMPY)
+class test_DBColumns(ColumnsTests, unittest.TestCase):
+    """ Table tests on DBStorage backed by SQLite """
+
+    def open_storage(self):
+        """ Returns a DBStorage on an empty SQLite database """
+        fd, path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        with patch.dict(os.environ, {'HBNB_DB_URL': 'sqlite:///' + path}):
+            db = DBStorage()
+        db.reload()
+        self.addCleanup(db.close)
+        return db
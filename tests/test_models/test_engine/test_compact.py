@@ -0,0 +1,147 @@
+#!/usr/bin/python3
+""" Module for testing the compact record table"""
+import unittest
+import json
+import os
+import uuid
+from datetime import datetime
+from models import storage
+from models.engine import compact
+from models.engine.compact import CompactTable
+from models.engine.file_storage import FileStorage
+from models.city import City
+from models.state import State
+from tests import NOT_FILE
+
+STAMP = "2020-02-18T14:21:12.096959"
+
+
+def record(cls='State', **attrs):
+    """ Returns a to_dict() style record with a fresh id """
+    val = {'id': str(uuid.uuid4()), 'created_at': STAMP,
+           'updated_at': STAMP, '__class__': cls}
+    val.update(attrs)
+    return cls + '.' + val['id'], val
+
+
+class test_CompactTable(unittest.TestCase):
+    """ Tests the columns, lookups and rebuilt records """
+
+    def setUp(self):
+        """ Stores three records, one lacking an attribute """
+        self.table = CompactTable('State')
+        self.records = dict([record(name="Ohio"), record(name="Utah"),
+                             record()])
+        for key, val in self.records.items():
+            self.table[key] = val
+
+    def test_pack(self):
+        """ Ids and timestamps round-trip through their packed form """
+        _id = str(uuid.uuid4())
+        self.assertEqual(compact.unpack_id(compact.pack_id(_id)), _id)
+        self.assertIsNone(compact.pack_id("nope"))
+        self.assertIsNone(compact.pack_id(_id.upper()))
+        self.assertEqual(compact.pack_time(STAMP),
+                         compact.pack_time(datetime.fromisoformat(STAMP)))
+        self.assertIsNone(compact.pack_time("2020-02-18"))
+
+    def test_lookup(self):
+        """ Records are rebuilt with datetimes for their timestamps """
+        for key, val in self.records.items():
+            self.assertIn(key, self.table)
+            found = self.table[key]
+            self.assertEqual(found['created_at'],
+                             datetime.fromisoformat(STAMP))
+            found['created_at'] = found['updated_at'] = STAMP
+            self.assertEqual(found, val)
+        self.assertNotIn('State.nope', self.table)
+        self.assertNotIn('City.' + next(iter(self.records))[6:], self.table)
+        self.assertEqual(len(self.table), 3)
+
+    def test_sorted_and_tail(self):
+        """ Rows added or deleted after pack() are found """
+        self.table.pack()
+        key, val = record(name="Iowa")
+        self.table[key] = val
+        first = next(iter(self.records))
+        del self.table[first]
+        self.assertEqual(self.table[key]['name'], "Iowa")
+        self.assertNotIn(first, self.table)
+        self.assertEqual(len(self.table), 3)
+        self.table.pack()
+        self.assertEqual(sorted(self.table.keys()),
+                         sorted(list(self.records)[1:] + [key]))
+
+    def test_replace(self):
+        """ Storing a key again replaces its record """
+        key = next(iter(self.records))
+        self.table[key] = dict(self.records[key], name="Iowa")
+        self.assertEqual(self.table[key]['name'], "Iowa")
+        self.assertEqual(len(self.table), 3)
+
+    def test_odd_records(self):
+        """ Records that do not fit the columns are kept whole """
+        odd = {'id': "1", 'created_at': STAMP, 'updated_at': STAMP,
+               '__class__': 'State'}
+        self.table['State.1'] = odd
+        self.assertIs(self.table['State.1'], odd)
+        self.assertEqual(len(self.table), 4)
+        self.assertEqual(dict(self.table.items())['State.1'], odd)
+        self.assertEqual(self.table.pop('State.1'), odd)
+        self.assertEqual(len(self.table), 3)
+
+    def test_many_rows(self):
+        """ Lookups keep working across automatic packs """
+        table = CompactTable('City')
+        keys = []
+        for i in range(10000):
+            key, val = record('City', state_id="s", name=str(i))
+            keys.append(key)
+            table[key] = val
+        for i in range(0, 10000, 7):
+            del table[keys[i]]
+        self.assertEqual(len(table), 10000 - len(range(0, 10000, 7)))
+        self.assertEqual(table[keys[1]]['name'], "1")
+        self.assertNotIn(keys[7], table)
+
+
+@unittest.skipIf(os.getenv('HBNB_TYPE_STORAGE') == 'db', NOT_FILE)
+class test_CompactStorage(unittest.TestCase):
+    """ FileStorage with HBNB_FILE_COMPACT switched on """
+
+    def setUp(self):
+        """ Empties storage and saves a state and a city """
+        storage.reset()
+        self.addCleanup(os.remove, 'file.json')
+        self.state = State(name="Ohio")
+        self.city = City(name="Akron", state_id=self.state.id)
+        storage.bulk_new([self.state, self.city])
+        storage.save()
+        with open('file.json') as f:
+            self.saved = json.load(f)
+        storage.reset()
+        self.fs = FileStorage()
+        self.fs._FileStorage__compact = True
+        self.fs._FileStorage__lazy = True
+        self.fs.reload()
+
+    def test_reload(self):
+        """ Reloaded records are kept in compact tables """
+        raw = FileStorage._FileStorage__raw
+        self.assertIsInstance(raw['State'], CompactTable)
+        self.assertEqual(storage._FileStorage__objects, {})
+        self.assertEqual(self.fs.count(), 2)
+
+    def test_same_objects(self):
+        """ Objects built from compact records match the saved ones """
+        state = self.fs.get(State, self.state.id)
+        self.assertTrue(str(state).startswith(
+            "[State] ({}) {{".format(self.state.id)))
+        self.assertEqual(state.to_dict(), self.state.to_dict())
+        self.assertEqual([city.name for city in state.cities], ["Akron"])
+
+    def test_save_unchanged(self):
+        """ Records never built are written back unchanged """
+        self.fs.save()
+        with open('file.json') as f:
+            self.assertEqual(json.load(f), self.saved)
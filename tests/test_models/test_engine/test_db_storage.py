@@ -0,0 +1,431 @@
+#!/usr/bin/python3
+""" Module for testing db storage against a SQLite stand-in"""
+import unittest
+import os
+import tempfile
+import threading
+from unittest.mock import patch
+from sqlalchemy import event
+import models
+from models.engine.db_storage import DBStorage
+from models.state import State
+from models.city import City
+from models.user import User
+from models.place import Place
+from models.review import Review
+
+NOT_MAPPED = "relationships are only mapped with HBNB_TYPE_STORAGE=db"
+
+
+class test_DBStorage(unittest.TestCase):
+    """ Class to test the db storage methods """
+
+    settings = {}
+
+    def setUp(self):
+        """ Open a DBStorage on an empty SQLite database """
+        fd, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        env = {'HBNB_DB_URL': 'sqlite:///' + self.path, 'HBNB_DB_BATCH': '2',
+               'HBNB_MYSQL_POOL_SIZE': '2', 'HBNB_MYSQL_MAX_OVERFLOW': '0',
+               'HBNB_MYSQL_POOL_TIMEOUT': '5'}
+        env.update(self.settings)
+        with patch.dict(os.environ, env):
+            self.storage = DBStorage()
+        self.storage.reload()
+        self.state = State(name="California")
+        self.city = City(name="San Francisco", state_id=self.state.id)
+        self.user = User(email="a@b.c", password="pwd")
+        for obj in (self.state, self.city, self.user):
+            self.storage.new(obj)
+        self.storage.save()
+
+    def tearDown(self):
+        """ Close the session and remove the database """
+        self.storage.close()
+        os.remove(self.path)
+
+    def queries(self, func):
+        """ Runs func and returns the SELECT statements it issued """
+        engine = self.storage._DBStorage__engine
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            if statement.startswith('SELECT'):
+                statements.append(statement)
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            func()
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+        return statements
+
+    def test_all(self):
+        """ all() returns every object keyed by <class name>.<id> """
+        self.assertEqual(self.storage.all(), {
+            'State.' + self.state.id: self.state,
+            'City.' + self.city.id: self.city,
+            'User.' + self.user.id: self.user})
+
+    def test_all_class(self):
+        """ all() accepts a class or a class name """
+        expected = {'State.' + self.state.id: self.state}
+        self.assertEqual(self.storage.all(State), expected)
+        self.assertEqual(self.storage.all('State'), expected)
+        self.assertEqual(self.storage.all('Nope'), {})
+
+    def test_get(self):
+        """ get() finds an object by class and id """
+        self.storage.close()
+        state = self.storage.get(State, self.state.id)
+        self.assertEqual(state.name, "California")
+        self.assertIs(self.storage.get('State', self.state.id), state)
+        self.assertIsNone(self.storage.get(State, "nope"))
+        self.assertIsNone(self.storage.get('Nope', self.state.id))
+        self.assertIsNone(self.storage.get(City, self.state.id))
+
+    def test_count(self):
+        """ count() counts in a single query """
+        self.storage.new(State(name="Nevada"))
+        self.assertEqual(self.storage.count(State), 2)
+        self.assertEqual(self.storage.count('City'), 1)
+        self.assertEqual(self.storage.count('Nope'), 0)
+        result = []
+        statements = self.queries(lambda: result.append(self.storage.count()))
+        self.assertEqual(result, [4])
+        self.assertEqual(len(statements), 1)
+
+    def test_all_batches(self):
+        """ all() reads more rows than one batch """
+        for i in range(5):
+            self.storage.new(State(name="state_{}".format(i)))
+        self.storage.save()
+        self.assertEqual(len(self.storage.all(State)), 6)
+
+    def test_all_one_query_per_class(self):
+        """ all() runs one query per class and none for relationships """
+        self.storage.close()
+        result = {}
+        statements = self.queries(lambda: result.update(self.storage.all()))
+        self.assertEqual(len(statements), 6)
+        for statement in statements:
+            self.assertEqual(statement.split().count('FROM'), 1)
+        self.assertEqual(len(result), 3)
+        state = result['State.' + self.state.id]
+        self.assertNotIn('cities', state.__dict__)
+
+    def test_bulk_new(self):
+        """ bulk_new inserts in chunks and attaches the objects """
+        states = [State(name="state_{}".format(i)) for i in range(5)]
+        statements = self.queries(lambda: self.storage.bulk_new(states))
+        self.assertEqual(statements, [])
+        self.assertEqual(len(self.storage.all(State)), 6)
+        states[0].name = "renamed"
+        self.storage.save()
+        self.storage.close()
+        self.assertEqual(self.storage.all(State)['State.' + states[0].id].name,
+                         "renamed")
+
+    def test_bulk_new_skips_stored(self):
+        """ bulk_new skips persistent objects and inserts pending ones """
+        ohio = State(name="Ohio")
+        self.storage.new(ohio)
+        self.storage.bulk_new([self.state, ohio, State(name="Utah")])
+        self.storage.close()
+        self.assertEqual(sorted(s.name for s in
+                                self.storage.all(State).values()),
+                         ["California", "Ohio", "Utah"])
+
+    def test_bulk_writes_leave_pending_changes(self):
+        """ Bulk writes neither flush nor commit pending changes """
+        key = 'User.' + self.user.id
+        self.state.name = "Draft"
+        self.storage.new(State(name="Nevada"))
+        self.storage.bulk_new([State(name="Utah")])
+        self.storage.bulk_update({key: {'first_name': 'Betty'}})
+        self.storage._DBStorage__session.rollback()
+        self.storage.close()
+        self.assertEqual(sorted(s.name for s in
+                                self.storage.all(State).values()),
+                         ["California", "Utah"])
+        self.assertEqual(self.storage.all(User)[key].first_name, 'Betty')
+
+    def test_bulk_update(self):
+        """ bulk_update updates rows and the objects in the session """
+        before = self.state.updated_at
+        self.storage.bulk_update({
+            'State.' + self.state.id: {'name': 'Nevada'},
+            'User.' + self.user.id: {'first_name': 'Betty'}})
+        self.assertEqual(self.state.name, 'Nevada')
+        self.assertGreater(self.state.updated_at, before)
+        self.storage.close()
+        self.assertEqual(
+            self.storage.all(User)['User.' + self.user.id].first_name,
+            'Betty')
+
+    def test_pool_settings(self):
+        """ The pool is sized from the HBNB_MYSQL_POOL_* variables """
+        pool = self.storage._DBStorage__engine.pool
+        self.assertEqual(pool.size(), 2)
+        self.assertEqual(pool._max_overflow, 0)
+        self.assertEqual(pool._timeout, 5)
+
+    def test_session_per_thread(self):
+        """ Each thread gets its own session """
+        sessions = []
+
+        def read():
+            self.storage.all(State)
+            sessions.append(self.storage._DBStorage__session())
+            self.storage.release()
+        threads = [threading.Thread(target=read) for i in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertIsNot(sessions[0], sessions[1])
+
+    def test_concurrent_reads_release_connections(self):
+        """ Many threads reading through a pool of 2 leak no connection """
+        self.storage.close()
+        pool = self.storage._DBStorage__engine.pool
+        errors = []
+        counts = []
+
+        def read():
+            try:
+                for i in range(10):
+                    counts.append(len(self.storage.all()))
+                    self.storage.release()
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=read) for i in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(counts, [3] * 160)
+        self.assertEqual(pool.checkedout(), 0)
+
+    def seed_tree(self, width):
+        """ Adds width cities per state, places per city, reviews per place """
+        objs = []
+        for state in [self.state] + [State(name="s") for i in range(width)]:
+            objs.append(state)
+            for i in range(width):
+                city = City(name="c", state_id=state.id)
+                objs.append(city)
+                for j in range(width):
+                    place = Place(name="p", city_id=city.id,
+                                  user_id=self.user.id)
+                    objs.append(place)
+                    objs += [Review(text="r", place_id=place.id,
+                                    user_id=self.user.id)
+                             for k in range(width)]
+        self.storage.bulk_new(objs[1:])
+        self.storage.close()
+
+    def walk(self, states):
+        """ Renders the state -> cities -> places -> reviews tree """
+        return sum(len(place.reviews) for state in states.values()
+                   for city in state.cities for place in city.places)
+
+    @unittest.skipIf(models.storage_type != 'db', NOT_MAPPED)
+    def test_all_load_bounded_queries(self):
+        """ A loaded tree costs the same queries whatever its size """
+        path = {"cities.places.reviews": "selectin"}
+        counts = []
+        for width in (2, 4):
+            self.seed_tree(width)
+            statements = self.queries(
+                lambda: self.walk(self.storage.all(State, load=path)))
+            counts.append(len(statements))
+        self.assertEqual(counts, [4, 4])
+        lazy = self.queries(lambda: self.walk(self.storage.all(State)))
+        self.assertGreater(len(lazy), 4)
+
+    @unittest.skipIf(models.storage_type != 'db', NOT_MAPPED)
+    def test_all_load_strategies(self):
+        """ Every strategy loads the same tree without lazy loads """
+        self.seed_tree(2)
+        for strategy, count in (("joined", 1), ("subquery", 3),
+                                ("selectin", 3)):
+            self.storage.close()
+            states = {}
+            statements = self.queries(lambda: states.update(
+                self.storage.all('State', load={"cities.places": strategy})))
+            self.assertEqual(len(statements), count)
+            self.assertEqual(len(states), 3)
+            self.assertEqual(
+                self.queries(lambda: sum(len(c.places) for s in states.values()
+                                         for c in s.cities)), [])
+
+    @unittest.skipIf(models.storage_type != 'db', NOT_MAPPED)
+    def test_all_load_list_and_errors(self):
+        """ load accepts a list of paths and rejects unknown ones """
+        self.storage.close()
+        states = self.storage.all(State, load=["cities"])
+        self.assertEqual(self.queries(
+            lambda: [s.cities for s in states.values()]), [])
+        with self.assertRaises(ValueError):
+            self.storage.all(State, load=["nope"])
+        with self.assertRaises(ValueError):
+            self.storage.all(State, load={"cities": "eager"})
+        with self.assertRaises(ValueError):
+            self.storage.all(load=["cities"])
+
+
+class test_DBStorageCache(test_DBStorage):
+    """ The db storage tests, and cache tests, with the cache enabled """
+
+    settings = {'HBNB_DB_CACHE_SIZE': '100'}
+
+    def read_twice(self, func):
+        """ Runs func in two sessions, returning the results and the
+        SELECT statements of the second run """
+        self.storage.close()
+        first = func()
+        self.storage.close()
+        result = []
+        statements = self.queries(lambda: result.append(func()))
+        return first, result[0], statements
+
+    def test_all_cached(self):
+        """ A second all(cls) issues no query and gives equal objects """
+        first, second, statements = self.read_twice(
+            lambda: self.storage.all(State))
+        self.assertEqual(statements, [])
+        self.assertEqual(list(first), list(second))
+        self.assertIsNot(first['State.' + self.state.id],
+                         second['State.' + self.state.id])
+        self.assertEqual(second['State.' + self.state.id].name, "California")
+        stats = self.storage.cache_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_query_and_search_cached(self):
+        """ Query results and searched objects are cached by signature """
+        first, second, statements = self.read_twice(lambda: list(
+            self.storage.query(State).filter(name__in=["California"])))
+        self.assertEqual(statements, [])
+        self.assertEqual([s.id for s in second], [self.state.id])
+        first, second, statements = self.read_twice(
+            lambda: self.storage.search(City, "francisco"))
+        self.assertEqual(statements, [])
+        self.assertEqual([c.id for c in second], [self.city.id])
+
+    def test_no_stale_read_after_writes(self):
+        """ Writes through the storage are seen by the next read """
+        self.storage.all(State)
+        list(self.storage.query(State).filter(name="Nevada"))
+        nevada = State(name="Nevada")
+        self.storage.new(nevada)
+        self.storage.save()
+        self.storage.close()
+        self.assertEqual(len(self.storage.all(State)), 2)
+        self.assertEqual(len(list(
+            self.storage.query(State).filter(name="Nevada"))), 1)
+        state = self.storage.all(State)['State.' + self.state.id]
+        state.name = "Oregon"
+        self.storage.save()
+        self.storage.close()
+        self.assertEqual(
+            self.storage.all(State)['State.' + self.state.id].name, "Oregon")
+        state = self.storage.all(State)['State.' + self.state.id]
+        state.name = "Texas"
+        self.assertIsNone(self.storage.get(State, "nope"))
+        self.storage.save()
+        self.storage.close()
+        self.assertEqual(
+            self.storage.all(State)['State.' + self.state.id].name, "Texas")
+        self.assertEqual(self.storage.get(State, self.state.id).name, "Texas")
+        self.storage.delete(self.storage.all(State)['State.' + nevada.id])
+        self.storage.save()
+        self.storage.close()
+        self.assertEqual(list(self.storage.all(State)),
+                         ['State.' + self.state.id])
+        self.storage.bulk_update({'State.' + self.state.id: {'name': 'Utah'}})
+        self.storage.close()
+        self.assertEqual(
+            self.storage.all(State)['State.' + self.state.id].name, "Utah")
+        self.storage.bulk_new([State(name="Idaho")])
+        self.storage.close()
+        self.assertEqual(len(self.storage.all(State)), 2)
+
+    def test_uncommitted_not_cached(self):
+        """ Rows read while the session holds changes are not cached """
+        self.storage.close()
+        state = self.storage.all(State)['State.' + self.state.id]
+        state.name = "Draft"
+        self.storage.all(City)
+        self.storage.close()
+        self.assertEqual(self.queries(lambda: self.storage.all(State)), [])
+        self.assertEqual(len(self.queries(lambda: self.storage.all(City))), 1)
+        self.assertEqual(
+            self.storage.all(State)['State.' + self.state.id].name,
+            "California")
+
+    def test_flushed_not_cached(self):
+        """ Rows read after an autoflush of uncommitted changes are not
+        cached """
+        self.storage.close()
+        state = self.storage.all(State)['State.' + self.state.id]
+        self.storage.close()
+        state = self.storage.get(State, self.state.id)
+        state.name = "Draft"
+        self.assertIsNone(self.storage.get(City, "nope"))
+        self.storage.all(City)
+        self.storage.close()
+        self.assertEqual(len(self.queries(lambda: self.storage.all(City))), 1)
+        self.assertEqual(
+            self.storage.all(State)['State.' + self.state.id].name,
+            "California")
+
+    def test_rows_older_than_a_commit_not_cached(self):
+        """ Rows read in a transaction that began before another session
+        committed a write are not cached """
+        self.storage.close()
+        self.storage.get(City, self.city.id)
+
+        def write():
+            self.storage.new(State(name="Nevada"))
+            self.storage.save()
+            self.storage.release()
+        thread = threading.Thread(target=write)
+        thread.start()
+        thread.join()
+        self.storage.all(State)
+        self.storage.get(State, self.state.id)
+        self.storage.search(State, "california")
+        self.storage.close()
+        self.assertEqual(len(self.queries(
+            lambda: self.storage.all(State))), 1)
+        self.storage.close()
+        self.assertEqual(len(self.queries(
+            lambda: self.storage.get(State, self.state.id))), 1)
+        self.assertEqual(len(self.queries(
+            lambda: self.storage.search(State, "california"))), 1)
+
+    def test_hit_keeps_uncommitted_changes(self):
+        """ A hit returns the object the session holds, changes included """
+        self.storage.close()
+        self.storage.all(State)
+        self.storage.close()
+        state = self.storage.all(State)['State.' + self.state.id]
+        state.name = "Draft"
+        self.assertIs(self.storage.all(State)['State.' + self.state.id],
+                      state)
+        self.assertEqual(state.name, "Draft")
+
+    def test_cached_objects_are_tracked(self):
+        """ Objects served from the cache can be changed and saved """
+        self.storage.close()
+        self.storage.all(State)
+        self.storage.close()
+        state = self.storage.all(State)['State.' + self.state.id]
+        state.name = "Texas"
+        self.storage.save()
+        self.storage._DBStorage__cache.clear()
+        self.storage.close()
+        self.assertEqual(
+            self.storage.all(State)['State.' + self.state.id].name, "Texas")
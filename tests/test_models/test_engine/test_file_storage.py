@@ -2,8 +2,21 @@
 """ Module for testing file storage"""
 import unittest
 from models.base_model import BaseModel
+from models.state import State
+from models.city import City
+from models.place import Place
+from models.review import Review
+from models.amenity import Amenity
+from models.user import User
 from models import storage
+from models.engine.file_storage import FileStorage
+from models.engine.codec import BinaryCodec, JSONCodec
+import json
 import os
+import threading
+import time
+import tracemalloc
+from unittest.mock import patch
 
 
 class test_fileStorage(unittest.TestCase):
@@ -11,18 +24,16 @@ class test_fileStorage(unittest.TestCase):
 
     def setUp(self):
         """ Set up test environment """
-        del_list = []
-        for key in storage._FileStorage__objects.keys():
-            del_list.append(key)
-        for key in del_list:
-            del storage._FileStorage__objects[key]
+        storage.reset()
 
     def tearDown(self):
         """ Remove storage file at end of tests """
-        try:
-            os.remove('file.json')
-        except:
-            pass
+        for path in ('file.json', 'file.json.log', 'file.bin', 'file.rec',
+                     'file.rec.idx'):
+            try:
+                os.remove(path)
+            except:
+                pass
 
     def test_obj_list_empty(self):
         """ __objects is initially empty """
@@ -107,3 +118,588 @@ class test_fileStorage(unittest.TestCase):
         from models.engine.file_storage import FileStorage
         print(type(storage))
         self.assertEqual(type(storage), FileStorage)
+
+    def test_all_cls(self):
+        """ all(cls) only returns objects of that class """
+        base = BaseModel()
+        state = State(name="California")
+        storage.new(base)
+        storage.new(state)
+        self.assertEqual(storage.all(State), {'State.' + state.id: state})
+        self.assertEqual(storage.all('BaseModel'),
+                         {'BaseModel.' + base.id: base})
+        self.assertEqual(storage.all('City'), {})
+
+    def test_all_cls_after_delete(self):
+        """ Deleted objects leave the class index """
+        state = State(name="Nevada")
+        storage.new(state)
+        storage.delete(state)
+        self.assertEqual(storage.all(State), {})
+        self.assertNotIn('State', storage._FileStorage__classes)
+
+    def test_reset(self):
+        """ reset forgets objects and indexes but not the saved file """
+        place = Place(name="Loft", city_id="c", latitude=1.0, longitude=2.0)
+        storage.new(place)
+        storage.add_index(Place, 'latitude')
+        storage.search(Place, "loft")
+        storage.save()
+        storage.reset()
+        self.assertEqual(storage.all(), {})
+        self.assertEqual(storage.children(Place, 'city_id', "c"), [])
+        self.assertIsNone(storage.sorted_index(Place, 'latitude'))
+        self.assertEqual(storage.places_near(1.0, 2.0, 1), [])
+        self.assertEqual(FileStorage._FileStorage__texts, {})
+        storage.reload()
+        self.assertEqual(list(storage.all()), ['Place.' + place.id])
+
+    def test_all_cls_after_reload(self):
+        """ Reloaded objects are indexed by class """
+        state = State(name="Texas")
+        storage.new(state)
+        storage.save()
+        storage.reset()
+        storage.reload()
+        self.assertEqual(list(storage.all(State)), ['State.' + state.id])
+
+    def journal_storage(self, journal_max=1 << 20):
+        """ FileStorage sharing __objects with journaling switched on """
+        fs = FileStorage()
+        fs._FileStorage__journal = True
+        fs._FileStorage__journal_max = journal_max
+        return fs
+
+    def write_behind_storage(self, delay):
+        """ FileStorage sharing __objects with write-behind switched on """
+        fs = FileStorage()
+        fs._FileStorage__write_behind = True
+        fs._FileStorage__flush_delay = delay
+        self.addCleanup(fs.close)
+        return fs
+
+    def binary_storage(self):
+        """ FileStorage sharing __objects with the binary codec """
+        fs = FileStorage()
+        fs._FileStorage__codec = BinaryCodec()
+        return fs
+
+    def records_storage(self):
+        """ FileStorage sharing __objects in records mode """
+        fs = FileStorage()
+        fs._FileStorage__records = True
+        fs.reload()
+        self.addCleanup(fs._FileStorage__record_file.close)
+        return fs
+
+    def lazy_storage(self):
+        """ FileStorage sharing __objects with lazy reload switched on """
+        fs = FileStorage()
+        fs._FileStorage__lazy = True
+        return fs
+
+    def get_in_threads(self, fs, ids):
+        """ Returns the objects four threads got for ids, and the errors """
+        found = [{} for i in range(4)]
+        errors = []
+
+        def work(got):
+            try:
+                for _id in ids:
+                    got[_id] = fs.get(State, _id)
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=work, args=(got,))
+                   for got in found]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return found, errors
+
+    def forget_all(self):
+        """ Drop in-memory objects so reload starts from disk """
+        storage.reset()
+
+    def test_journal_save_appends(self):
+        """ Journal mode appends records instead of writing file.json """
+        fs = self.journal_storage()
+        new = BaseModel()
+        fs.new(new)
+        fs.save()
+        self.assertFalse(os.path.exists('file.json'))
+        with open(fs.journal_path) as f:
+            self.assertEqual(len(f.readlines()), 1)
+        new.name = "renamed"
+        fs.new(new)
+        fs.save()
+        self.forget_all()
+        fs.reload()
+        self.assertEqual(fs.all()['BaseModel.' + new.id].name, "renamed")
+
+    def test_journal_delete(self):
+        """ Deletions are journaled and replayed """
+        fs = self.journal_storage()
+        new = State(name="Utah")
+        fs.new(new)
+        fs.save()
+        fs.delete(new)
+        fs.save()
+        self.forget_all()
+        fs.reload()
+        self.assertEqual(fs.all(State), {})
+
+    def test_journal_over_snapshot(self):
+        """ A plain file.json is loaded before the journal is replayed """
+        old = BaseModel()
+        storage.new(old)
+        storage.save()
+        fs = self.journal_storage()
+        new = BaseModel()
+        fs.new(new)
+        fs.save()
+        self.forget_all()
+        fs.reload()
+        self.assertIn('BaseModel.' + old.id, fs.all())
+        self.assertIn('BaseModel.' + new.id, fs.all())
+
+    def test_journal_torn_record(self):
+        """ A torn last record is ignored and cut from the journal """
+        fs = self.journal_storage()
+        new = BaseModel()
+        fs.new(new)
+        fs.save()
+        size = os.path.getsize(fs.journal_path)
+        with open(fs.journal_path, 'a') as f:
+            f.write('["put","BaseModel.x",{"id":')
+        self.forget_all()
+        fs.reload()
+        self.assertEqual(list(fs.all()), ['BaseModel.' + new.id])
+        self.assertEqual(os.path.getsize(fs.journal_path), size)
+
+    def test_journal_compaction(self):
+        """ The journal is folded into file.json past its size limit """
+        fs = self.journal_storage(journal_max=0)
+        new = BaseModel()
+        fs.new(new)
+        fs.save()
+        self.assertFalse(os.path.exists(fs.journal_path))
+        with open('file.json') as f:
+            self.assertIn('BaseModel.' + new.id, json.load(f))
+
+    def test_setattr_marks_changed(self):
+        """ Assigning an attribute flags a stored object as changed """
+        new = BaseModel()
+        storage.new(new)
+        storage.save()
+        self.assertEqual(storage._FileStorage__changed, set())
+        new.name = "changed"
+        self.assertEqual(storage._FileStorage__changed,
+                         {'BaseModel.' + new.id})
+
+    def test_save_only_encodes_changed(self):
+        """ Clean objects reuse the JSON written by the previous save """
+        objs = [BaseModel() for i in range(3)]
+        for obj in objs:
+            storage.new(obj)
+        storage.save()
+        objs[1].name = "changed"
+        with patch.object(BaseModel, 'to_dict', autospec=True,
+                          side_effect=BaseModel.to_dict) as to_dict:
+            storage.save()
+        self.assertEqual(to_dict.call_count, 1)
+        with open('file.json') as f:
+            self.assertEqual(json.load(f),
+                             {'BaseModel.' + o.id: o.to_dict() for o in objs})
+
+    def test_lazy_reload(self):
+        """ Lazy reload builds no objects until they are looked up """
+        state = State(name="Ohio")
+        base = BaseModel()
+        storage.new(state)
+        storage.new(base)
+        storage.save()
+        self.forget_all()
+        fs = self.lazy_storage()
+        fs.reload()
+        self.assertEqual(storage._FileStorage__objects, {})
+        loaded = fs.get(State, state.id)
+        self.assertEqual(loaded.name, "Ohio")
+        self.assertIs(fs.get('State', state.id), loaded)
+        self.assertEqual(list(storage._FileStorage__objects),
+                         ['State.' + state.id])
+        self.assertEqual(list(fs.all(BaseModel)), ['BaseModel.' + base.id])
+        self.assertEqual(len(fs.all()), 2)
+        self.assertEqual(storage._FileStorage__raw, {})
+
+    def test_lazy_save(self):
+        """ Records never built are written back unchanged """
+        base = BaseModel()
+        storage.new(base)
+        storage.save()
+        with open('file.json') as f:
+            before = json.load(f)
+        self.forget_all()
+        fs = self.lazy_storage()
+        fs.reload()
+        fs.new(BaseModel())
+        fs.save()
+        with open('file.json') as f:
+            after = json.load(f)
+        self.assertEqual(len(after), 2)
+        self.assertEqual(after['BaseModel.' + base.id],
+                         before['BaseModel.' + base.id])
+
+    def test_lazy_get_threads(self):
+        """ Threads getting the same lazy records share one object each """
+        states = [State(name="s") for i in range(5000)]
+        storage.bulk_new(states)
+        self.forget_all()
+        fs = self.lazy_storage()
+        fs.reload()
+        ids = [state.id for state in states]
+        found, errors = self.get_in_threads(fs, ids)
+        self.assertEqual(errors, [])
+        for _id in ids:
+            self.assertIsNotNone(found[0][_id])
+            for got in found[1:]:
+                self.assertIs(got[_id], found[0][_id])
+        self.assertEqual(fs.count(State), 5000)
+
+    def test_get_missing(self):
+        """ get returns None for unknown ids """
+        self.assertIsNone(storage.get(State, "nope"))
+
+    def test_count(self):
+        """ count counts one class or every class """
+        storage.bulk_new([State(), State(), BaseModel()])
+        self.assertEqual(storage.count(), 3)
+        self.assertEqual(storage.count(State), 2)
+        self.assertEqual(storage.count('BaseModel'), 1)
+        self.assertEqual(storage.count('Nope'), 0)
+
+    def test_lazy_count(self):
+        """ count builds none of the lazy records """
+        storage.bulk_new([State(), State(), BaseModel()])
+        storage.save()
+        self.forget_all()
+        fs = self.lazy_storage()
+        fs.reload()
+        fs.get(State, next(iter(fs._FileStorage__raw['State']))[6:])
+        self.assertEqual(fs.count(), 3)
+        self.assertEqual(fs.count(State), 2)
+        self.assertEqual(len(storage._FileStorage__objects), 1)
+
+    def test_reload_bounded_memory(self):
+        """ Reading file.json does not decode the whole file at once """
+        stamp = "2020-02-18T14:21:12.096959"
+        with open('file.json', 'w') as f:
+            f.write('{')
+            for i in range(20000):
+                val = {'id': str(i), 'created_at': stamp,
+                       'updated_at': stamp, '__class__': 'BaseModel'}
+                f.write('{}"BaseModel.{}": {}'.format(', ' if i else '', i,
+                                                     json.dumps(val)))
+            f.write('}')
+        self.assertGreater(os.path.getsize('file.json'), 2 * 1024 * 1024)
+        tracemalloc.start()
+        with open('file.json') as f:
+            count = sum(1 for rec in JSONCodec().read(f))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.assertEqual(count, 20000)
+        self.assertLess(peak, 512 * 1024)
+
+    def test_save_bounded_memory(self):
+        """ Saving writes records out one at a time """
+        for i in range(5000):
+            storage.new(BaseModel())
+        storage.save()
+        tracemalloc.start()
+        storage.save()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.assertGreater(os.path.getsize('file.json'), 512 * 1024)
+        self.assertLess(peak, 128 * 1024)
+
+    def test_reload_malformed(self):
+        """ A truncated file.json is rejected """
+        with open('file.json', 'w') as f:
+            f.write('{"BaseModel.1": {"id": "1", "__class__": "BaseModel"}')
+        with self.assertRaises(ValueError):
+            storage.reload()
+
+    def test_save_atomic(self):
+        """ A failing save leaves the previous file.json untouched """
+        old = BaseModel()
+        storage.new(old)
+        storage.save()
+        with open('file.json') as f:
+            before = f.read()
+        new = BaseModel()
+        storage.new(new)
+        with patch.object(BaseModel, 'to_dict', side_effect=OSError):
+            with self.assertRaises(OSError):
+                storage.save()
+        with open('file.json') as f:
+            self.assertEqual(f.read(), before)
+        self.assertFalse(os.path.exists('file.json.tmp'))
+
+    def test_write_behind_flush(self):
+        """ save only schedules a write, flush performs it """
+        fs = self.write_behind_storage(60)
+        fs.new(BaseModel())
+        fs.save()
+        self.assertFalse(os.path.exists('file.json'))
+        fs.flush()
+        self.assertTrue(os.path.exists('file.json'))
+
+    def test_write_behind_coalesces(self):
+        """ A burst of saves results in a single write """
+        fs = self.write_behind_storage(0.2)
+        with patch.object(FileStorage, '_FileStorage__write_snapshot',
+                          autospec=True,
+                          side_effect=FileStorage._FileStorage__write_snapshot
+                          ) as write:
+            for i in range(10):
+                fs.new(BaseModel())
+                fs.save()
+            deadline = time.time() + 5
+            while not os.path.exists('file.json') and time.time() < deadline:
+                time.sleep(0.05)
+            fs.close()
+        self.assertEqual(write.call_count, 1)
+        with open('file.json') as f:
+            self.assertEqual(len(json.load(f)), 10)
+
+    def test_write_behind_close(self):
+        """ close writes pending changes and stops the writer thread """
+        fs = self.write_behind_storage(60)
+        fs.new(BaseModel())
+        fs.save()
+        writer = fs._FileStorage__writer
+        fs.close()
+        self.assertFalse(writer.is_alive())
+        self.assertTrue(os.path.exists('file.json'))
+
+    def test_write_behind_release(self):
+        """ release neither writes nor stops the writer thread """
+        fs = self.write_behind_storage(60)
+        fs.new(BaseModel())
+        fs.save()
+        writer = fs._FileStorage__writer
+        fs.release()
+        self.assertTrue(writer.is_alive())
+        self.assertFalse(os.path.exists('file.json'))
+
+    def test_binary_save_reload(self):
+        """ The binary codec writes file.bin and reads it back """
+        fs = self.binary_storage()
+        state = State(name="Maine")
+        fs.new(state)
+        fs.save()
+        self.assertFalse(os.path.exists('file.json'))
+        self.assertTrue(os.path.exists(fs.snapshot_path))
+        self.forget_all()
+        fs.reload()
+        loaded = fs.get(State, state.id)
+        self.assertEqual(loaded.to_dict(), state.to_dict())
+
+    def test_binary_reads_json(self):
+        """ Binary mode migrates an existing file.json """
+        state = State(name="Vermont")
+        storage.new(state)
+        storage.save()
+        self.forget_all()
+        fs = self.binary_storage()
+        fs.reload()
+        self.assertEqual(fs.get(State, state.id).name, "Vermont")
+        fs.save()
+        self.assertTrue(os.path.exists('file.bin'))
+
+    def test_records_get(self):
+        """ Records mode reads single objects from the record file """
+        fs = self.records_storage()
+        state = State(name="Idaho")
+        fs.new(state)
+        fs.new(BaseModel())
+        fs.save()
+        self.assertFalse(os.path.exists('file.json'))
+        self.forget_all()
+        fs.reload()
+        self.assertEqual(storage._FileStorage__objects, {})
+        self.assertEqual(fs.get(State, state.id).name, "Idaho")
+        self.assertEqual(len(storage._FileStorage__objects), 1)
+        self.assertEqual(list(fs.all(State)), ['State.' + state.id])
+        self.assertEqual(len(fs.all()), 2)
+
+    def test_records_get_threads(self):
+        """ Threads getting the same records share one object each """
+        fs = self.records_storage()
+        states = [State(name="s") for i in range(2000)]
+        fs.bulk_new(states)
+        self.forget_all()
+        fs.reload()
+        ids = [state.id for state in states]
+        found, errors = self.get_in_threads(fs, ids)
+        self.assertEqual(errors, [])
+        for _id in ids:
+            self.assertIsNotNone(found[0][_id])
+            for got in found[1:]:
+                self.assertIs(got[_id], found[0][_id])
+
+    def test_records_update_delete(self):
+        """ Updates and deletions are appended to the record file """
+        fs = self.records_storage()
+        state = State(name="Idaho")
+        fs.new(state)
+        fs.save()
+        state.name = "Oregon"
+        fs.save()
+        other = State(name="Kansas")
+        fs.new(other)
+        fs.save()
+        fs.delete(other)
+        fs.save()
+        self.forget_all()
+        fs.reload()
+        self.assertEqual(fs.get(State, state.id).name, "Oregon")
+        self.assertIsNone(fs.get(State, other.id))
+        size = os.path.getsize('file.rec')
+        fs.compact()
+        self.assertLess(os.path.getsize('file.rec'), size)
+        self.forget_all()
+        fs.reload()
+        self.assertEqual(list(fs.all(State)), ['State.' + state.id])
+
+    def test_records_count(self):
+        """ Records mode counts saved records and unsaved changes """
+        fs = self.records_storage()
+        states = [State(), State()]
+        fs.bulk_new(states + [BaseModel()])
+        fs.save()
+        self.forget_all()
+        fs.reload()
+        self.assertEqual(fs.count(State), 2)
+        fs.new(State())
+        fs.delete(fs.get(State, states[0].id))
+        fs.get(State, states[1].id).name = "Utah"
+        self.assertEqual(fs.count(State), 2)
+        self.assertEqual(fs.count(), 3)
+        fs.save()
+        self.assertEqual(fs.count(State), 2)
+        self.assertEqual(len(storage._FileStorage__objects), 2)
+
+    def test_records_import_json(self):
+        """ An existing file.json is imported into the record file """
+        state = State(name="Alaska")
+        storage.new(state)
+        storage.save()
+        self.forget_all()
+        fs = self.records_storage()
+        self.assertEqual(fs.get(State, state.id).name, "Alaska")
+        self.assertTrue(os.path.exists('file.rec.idx'))
+
+    def test_bulk_new(self):
+        """ bulk_new stores every object and writes the file once """
+        states = [State(name="state_{}".format(i)) for i in range(50)]
+        with patch.object(FileStorage, '_FileStorage__write_snapshot',
+                          autospec=True,
+                          side_effect=FileStorage._FileStorage__write_snapshot
+                          ) as write:
+            storage.bulk_new(states)
+        self.assertEqual(write.call_count, 1)
+        self.assertEqual(len(storage.all(State)), 50)
+        self.forget_all()
+        storage.reload()
+        self.assertEqual(len(storage.all(State)), 50)
+
+    def test_bulk_update(self):
+        """ bulk_update changes attributes and updated_at and saves once """
+        states = [State(name="old") for i in range(3)]
+        storage.bulk_new(states)
+        before = states[0].updated_at
+        storage.bulk_update({'State.' + s.id: {'name': 'new'}
+                             for s in states[:2]})
+        self.assertEqual([s.name for s in states], ['new', 'new', 'old'])
+        self.assertGreater(states[0].updated_at, before)
+        self.forget_all()
+        storage.reload()
+        self.assertEqual(storage.get(State, states[1].id).name, 'new')
+
+    def test_bulk_update_missing(self):
+        """ bulk_update changes nothing when a key is not stored """
+        state = State(name="old")
+        storage.bulk_new([state])
+        with self.assertRaises(KeyError):
+            storage.bulk_update({'State.' + state.id: {'name': 'new'},
+                                 'State.nope': {'name': 'new'}})
+        self.assertEqual(state.name, "old")
+
+    def test_state_cities(self):
+        """ State.cities follows new, attribute updates and delete """
+        ohio = State(name="Ohio")
+        utah = State(name="Utah")
+        city = City(name="Akron", state_id=ohio.id)
+        other = City(name="Provo", state_id=utah.id)
+        storage.bulk_new([ohio, utah, city, other])
+        self.assertEqual(ohio.cities, [city])
+        city.state_id = utah.id
+        self.assertEqual(ohio.cities, [])
+        self.assertEqual(utah.cities, [other, city])
+        storage.delete(other)
+        self.assertEqual(utah.cities, [city])
+
+    def test_place_reviews_after_reload(self):
+        """ Place.reviews and User.places are rebuilt on reload """
+        user = User(email="a@b.c", password="pwd")
+        place = Place(name="Loft", city_id="c", user_id=user.id)
+        review = Review(text="Nice", place_id=place.id, user_id=user.id)
+        storage.bulk_new([user, place, review, Review(text="x")])
+        self.forget_all()
+        storage.reload()
+        place = storage.get(Place, place.id)
+        self.assertEqual([r.id for r in place.reviews], [review.id])
+        self.assertEqual(storage.get(User, user.id).places, [place])
+
+    def test_children_lazy(self):
+        """ children hydrates the raw records of the child class """
+        place = Place(name="Loft", city_id="c", user_id="u")
+        review = Review(text="Nice", place_id=place.id, user_id="u")
+        storage.bulk_new([place, review])
+        self.forget_all()
+        fs = self.lazy_storage()
+        fs.reload()
+        self.assertEqual([r.id for r in fs.children(Review, 'place_id',
+                                                   place.id)], [review.id])
+
+    def test_children_scan(self):
+        """ children scans for attributes without a foreign-key index """
+        state = State(name="Iowa")
+        storage.new(state)
+        self.assertEqual(storage.children(State, 'name', "Iowa"), [state])
+        self.assertEqual(storage.children(State, 'name', "Ohio"), [])
+
+    def test_place_amenities(self):
+        """ Place.amenities lists the stored amenities of amenity_ids """
+        place = Place(name="Loft")
+        wifi = Amenity(name="Wifi")
+        storage.bulk_new([place, wifi])
+        place.amenities = wifi
+        place.amenities = wifi
+        place.amenities = State()
+        self.assertEqual(place.amenity_ids, [wifi.id])
+        self.assertEqual(place.amenities, [wifi])
+        self.assertEqual(Place.amenity_ids, [])
+
+    def test_indexes_from_env(self):
+        """ HBNB_FILE_INDEXES declares sorted indexes """
+        place = Place(name="Loft", price_by_night=80)
+        storage.new(place)
+        env = {'HBNB_FILE_INDEXES': 'Place.price_by_night, Place.max_guest'}
+        with patch.dict(os.environ, env):
+            FileStorage()
+        index = storage.sorted_index('Place', 'price_by_night')
+        self.assertEqual(list(index.range()), [(80, place)])
+        self.assertIsNotNone(storage.sorted_index(Place, 'max_guest'))
+        self.assertIsNone(storage.sorted_index(Place, 'latitude'))
@@ -0,0 +1,141 @@
+#!/usr/bin/python3
+""" Module for testing the geospatial helpers and places_near"""
+import unittest
+import os
+import tempfile
+from unittest.mock import patch
+from models import storage
+from models.engine import geo
+from models.engine.db_storage import DBStorage
+from models.place import Place
+from tests import NOT_FILE
+
+
+class test_geo(unittest.TestCase):
+    """ Tests the distance, bounding box and grid helpers """
+
+    def test_distance(self):
+        """ Paris to London is about 344 km """
+        self.assertAlmostEqual(geo.distance(48.8566, 2.3522, 51.5074, -0.1278),
+                               343.6, delta=0.5)
+        self.assertEqual(geo.distance(10, 20, 10, 20), 0)
+
+    def test_bounding_box(self):
+        """ The box holds the circle and splits at the antimeridian """
+        (low, high), lons = geo.bounding_box(0, 0, 111.2)
+        self.assertAlmostEqual(low, -1, places=2)
+        self.assertAlmostEqual(high, 1, places=2)
+        self.assertEqual(len(lons), 1)
+        (low, high), lons = geo.bounding_box(0, 179.5, 111.2)
+        self.assertEqual(len(lons), 2)
+        self.assertEqual(lons[0][1], 180)
+        self.assertEqual(lons[1][0], -180)
+        self.assertEqual(geo.bounding_box(89.5, 0, 200)[1], [(-180, 180)])
+
+    def test_bounding_box_invalid(self):
+        """ A latitude out of range or a negative radius fails """
+        with self.assertRaises(ValueError):
+            geo.bounding_box(91, 0, 10)
+        with self.assertRaises(ValueError):
+            geo.bounding_box(0, 0, -1)
+
+    def test_nearest(self):
+        """ nearest keeps the candidates in the circle, nearest first """
+        points = {'a': (0, 0.5), 'b': (0, 0.1), 'c': (0, 3), 'd': (0, 0.3)}
+        candidates = [(name, geo.point(*pos)) for name, pos in points.items()]
+        self.assertEqual(geo.nearest(0, 0, 100, candidates), ['b', 'd', 'a'])
+        self.assertEqual(geo.nearest(0, 0, 100, candidates, 2), ['b', 'd'])
+
+    def test_grid(self):
+        """ The grid yields the objects around a point and follows moves """
+        grid = geo.GridIndex()
+        grid.add('near', 'near', 10.01, 20.01)
+        grid.add('far', 'far', -40, 100)
+        grid.add('none', 'none', None, 20)
+        self.assertEqual(len(grid), 2)
+        found = geo.nearest(10, 20, 5, grid.candidates(10, 20, 5))
+        self.assertEqual(found, ['near'])
+        grid.add('far', 'far', 10.02, 20.02)
+        found = geo.nearest(10, 20, 5, grid.candidates(10, 20, 5))
+        self.assertEqual(found, ['near', 'far'])
+        grid.remove('near')
+        grid.remove('near')
+        self.assertEqual(len(grid), 1)
+
+    def test_grid_antimeridian(self):
+        """ Cells on both sides of the antimeridian are searched """
+        grid = geo.GridIndex()
+        for i in range(200):
+            grid.add(str(i), str(i), 0, i - 100)
+        grid.add('east', 'east', 0, 179.95)
+        grid.add('west', 'west', 0, -179.95)
+        found = geo.nearest(0, 180, 20, grid.candidates(0, 180, 20))
+        self.assertEqual(sorted(found), ['east', 'west'])
+
+
+class PlacesNearTests:
+    """ places_near tests run against the storage returned by open_storage """
+
+    def setUp(self):
+        """ Stores places along the equator and one without a position """
+        self.storage = self.open_storage()
+        places = [Place(name="place_{}".format(i), city_id="c", user_id="u",
+                        latitude=0.0, longitude=0.05 * i) for i in range(6)]
+        places.append(Place(name="nowhere", city_id="c", user_id="u"))
+        self.storage.bulk_new(places)
+
+    def names(self, places):
+        """ Returns the names of places, in order """
+        return [place.name for place in places]
+
+    def test_places_near(self):
+        """ Places within the radius come nearest first """
+        found = self.storage.places_near(0, 0.12, 10)
+        self.assertEqual(self.names(found),
+                         ["place_2", "place_3", "place_1", "place_4"])
+
+    def test_places_near_limit(self):
+        """ limit keeps the nearest places only """
+        found = self.storage.places_near(0, 0.26, 100, limit=2)
+        self.assertEqual(self.names(found), ["place_5", "place_4"])
+
+    def test_places_near_none(self):
+        """ No place in the circle gives an empty list """
+        self.assertEqual(self.storage.places_near(45, 45, 10), [])
+
+
+@unittest.skipIf(os.getenv('HBNB_TYPE_STORAGE') == 'db', NOT_FILE)
+class test_FilePlacesNear(PlacesNearTests, unittest.TestCase):
+    """ places_near tests on FileStorage """
+
+    def open_storage(self):
+        """ Returns the shared file storage, emptied """
+        storage.reset()
+        self.addCleanup(os.remove, 'file.json')
+        return storage
+
+    def test_grid_follows_updates(self):
+        """ Moved, deleted and new places reach the grid """
+        place = self.storage.places_near(0, 0, 1)[0]
+        place.longitude = 0.3
+        self.storage.delete(self.storage.places_near(0, 0.25, 1)[0])
+        self.storage.new(Place(name="new", latitude=0.0, longitude=0.01))
+        self.assertEqual(self.names(self.storage.places_near(0, 0.28, 5)),
+                         ["place_0"])
+        self.assertEqual(self.names(self.storage.places_near(0, 0, 5)),
+                         ["new"])
+
+
+class test_DBPlacesNear(PlacesNearTests, unittest.TestCase):
+    """ places_near tests on DBStorage backed by SQLite """
+
+    def open_storage(self):
+        """ Returns a DBStorage on an empty SQLite database """
+        fd, path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        with patch.dict(os.environ, {'HBNB_DB_URL': 'sqlite:///' + path}):
+            db = DBStorage()
+        db.reload()
+        self.addCleanup(db.close)
+        return db
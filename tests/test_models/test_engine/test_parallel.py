@@ -0,0 +1,154 @@
+#!/usr/bin/python3
+""" Module for testing the parallel snapshot reader"""
+import unittest
+import json
+import os
+import subprocess
+import sys
+from models import storage
+from models.engine import parallel
+from models.engine.file_storage import FileStorage
+from models.city import City
+from models.place import Place
+from models.state import State
+from tests import NOT_FILE
+
+NO_FORK = None if parallel.available() else "needs fork"
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)))))
+CHILD = """
+import models
+from models.state import State
+states = models.storage.all(State).values()
+print(models.storage.count(), sorted(state.name for state in states)[0],
+      sum(len(state.cities) for state in states))
+"""
+
+
+@unittest.skipIf(NO_FORK, NO_FORK)
+@unittest.skipIf(os.getenv('HBNB_TYPE_STORAGE') == 'db', NOT_FILE)
+class test_parallel(unittest.TestCase):
+    """ Tests the shards and the parallel reload of FileStorage """
+
+    def setUp(self):
+        """ Saves states, cities and places """
+        storage.reset()
+        self.addCleanup(os.remove, 'file.json')
+        objs = []
+        for i in range(30):
+            state = State(name="state_{}".format(i))
+            city = City(name="city_{}".format(i), state_id=state.id)
+            objs += [state, city,
+                     Place(name="p", city_id=city.id, user_id="u",
+                           description="place_{}".format(i),
+                           number_rooms=i, latitude=0.5 * i)]
+        storage.bulk_new(objs)
+        with open('file.json') as f:
+            self.saved = json.load(f)
+
+    def reload(self, workers, lazy=False):
+        """ Returns a FileStorage reloaded with workers processes """
+        storage.reset()
+        fs = FileStorage()
+        fs._FileStorage__workers = workers
+        fs._FileStorage__parallel_min = 0
+        fs._FileStorage__lazy = lazy
+        fs.reload()
+        return fs
+
+    def test_cuts(self):
+        """ Shards start at the key of a record """
+        offsets = parallel.cuts('file.json', 8)
+        self.assertGreater(len(offsets), 1)
+        with open('file.json', 'rb') as f:
+            data = f.read()
+        self.assertEqual(data[offsets[0] - 1:offsets[0]], b'{')
+        for offset in offsets[1:]:
+            self.assertEqual(data[offset:offset + 1], b'"')
+
+    def test_shards(self):
+        """ Shards hold every record once, in file order """
+        shards = parallel.read('file.json', 4)
+        keys = [key for pairs in shards for key, val in pairs]
+        self.assertEqual(keys, list(self.saved))
+        self.assertEqual(dict(pairs for shard in shards
+                              for pairs in shard), self.saved)
+
+    def test_bad_cut(self):
+        """ A shard cut inside a record does not decode """
+        with open('file.json', 'w') as f:
+            f.write('{"State.1": {"name": "a, ", "id": "1"}, '
+                    '"State.2": {"name": "b", "id": "2"}}')
+        with open('file.json', 'rb') as f:
+            data = f.read()
+        cut = data.index(b'a, "') + len(b'a, ')
+        with self.assertRaises(ValueError):
+            parallel.read_shard('file.json', 1, cut, None)
+        with self.assertRaises(ValueError):
+            parallel.read_shard('file.json', cut, None, None)
+
+    def test_fooled_cuts(self):
+        """ Text that looks like record boundaries is read right """
+        places = list(storage.all(Place).values())
+        for i, place in enumerate(places):
+            place.description = ', "Place.x": {"a": [1, ", "]}, ' * i
+        storage.all(State)[next(iter(self.saved))].name = 'say, "hi", '
+        storage.save()
+        with open('file.json') as f:
+            saved = json.load(f)
+        for workers in (2, 5, 16):
+            self.reload(workers)
+            self.assertEqual({key: obj.to_dict() for key, obj in
+                              storage.all().items()}, saved)
+
+    def test_reload(self):
+        """ Objects reloaded in parallel match the saved ones """
+        for workers in (2, 3, 16):
+            self.reload(workers)
+            self.assertEqual({key: obj.to_dict() for key, obj in
+                              storage.all().items()}, self.saved)
+            state = storage.all(State)[next(iter(self.saved))]
+            self.assertEqual(len(state.cities), 1)
+            self.assertEqual(len(list(storage.query(Place).filter(
+                number_rooms__ge=10))), 20)
+            self.assertEqual(list(state.__dict__), list(
+                State(**self.saved['State.' + state.id]).__dict__))
+            storage._FileStorage__changed.clear()
+            state.name = "Ohio"
+            self.assertEqual(storage._FileStorage__changed,
+                             {'State.' + state.id})
+
+    def test_lazy_reload(self):
+        """ Lazy records are read in parallel too """
+        fs = self.reload(4, lazy=True)
+        self.assertEqual(storage._FileStorage__objects, {})
+        self.assertEqual(fs.count(), 90)
+        self.assertEqual({key: obj.to_dict() for key, obj in
+                          fs.all().items()}, self.saved)
+
+    def test_small_file(self):
+        """ Files under the size threshold are read serially """
+        storage.reset()
+        fs = FileStorage()
+        fs._FileStorage__workers = 4
+        calls = []
+        read = parallel.read
+        parallel.read = lambda *args: calls.append(args) or read(*args)
+        try:
+            fs.reload()
+            fs._FileStorage__parallel_min = 0
+            fs.reload()
+        finally:
+            parallel.read = read
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(fs.count(), 90)
+
+    def test_fresh_process(self):
+        """ Importing models reloads in parallel in a new interpreter """
+        env = dict(os.environ, PYTHONPATH=ROOT, HBNB_FILE_WORKERS='4',
+                   HBNB_FILE_PARALLEL_MIN='0')
+        env.pop('HBNB_TYPE_STORAGE', None)
+        out = subprocess.run([sys.executable, '-c', CHILD], env=env,
+                             capture_output=True, text=True)
+        self.assertEqual(out.stderr, '')
+        self.assertEqual(out.stdout.split(), ['90', 'state_0', '30'])
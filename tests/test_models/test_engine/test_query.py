@@ -0,0 +1,194 @@
+#!/usr/bin/python3
+""" Module for testing storage queries on both engines"""
+import unittest
+import os
+import tempfile
+from unittest.mock import patch
+from models import storage
+from models.engine.db_storage import DBStorage
+from models.engine.file_storage import FileStorage
+from models.engine.query import FileQuery, Query
+from models.place import Place
+from tests import NOT_FILE
+
+
+class QueryTests:
+    """ Query tests run against the storage returned by open_storage """
+
+    def setUp(self):
+        """ Stores six places """
+        self.storage = self.open_storage()
+        self.places = []
+        for i, (price, guests) in enumerate([(50, 2), (80, 4), (120, 6),
+                                             (90, 5), (60, 1), (200, 8)]):
+            self.places.append(Place(name="place_{}".format(i), city_id="c",
+                                     user_id="u", price_by_night=price,
+                                     max_guest=guests,
+                                     latitude=None if i == 4 else 1.5 * i))
+        self.storage.bulk_new(self.places)
+
+    def names(self, query):
+        """ Returns the names of the objects of query, in order """
+        return [place.name for place in query]
+
+    def test_filter(self):
+        """ Every condition of filter must hold """
+        query = self.storage.query(Place).filter(price_by_night__lt=100,
+                                                 max_guest__ge=4)
+        self.assertEqual(sorted(self.names(query)), ["place_1", "place_3"])
+
+    def test_filter_chained(self):
+        """ Chained filters combine and leave the first query untouched """
+        cheap = self.storage.query('Place').filter(price_by_night__le=90)
+        roomy = cheap.filter(max_guest__gt=4)
+        self.assertEqual(self.names(roomy), ["place_3"])
+        self.assertEqual(len(list(cheap)), 4)
+
+    def test_filter_none(self):
+        """ A None attribute only matches an equality test with None """
+        query = self.storage.query(Place)
+        self.assertEqual(self.names(query.filter(latitude=None)),
+                         ["place_4"])
+        self.assertNotIn("place_4",
+                         self.names(query.filter(latitude__ne=3.0)))
+        self.assertEqual(sorted(self.names(
+            query.filter(max_guest__in=[2, 8]))), ["place_0", "place_5"])
+
+    def test_order_limit_offset(self):
+        """ order_by, limit and offset page through the results """
+        query = self.storage.query(Place).order_by("-price_by_night")
+        self.assertEqual(self.names(query.limit(2)), ["place_5", "place_2"])
+        self.assertEqual(self.names(query.offset(2).limit(2)),
+                         ["place_3", "place_1"])
+        self.assertEqual(self.names(query.offset(5)), ["place_0"])
+        ordered = self.storage.query(Place).order_by("latitude", "name")
+        self.assertEqual(self.names(ordered)[:2], ["place_4", "place_0"])
+
+    def test_first(self):
+        """ first returns the first object or None """
+        query = self.storage.query(Place).order_by("price_by_night")
+        self.assertEqual(query.first().name, "place_0")
+        self.assertIsNone(query.filter(price_by_night__gt=1000).first())
+
+    def test_abstract(self):
+        """ The engine independent Query cannot be run on its own """
+        with self.assertRaises(TypeError):
+            Query(Place)
+
+    def test_foreign_key(self):
+        """ Equality on a foreign key matches the linked objects """
+        query = self.storage.query(Place).filter(city_id="c")
+        self.assertEqual(len(list(query)), 6)
+        self.assertEqual(list(query.filter(city_id="x")), [])
+
+
+@unittest.skipIf(os.getenv('HBNB_TYPE_STORAGE') == 'db', NOT_FILE)
+class test_FileQuery(QueryTests, unittest.TestCase):
+    """ Query tests on FileStorage """
+
+    def open_storage(self):
+        """ Returns the shared file storage, emptied """
+        storage.reset()
+        self.addCleanup(os.remove, 'file.json')
+        return storage
+
+    def test_foreign_key_index(self):
+        """ Equality on a foreign key does not scan the class """
+        with patch.object(FileStorage, 'all') as all:
+            list(self.storage.query(Place).filter(city_id="c"))
+        all.assert_not_called()
+
+    def test_early_termination(self):
+        """ Without ordering, matching stops once limit objects are found """
+        query = self.storage.query(Place).filter(name__ne="x").limit(2)
+        with patch.object(FileQuery, '_FileQuery__match', autospec=True,
+                          side_effect=FileQuery._FileQuery__match) as match:
+            self.assertEqual(len(list(query)), 2)
+        self.assertEqual(match.call_count, 2)
+
+
+class test_IndexedFileQuery(test_FileQuery):
+    """ Query tests on FileStorage with sorted indexes """
+
+    def open_storage(self):
+        """ Returns the shared file storage with Place indexes """
+        fs = super().open_storage()
+        self.addCleanup(fs.reset)
+        for attr in ('price_by_night', 'max_guest', 'latitude'):
+            fs.add_index(Place, attr)
+        return fs
+
+    def test_range_index(self):
+        """ Bounded conditions read the sorted index, not the class """
+        with patch.object(FileStorage, 'all') as all:
+            query = self.storage.query(Place).filter(price_by_night__gt=60,
+                                                     price_by_night__le=120)
+            self.assertEqual(self.names(query),
+                             ["place_1", "place_3", "place_2"])
+        all.assert_not_called()
+
+    def test_index_after_bulk_update(self):
+        """ Objects changed while upkeep is deferred are indexed again """
+        self.storage.bulk_update({'Place.' + self.places[0].id:
+                                  {'price_by_night': 500}})
+        query = self.storage.query(Place)
+        self.assertEqual(self.names(query.filter(price_by_night__gt=300)),
+                         ["place_0"])
+        self.assertEqual(self.names(query.filter(price_by_night__lt=55)), [])
+        self.places[1].price_by_night = 5
+        self.storage._FileStorage__defer()
+        self.places[2].price_by_night = 7
+        self.storage._FileStorage__resume()
+        self.assertEqual(self.names(query.filter(price_by_night__lt=10)),
+                         ["place_1", "place_2"])
+
+    def test_top_k(self):
+        """ Ordering by an indexed attribute stops after limit objects """
+        query = self.storage.query(Place).order_by("-price_by_night")
+        with patch.object(FileQuery, '_FileQuery__match', autospec=True,
+                          side_effect=FileQuery._FileQuery__match) as match:
+            self.assertEqual(self.names(query.limit(2)),
+                             ["place_5", "place_2"])
+        self.assertEqual(match.call_count, 2)
+
+    def test_index_follows_updates(self):
+        """ Updates, deletes and new objects reach the index """
+        self.places[0].price_by_night = 500
+        self.storage.delete(self.places[5])
+        self.storage.new(Place(name="place_6", price_by_night=55))
+        query = self.storage.query(Place).order_by("price_by_night")
+        self.assertEqual(self.names(query.limit(2)), ["place_6", "place_4"])
+        self.assertEqual(self.names(query.filter(price_by_night__gt=150)),
+                         ["place_0"])
+
+    def test_index_rebuilt_on_reload(self):
+        """ reload refills the index with the objects it reads """
+        self.storage.save()
+        self.storage.reset()
+        for attr in ('price_by_night', 'max_guest', 'latitude'):
+            self.storage.add_index(Place, attr)
+        self.storage.reload()
+        index = self.storage.sorted_index(Place, 'price_by_night')
+        self.assertEqual(len(index), 6)
+        self.assertEqual(self.storage.query(Place).order_by(
+            "-price_by_night").first().name, "place_5")
+
+
+class test_DBQuery(QueryTests, unittest.TestCase):
+    """ Query tests on DBStorage backed by SQLite """
+
+    def open_storage(self):
+        """ Returns a DBStorage on an empty SQLite database """
+        fd, path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        with patch.dict(os.environ, {'HBNB_DB_URL': 'sqlite:///' + path}):
+            db = DBStorage()
+        db.reload()
+        self.addCleanup(db.close)
+        return db
+
+    def test_unknown_column(self):
+        """ Filtering on an attribute that is not a column fails """
+        with self.assertRaises(ValueError):
+            list(self.storage.query(Place).filter(colour="red"))
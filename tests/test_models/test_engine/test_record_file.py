@@ -0,0 +1,129 @@
+#!/usr/bin/python3
+""" Module for testing the record file"""
+import unittest
+from models.engine.record_file import RecordFile
+import json
+import os
+
+
+class test_recordFile(unittest.TestCase):
+    """ Class to test the record file """
+
+    def setUp(self):
+        """ Open an empty record file """
+        self.rf = RecordFile('test.rec')
+
+    def tearDown(self):
+        """ Remove record files at end of tests """
+        self.rf.close()
+        for path in ('test.rec', 'test.rec.idx'):
+            try:
+                os.remove(path)
+            except:
+                pass
+
+    def put(self, *keys):
+        """ Append one version of every key """
+        self.rf.append([(key, json.dumps({'id': key})) for key in keys])
+
+    def test_lookup(self):
+        """ The newest version of a key is returned """
+        self.put('State.1', 'City.1')
+        self.rf.append([('State.1', '{"id": "new"}')])
+        self.assertEqual(self.rf.lookup('State.1'), {'id': 'new'})
+        self.assertEqual(self.rf.lookup('City.1'), {'id': 'City.1'})
+        self.assertIsNone(self.rf.lookup('City.2'))
+
+    def test_delete(self):
+        """ Deleted keys are neither found nor listed """
+        self.put('State.1', 'State.2')
+        self.rf.append([('State.1', None)])
+        self.assertIsNone(self.rf.lookup('State.1'))
+        self.assertEqual(list(self.rf.keys('State.')), ['State.2'])
+        self.assertNotIn('State.1', self.rf)
+        self.assertIn('State.2', self.rf)
+
+    def test_keys_and_count(self):
+        """ Keys are listed and counted per class prefix """
+        self.put('State.1', 'City.1', 'State.2', 'Place.1')
+        self.rf.compact()
+        self.put('State.3')
+        self.rf.append([('State.1', None)])
+        self.assertEqual(sorted(self.rf.keys('State.')),
+                         ['State.2', 'State.3'])
+        self.assertEqual(self.rf.count('State.'), 2)
+        self.assertEqual(self.rf.count(), 4)
+
+    def test_compact(self):
+        """ Compaction drops superseded versions and indexes the rest """
+        self.put('State.1', 'State.2')
+        self.put('State.1')
+        self.rf.append([('State.2', None)])
+        before = os.path.getsize('test.rec')
+        self.rf.compact()
+        self.assertLess(os.path.getsize('test.rec'), before)
+        self.assertTrue(os.path.exists('test.rec.idx'))
+        self.assertEqual(list(self.rf.keys()), ['State.1'])
+        self.assertEqual(self.rf.lookup('State.1'), {'id': 'State.1'})
+
+    def test_reopen(self):
+        """ Indexed and appended records survive reopening """
+        self.put('State.1')
+        self.rf.compact()
+        self.put('State.2')
+        self.rf.close()
+        self.rf = RecordFile('test.rec')
+        self.assertEqual(sorted(self.rf.keys()), ['State.1', 'State.2'])
+
+    def test_stale_index(self):
+        """ An index from another record file generation is ignored """
+        self.put('State.1')
+        self.rf.compact()
+        with open('test.rec.idx', 'rb') as f:
+            index = f.read()
+        self.put('State.2')
+        self.rf.compact()
+        self.rf.close()
+        with open('test.rec.idx', 'wb') as f:
+            f.write(index)
+        self.rf = RecordFile('test.rec')
+        self.assertEqual(sorted(self.rf.keys()), ['State.1', 'State.2'])
+
+    def test_torn_record(self):
+        """ A torn last line is cut off on open """
+        self.put('State.1')
+        size = os.path.getsize('test.rec')
+        self.rf.close()
+        with open('test.rec', 'a') as f:
+            f.write('["put","State.2",{"id"')
+        self.rf = RecordFile('test.rec')
+        self.assertEqual(list(self.rf.keys()), ['State.1'])
+        self.assertEqual(os.path.getsize('test.rec'), size)
+
+    def test_auto_compact(self):
+        """ The file is compacted once the unindexed lines outnumber the
+        indexed keys and compact_min """
+        self.rf.compact_min = 4
+        self.put('State.1', 'State.2', 'State.3', 'State.4')
+        self.assertFalse(os.path.exists('test.rec.idx'))
+        self.put('State.1')
+        self.assertTrue(os.path.exists('test.rec.idx'))
+        self.assertEqual(self.rf.count(), 4)
+        size = os.path.getsize('test.rec')
+        for i in range(4):
+            self.put('State.2')
+        self.assertGreater(os.path.getsize('test.rec'), size)
+        self.put('State.2')
+        self.assertEqual(os.path.getsize('test.rec'), size)
+
+    def test_compact_on_open(self):
+        """ Reopening a file with a long unindexed tail compacts it """
+        self.put('State.1', 'State.2')
+        for i in range(5):
+            self.put('State.1')
+        self.rf.close()
+        self.rf = RecordFile('test.rec', compact_min=4)
+        self.assertTrue(os.path.exists('test.rec.idx'))
+        with open('test.rec') as f:
+            self.assertEqual(len(f.readlines()), 3)
+        self.assertEqual(sorted(self.rf.keys()), ['State.1', 'State.2'])
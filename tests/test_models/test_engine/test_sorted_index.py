@@ -0,0 +1,53 @@
+#!/usr/bin/python3
+""" Module for testing the sorted attribute index"""
+import unittest
+from models.engine.sorted_index import SortedIndex
+
+
+class test_SortedIndex(unittest.TestCase):
+    """ Class to test the sorted index """
+
+    def setUp(self):
+        """ Index seven objects, one without a value """
+        self.index = SortedIndex()
+        self.index.rebuild(("k{}".format(i), i, value) for i, value in
+                           enumerate([5, 3, 9, 1, None, 3.5, 7]))
+
+    def values(self, *args, **kwargs):
+        """ Returns the values of a range """
+        return [value for value, obj in self.index.range(*args, **kwargs)]
+
+    def test_range(self):
+        """ Ranges honour bounds, open bounds and direction """
+        self.assertEqual(self.values(), [1, 3, 3.5, 5, 7, 9])
+        self.assertEqual(self.values(3, 7), [3, 3.5, 5, 7])
+        self.assertEqual(self.values(3, 7, True, True), [3.5, 5])
+        self.assertEqual(self.values(high=5, reverse=True), [5, 3.5, 3, 1])
+        self.assertEqual(self.values(10), [])
+
+    def test_others(self):
+        """ None and non-numeric values are kept apart """
+        self.index.add("k7", 7, "cheap")
+        self.assertEqual(sorted(self.index.others()), [4, 7])
+        self.assertEqual(len(self.index), 8)
+
+    def test_add_remove(self):
+        """ add moves a key and remove drops it """
+        self.index.add("k0", 0, 2)
+        self.index.add("k8", 8, 2)
+        self.index.remove("k2")
+        self.index.remove("missing")
+        self.assertEqual(self.values(), [1, 2, 2, 3, 3.5, 7])
+        self.index.add("k4", 4, 8)
+        self.assertEqual(self.index.others(), [])
+        self.assertEqual([obj for value, obj in self.index.range(8)], [4])
+
+    def test_change_during_range(self):
+        """ A range resumes after its last pair when the index changes """
+        seen = []
+        for value, obj in self.index.range():
+            seen.append(value)
+            if value == 3:
+                self.index.remove("k0")
+                self.index.add("k3", 3, 0)
+        self.assertEqual(seen, [1, 3, 3.5, 7, 9])
@@ -0,0 +1,209 @@
+#!/usr/bin/python3
+""" Module for testing the full-text index and storage.search"""
+import unittest
+import os
+import tempfile
+from unittest.mock import patch
+from models import storage
+from models.engine import text_index
+from models.engine.db_storage import DBStorage
+from models.engine.file_storage import FileStorage
+from models.engine.text_index import TextIndex
+from models.place import Place
+from models.review import Review
+from tests import NOT_FILE
+
+
+class test_TextIndex(unittest.TestCase):
+    """ Tests the tokenizer, posting lists and BM25 ranking """
+
+    def setUp(self):
+        """ Indexes four short documents """
+        self.index = TextIndex()
+        self.index.add('a', "Sunny loft near the beach")
+        self.index.add('b', "Quiet cabin in the woods, by the lake")
+        self.index.add('c', "Beach house: beach view, beach access")
+        self.index.add('d', "Loft downtown")
+
+    def test_tokenize(self):
+        """ Words are lowercased and split on punctuation """
+        self.assertEqual(text_index.tokenize("Beach-house, 2 rooms!"),
+                         ['beach', 'house', '2', 'rooms'])
+        self.assertEqual(text_index.document(["Loft", None, 3]), "Loft 3")
+
+    def test_search(self):
+        """ Documents with any word match, ranked by BM25 """
+        self.assertEqual([key for key, score in self.index.search("beach")],
+                         ['c', 'a'])
+        found = [key for key, score in self.index.search("LOFT beach")]
+        self.assertEqual(sorted(found), ['a', 'c', 'd'])
+        self.assertEqual(found[0], 'a')
+        self.assertEqual(self.index.search("castle"), [])
+
+    def test_limit(self):
+        """ limit keeps the best documents """
+        self.assertEqual(len(self.index.search("the loft beach", 2)), 2)
+
+    def test_update_remove(self):
+        """ Replaced and removed documents leave their old words """
+        self.index.add('a', "Cosy castle")
+        self.assertEqual([key for key, score in self.index.search("castle")],
+                         ['a'])
+        self.assertEqual([key for key, score in self.index.search("beach")],
+                         ['c'])
+        self.index.remove('a')
+        self.index.remove('a')
+        self.assertEqual(self.index.search("castle"), [])
+        self.assertEqual(len(self.index), 3)
+
+    def test_unchanged_text(self):
+        """ Adding the same text again leaves the index unchanged """
+        self.index.changed = False
+        self.index.add('d', "Loft downtown")
+        self.assertFalse(self.index.changed)
+        self.index.add('d', "Loft uptown")
+        self.assertTrue(self.index.changed)
+
+    def test_state(self):
+        """ An index rebuilt from its state ranks the same way """
+        copy = TextIndex.from_state(self.index.state())
+        self.assertEqual(copy.search("loft beach lake"),
+                         self.index.search("loft beach lake"))
+        self.assertFalse(copy.changed)
+        copy.remove('c')
+        self.assertEqual(len(copy), 3)
+
+
+class SearchTests:
+    """ search tests run against the storage returned by open_storage """
+
+    def setUp(self):
+        """ Stores three places and a review """
+        self.storage = self.open_storage()
+        self.places = [
+            Place(name="Beach house", city_id="c", user_id="u",
+                  description="Steps from the beach"),
+            Place(name="Loft", city_id="c", user_id="u",
+                  description="Downtown loft with a view"),
+            Place(name="Cabin", city_id="c", user_id="u")]
+        self.storage.bulk_new(self.places +
+                              [Review(text="Great beach", place_id="p",
+                                      user_id="u")])
+
+    def names(self, objs):
+        """ Returns the names of objs, in order """
+        return [obj.name for obj in objs]
+
+    def test_search(self):
+        """ Names and descriptions are searched, best match first """
+        self.assertEqual(self.names(self.storage.search(Place, "beach")),
+                         ["Beach house"])
+        self.assertEqual(self.names(self.storage.search('Place', "cabin")),
+                         ["Cabin"])
+        self.assertEqual(len(self.storage.search(Place, "loft beach")), 2)
+        self.assertEqual(self.storage.search(Place, "castle"), [])
+        self.assertEqual(len(self.storage.search(Review, "beach")), 1)
+
+    def test_search_limit(self):
+        """ limit keeps the best matches """
+        self.assertEqual(len(self.storage.search(Place, "loft beach", 1)), 1)
+
+    def test_not_searchable(self):
+        """ A class without searched attributes fails """
+        with self.assertRaises(ValueError):
+            self.storage.search('BaseModel', "beach")
+
+
+@unittest.skipIf(os.getenv('HBNB_TYPE_STORAGE') == 'db', NOT_FILE)
+class test_FileSearch(SearchTests, unittest.TestCase):
+    """ search tests on FileStorage """
+
+    def open_storage(self):
+        """ Returns the shared file storage, emptied """
+        storage.reset()
+        self.addCleanup(os.remove, 'file.json')
+        return storage
+
+    def test_index_follows_updates(self):
+        """ Updates, deletes and new objects reach the index """
+        self.storage.search(Place, "beach")
+        self.places[2].description = "Cabin by the beach"
+        self.storage.delete(self.places[0])
+        self.storage.new(Place(name="Beach hut"))
+        self.assertEqual(sorted(self.names(self.storage.search(Place,
+                                                               "beach"))),
+                         ["Beach hut", "Cabin"])
+
+    def test_saved_index(self):
+        """ The saved index is read back and brought up to date """
+        fs = FileStorage()
+        fs._FileStorage__search_index = True
+        path = fs.search_path('Place')
+        self.addCleanup(os.remove, path)
+        fs.search(Place, "beach")
+        fs.save()
+        self.assertTrue(os.path.exists(path))
+        FileStorage._FileStorage__texts.clear()
+        self.places[1].description = "Loft by the beach"
+        with patch.object(TextIndex, 'add', autospec=True,
+                          side_effect=TextIndex.add) as add:
+            self.assertEqual(len(fs.search(Place, "beach")), 2)
+        self.assertEqual(add.call_count, 3)
+        self.assertEqual(len(FileStorage._FileStorage__texts['Place']), 3)
+
+
+class test_DBSearch(SearchTests, unittest.TestCase):
+    """ search tests on DBStorage backed by SQLite """
+
+    def open_storage(self):
+        """ Returns a DBStorage on an empty SQLite database """
+        fd, path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        with patch.dict(os.environ, {'HBNB_DB_URL': 'sqlite:///' + path}):
+            db = DBStorage()
+        db.reload()
+        self.addCleanup(db.close)
+        return db
+
+    def test_index_kept(self):
+        """ The index is built once, then only written objects are added """
+        with patch.object(TextIndex, 'add', autospec=True,
+                          side_effect=TextIndex.add) as add:
+            self.storage.search(Place, "beach")
+            self.storage.close()
+            self.assertEqual(self.names(self.storage.search(Place, "loft")),
+                             ["Loft"])
+            self.assertEqual(add.call_count, 3)
+            self.storage.new(Place(name="Loft 2", city_id="c", user_id="u"))
+            self.storage.save()
+            self.assertEqual(len(self.storage.search(Place, "loft")), 2)
+            self.assertEqual(add.call_count, 4)
+            self.storage.search(Review, "beach")
+            self.assertEqual(add.call_count, 5)
+
+    def test_index_rolled_back(self):
+        """ Changes flushed then rolled back never reach the index """
+        self.storage.search(Place, "beach")
+        self.storage.get(Place, self.places[2].id).description = "beach"
+        self.storage.count(Place)
+        self.storage._DBStorage__session.rollback()
+        self.storage.save()
+        self.assertEqual(self.names(self.storage.search(Place, "beach")),
+                         ["Beach house"])
+
+    def test_index_follows_writes(self):
+        """ Updates, deletes and new objects reach the index """
+        self.storage.search(Place, "beach")
+        self.storage.get(Place, self.places[2].id).description = \
+            "Cabin by the beach"
+        self.storage.delete(self.storage.get(Place, self.places[0].id))
+        self.storage.new(Place(name="Beach hut", city_id="c", user_id="u"))
+        self.storage.save()
+        self.storage.close()
+        self.assertEqual(sorted(self.names(self.storage.search(Place,
+                                                               "beach"))),
+                         ["Beach hut", "Cabin"])
+        self.storage.bulk_update({'Place.' + self.places[1].id:
+                                  {'name': "Beach loft"}})
+        self.assertEqual(len(self.storage.search(Place, "beach")), 3)
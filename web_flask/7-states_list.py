@@ -0,0 +1,27 @@
+#!/usr/bin/python3
+"""
+Starts a Flask web application
+"""
+
+from flask import Flask, render_template
+from models import storage
+from models.state import State
+
+app = Flask(__name__)
+
+
+@app.teardown_appcontext
+def teardown(exception):
+    """Releases the storage session of the request"""
+    storage.release()
+
+
+@app.route("/states_list", strict_slashes=False)
+def states_list():
+    """Displays the list of all State objects sorted by name"""
+    states = sorted(storage.all(State).values(), key=lambda s: s.name)
+    return render_template("7-states_list.html", states=states)
+
+
+if __name__ == "__main__":
+    app.run(host="0.0.0.0", port=5000)